@@ -3,11 +3,13 @@ import os
 import json
 import importlib
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable, List
+from typing import Dict, Any, Optional, Callable, Iterator, List
 
 import pandas as pd
 from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import firebase_admin
 from firebase_admin import credentials, auth as firebase_auth
@@ -15,6 +17,9 @@ from loguru import logger
 import uvicorn
 from dotenv import load_dotenv
 
+from dataset_loader import dataset_loader
+from plan_stream import sse_event
+
 # Load environment variables
 load_dotenv()
 
@@ -97,9 +102,10 @@ try:
     UserProfile = getattr(models_mod, "UserProfile")
     # DoshaResult may simply be a dict on some projects; we accept either
     DoshaResultType = getattr(models_mod, "DoshaResult", dict)
-    Gender = getattr(models_mod, "Gender")
-    PhysicalActivityLevel = getattr(models_mod, "PhysicalActivityLevel")
-    Goal = getattr(models_mod, "Goal")
+    # enums may carry an "Enum" suffix (models.GenderEnum etc.)
+    Gender = getattr(models_mod, "Gender", None) or getattr(models_mod, "GenderEnum")
+    PhysicalActivityLevel = getattr(models_mod, "PhysicalActivityLevel", None) or getattr(models_mod, "ActivityLevelEnum")
+    Goal = getattr(models_mod, "Goal", None) or getattr(models_mod, "GoalEnum")
     logger.info("Loaded model types from models.py")
 except Exception as e:
     logger.error(f"Failed to import models from 'models.py': {e}")
@@ -116,11 +122,23 @@ except ImportError as e:
     logger.error("Meal planner module/function not found: " + str(e))
     raise
 
+# Streaming generator for /generateMealPlan/stream (optional)
+try:
+    meal_planner_stream = import_callable(
+        module_names=["planner", "meal_planner"],
+        callable_names=["stream_meal_plan"],
+        class_names=["MealPlanner"]
+    )
+except ImportError as e:
+    logger.warning("Streaming meal planner not found, /generateMealPlan/stream disabled: " + str(e))
+    meal_planner_stream = None
+
 # Dosha analyzer detection
 try:
     analyze_dosha = import_callable(
-        module_names=["dosha_analysis", "dosha", "dosha_analyzer"],
-        callable_names=["analyze_dosha", "compute_dosha", "get_dosha"]
+        module_names=["dosha_analysis", "dosha", "dosha_analyzer", "dosha_estimator"],
+        callable_names=["analyze_dosha", "compute_dosha", "get_dosha", "predict_dosha_hybrid"],
+        class_names=["DoshaPredictor"]
     )
 except ImportError as e:
     logger.error("Dosha analysis function not found: " + str(e))
@@ -165,7 +183,19 @@ FOOD_DATASET: Optional[pd.DataFrame] = None
 
 
 def load_food_dataset():
+    """
+    Load the food catalog at startup. The processed catalog of the shared
+    dataset snapshot is preferred, so this module and the streaming
+    endpoint hold a single copy; the raw CSV is the fallback.
+    """
     global FOOD_DATASET
+    try:
+        FOOD_DATASET = dataset_loader.get_snapshot().datasets["food"]
+        logger.info(f"Loaded processed food catalog with {len(FOOD_DATASET)} items")
+        return
+    except Exception as e:
+        logger.warning(f"Processed food catalog not available, reading the CSV directly: {e}")
+
     try:
         food_dataset_path = os.getenv("FOOD_DATASET_PATH", "data/food_dataset.csv")
         if os.path.exists(food_dataset_path):
@@ -409,51 +439,61 @@ async def test_auth(user=Depends(verify_doctor)):
     }
 
 
-@app.post("/generateMealPlan", response_model=MealPlanResponse)
-async def generate_meal_plan_endpoint(request: GenerateMealPlanRequest, user=Depends(verify_doctor)):
-    try:
-        logger.info(f"Doctor {user['uid']} requested meal plan for patient {request.patientId}")
+def prepare_generation(request: GenerateMealPlanRequest):
+    """
+    Validate a generation request and work out the patient's profile, dosha
+    and daily calories. Raises HTTPException for bad requests.
+    """
+    # Validate
+    if not request.patientId or not request.patientId.strip():
+        raise HTTPException(status_code=400, detail="Patient ID is required")
+    if not request.profile or not isinstance(request.profile, dict):
+        raise HTTPException(status_code=400, detail="Patient profile is required and must be an object")
 
-        # Validate
-        if not request.patientId or not request.patientId.strip():
-            raise HTTPException(status_code=400, detail="Patient ID is required")
-        if not request.profile or not isinstance(request.profile, dict):
-            raise HTTPException(status_code=400, detail="Patient profile is required and must be an object")
+    if FOOD_DATASET is None or FOOD_DATASET.empty:
+        raise HTTPException(status_code=500, detail="Food dataset not available. Please check server configuration.")
 
-        if FOOD_DATASET is None or FOOD_DATASET.empty:
-            raise HTTPException(status_code=500, detail="Food dataset not available. Please check server configuration.")
+    # Convert profile
+    try:
+        user_profile = create_user_profile(request.profile)
+        logger.info(f"Created UserProfile with Age={getattr(user_profile, 'Age', None)}")
+    except Exception as e:
+        logger.error(f"Error creating user profile: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid profile data: {str(e)}")
 
-        # Convert profile
-        try:
-            user_profile = create_user_profile(request.profile)
-            logger.info(f"Created UserProfile with Age={getattr(user_profile, 'Age', None)}")
-        except Exception as e:
-            logger.error(f"Error creating user profile: {e}")
-            raise HTTPException(status_code=400, detail=f"Invalid profile data: {str(e)}")
+    # Dosha analysis (defensive)
+    try:
+        dosha_result = analyze_dosha(user_profile)
+        logger.info(f"Dosha analysis result: {dosha_result}")
+    except Exception as e:
+        logger.warning(f"Dosha analysis failed, using default. Error: {e}")
+        dosha_result = {"dosha": "vata", "confidence": 0.5, "description": "Default dosha assignment"}
 
-        # Dosha analysis (defensive)
+    # Calorie calculation (defensive)
+    try:
+        daily_calories = calculate_daily_calories(user_profile)
+        logger.info(f"Calculated daily calories: {daily_calories}")
+    except Exception as e:
+        logger.warning(f"Calorie calculation failed, using default. Error: {e}")
+        # fallback heuristic
+        gender_field = getattr(user_profile, "Gender", None)
+        gender_name = None
         try:
-            dosha_result = analyze_dosha(user_profile)
-            logger.info(f"Dosha analysis result: {dosha_result}")
-        except Exception as e:
-            logger.warning(f"Dosha analysis failed, using default. Error: {e}")
-            dosha_result = {"dosha": "vata", "confidence": 0.5, "description": "Default dosha assignment"}
+            gender_name = gender_field.name.lower() if hasattr(gender_field, "name") else str(gender_field).lower()
+        except Exception:
+            gender_name = str(gender_field).lower() if gender_field else None
+        base_calories = 1800 if gender_name == "female" else 2200
+        daily_calories = base_calories
 
-        # Calorie calculation (defensive)
-        try:
-            daily_calories = calculate_daily_calories(user_profile)
-            logger.info(f"Calculated daily calories: {daily_calories}")
-        except Exception as e:
-            logger.warning(f"Calorie calculation failed, using default. Error: {e}")
-            # fallback heuristic
-            gender_field = getattr(user_profile, "Gender", None)
-            gender_name = None
-            try:
-                gender_name = gender_field.name.lower() if hasattr(gender_field, "name") else str(gender_field).lower()
-            except Exception:
-                gender_name = str(gender_field).lower() if gender_field else None
-            base_calories = 1800 if gender_name == "female" else 2200
-            daily_calories = base_calories
+    return user_profile, dosha_result, daily_calories
+
+
+@app.post("/generateMealPlan", response_model=MealPlanResponse)
+async def generate_meal_plan_endpoint(request: GenerateMealPlanRequest, user=Depends(verify_doctor)):
+    try:
+        logger.info(f"Doctor {user['uid']} requested meal plan for patient {request.patientId}")
+
+        user_profile, dosha_result, daily_calories = prepare_generation(request)
 
         # Call meal planner. Try keyword call first; fallback to positional call.
         logger.info("Calling meal planner generator...")
@@ -518,6 +558,62 @@ async def generate_meal_plan_endpoint(request: GenerateMealPlanRequest, user=Dep
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.post("/generateMealPlan/stream")
+async def stream_meal_plan_endpoint(request: GenerateMealPlanRequest, user=Depends(verify_doctor)):
+    """
+    Server-Sent Events version of /generateMealPlan: a `day` event per day
+    as soon as it is generated and validated, then `done` with totals and
+    metadata (or `error`).
+    """
+    if meal_planner_stream is None:
+        raise HTTPException(status_code=501, detail="Streaming meal plan generation is not available")
+
+    logger.info(f"Doctor {user['uid']} requested streamed meal plan for patient {request.patientId}")
+    user_profile, dosha_result, daily_calories = prepare_generation(request)
+    # The planner needs the processed catalog (numeric columns, dosha effects), as the Flask app uses.
+    # The snapshot is built at startup; off the event loop in case it has to be built now
+    try:
+        snapshot = await run_in_threadpool(dataset_loader.get_snapshot)
+        food_df = snapshot.datasets["food"]
+    except Exception as e:
+        logger.error(f"Processed food catalog not available: {e}")
+        raise HTTPException(status_code=500, detail="Food dataset not available. Please check server configuration.")
+    days = request.days or 7
+    model = request.model or os.getenv("DEFAULT_MODEL", "gpt-4")
+
+    def events() -> Iterator[str]:
+        # Runs in Starlette's threadpool, so the blocking LLM stream doesn't hold the event loop
+        try:
+            for event, data in meal_planner_stream(
+                user_profile=user_profile,
+                food_df=food_df,
+                dosha_info=dosha_result,
+                daily_calories=daily_calories,
+                days=days,
+                model=model,
+            ):
+                if event == "done":
+                    data["metadata"] = {
+                        "generated_by": user.get("uid"),
+                        "patient_id": request.patientId,
+                        "model_version": os.getenv("MODEL_VERSION", "1.0.0"),
+                        "dosha": dosha_result.get("dosha", "unknown") if isinstance(dosha_result, dict) else getattr(dosha_result, "dosha", "unknown"),
+                        "daily_calories": daily_calories,
+                        "days": days,
+                    }
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.exception(f"Streamed meal plan generation failed: {e}")
+            yield sse_event("error", {"message": f"Internal server error: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Debug / config endpoint ---
 @app.get("/config")
 async def get_config(user=Depends(verify_doctor)):
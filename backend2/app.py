@@ -19,9 +19,13 @@ import traceback
 from config import settings
 from models import (
     UserProfile, MealPlanRequest, MealPlanResponse, 
-    APIResponse, HealthCheck, DoshaResult
+    APIResponse, HealthCheck, DoshaResult, FoodFilterRequest
 )
 from dataset_loader import dataset_loader
+from candidate_cache import candidate_cache
+from llm_cache import llm_cache
+from filter_and_score import select_candidates_batch
+from substitutes import DIETS
 from dosha_estimator import dosha_predictor
 from calorie_calculator import estimate_calories, get_calorie_breakdown
 from planner import meal_planner
@@ -64,12 +68,11 @@ def create_app() -> Flask:
 app = create_app()
 
 
-# Global data loading with caching
-@app.cache.memoize(timeout=3600)
+# Global data loading from the active dataset snapshot
 def get_datasets():
-    """Load and cache datasets"""
+    """Datasets of the active snapshot (swapped atomically on reload)"""
     try:
-        return dataset_loader.load_all_datasets()
+        return dataset_loader.get_snapshot().datasets
     except Exception as e:
         logger.error(f"Failed to load datasets: {e}")
         raise ModelError(f"Dataset loading failed: {e}")
@@ -204,7 +207,7 @@ def health_check():
             datasets = get_datasets()
             dataset_status = {
                 "status": "healthy",
-                "datasets_loaded": len(datasets),
+                "datasets_loaded": len(datasets.loaded()),
                 "total_foods": len(datasets.get('food', [])) if datasets.get('food') is not None else 0
             }
         except Exception as e:
@@ -671,6 +674,151 @@ def get_dataset_info():
         raise ModelError(f"Failed to retrieve dataset information: {e}")
 
 
+@app.route("/foods/<path:food_id>/substitutes", methods=["GET"])
+@app.limiter.limit("120 per minute")
+def get_food_substitutes(food_id: str):
+    """Nearest foods in nutrient space that satisfy optional diet and dosha filters"""
+    try:
+        k = request.args.get('k', 5, type=int)
+        diet = (request.args.get('diet') or '').lower() or None
+        dosha = (request.args.get('dosha') or '').lower() or None
+        strictness = request.args.get('strictness', 0.7, type=float)
+        
+        if not 1 <= k <= 50:
+            raise ValidationError("k must be between 1 and 50")
+        if diet is not None and diet not in DIETS:
+            raise ValidationError(f"diet must be one of: {', '.join(DIETS)}")
+        if dosha is not None and dosha not in ("vata", "pitta", "kapha"):
+            raise ValidationError("dosha must be one of: vata, pitta, kapha")
+        
+        snapshot = dataset_loader.get_snapshot()
+        food_df = snapshot.datasets.get("food")
+        if food_df is None or snapshot.food_substitutes is None:
+            raise ModelError("Food dataset is not loaded")
+        
+        substitutes = snapshot.food_substitutes.substitutes(food_df, food_id, k, diet, dosha, strictness)
+        if substitutes is None:
+            return jsonify(APIResponse(
+                success=False,
+                error="Food not found",
+                message=f"No food found with ID: {food_id}"
+            ).dict()), 404
+        
+        return jsonify(APIResponse(
+            success=True,
+            data={
+                "food_id": food_id,
+                "filters": {"diet": diet, "dosha": dosha, "strictness": strictness},
+                "substitutes": substitutes
+            },
+            message=f"Found {len(substitutes)} substitutes"
+        ).dict())
+        
+    except (ValidationError, ModelError) as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Substitute lookup failed for {food_id}: {e}")
+        raise ModelError(f"Failed to find substitutes: {e}")
+
+
+@app.route("/foods/filter", methods=["POST"])
+@app.limiter.limit("10 per minute")
+def filter_foods_for_cohort():
+    """Ranked candidate food IDs for every profile of a cohort"""
+    try:
+        if not request.is_json:
+            raise ValidationError("Content-Type must be application/json")
+        
+        try:
+            request_data = FoodFilterRequest(**request.json)
+        except Exception as e:
+            raise ValidationError(f"Invalid request format: {str(e)}")
+        
+        profiles = request_data.profiles
+        if len(profiles) > settings.BATCH_FILTER_MAX_PROFILES:
+            raise ValidationError(f"At most {settings.BATCH_FILTER_MAX_PROFILES} profiles per request")
+        
+        snapshot = dataset_loader.get_snapshot()
+        food_df = snapshot.datasets.get("food")
+        if food_df is None:
+            raise ModelError("Food dataset is not loaded")
+        
+        dosha_results = request_data.dosha_results
+        if dosha_results is None:
+            # ML only: an LLM call per cohort member is too slow for a preview
+            dosha_results = [
+                dosha_predictor.predict_dosha_ml(profile) or DoshaResult(
+                    dosha="vata",
+                    scores={"vata": 0.4, "pitta": 0.3, "kapha": 0.3},
+                    confidence=0.3,
+                    method="fallback"
+                )
+                for profile in profiles
+            ]
+        
+        ranked = select_candidates_batch(
+            food_df, profiles, [result.dict() for result in dosha_results],
+            max_items=request_data.max_items, top_n=request_data.top_n
+        )
+        
+        id_column = "food_key" if "food_key" in food_df.columns else "Food_Item"
+        food_ids = food_df[id_column].to_numpy(dtype=object)
+        results = [
+            {
+                "patient_id": profile.Patient_ID,
+                "dosha": dosha_result.dosha.value,
+                "food_ids": food_ids[positions].tolist(),
+                "scores": scores.tolist()
+            }
+            for profile, dosha_result, (positions, scores) in zip(profiles, dosha_results, ranked)
+        ]
+        
+        return jsonify(APIResponse(
+            success=True,
+            data={"results": results},
+            message=f"Ranked foods for {len(results)} profiles"
+        ).dict())
+        
+    except (ValidationError, ModelError) as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Cohort food filtering failed: {e}")
+        raise ModelError(f"Failed to filter foods: {e}")
+
+
+@app.route("/cache/candidates", methods=["GET"])
+@app.limiter.limit("20 per minute")
+def get_candidate_cache_stats():
+    """Get hit/miss statistics of the ranked candidate cache"""
+    return jsonify(APIResponse(
+        success=True,
+        data=candidate_cache.stats(),
+        message="Candidate cache statistics retrieved successfully"
+    ).dict())
+
+
+@app.route("/cache/llm", methods=["GET"])
+@app.limiter.limit("20 per minute")
+def get_llm_cache_stats():
+    """Get size and hit/miss statistics of the LLM response cache"""
+    return jsonify(APIResponse(
+        success=True,
+        data=llm_cache.stats(),
+        message="LLM cache statistics retrieved successfully"
+    ).dict())
+
+
+@app.route("/planner/strategies", methods=["GET"])
+@app.limiter.limit("20 per minute")
+def get_planner_strategy_stats():
+    """Get win and latency statistics of the meal plan generation strategies"""
+    return jsonify(APIResponse(
+        success=True,
+        data=meal_planner.strategy_stats.stats(),
+        message="Planner strategy statistics retrieved successfully"
+    ).dict())
+
+
 # Utility endpoints for testing
 @app.route("/test/validate", methods=["POST"])
 @app.limiter.limit("10 per minute")
@@ -752,7 +900,7 @@ if __name__ == "__main__":
         # Test dataset loading
         try:
             datasets = get_datasets()
-            logger.success(f"Datasets loaded: {list(datasets.keys())}")
+            logger.success(f"Datasets loaded: {list(datasets.loaded())}")
         except Exception as e:
             logger.warning(f"Dataset loading failed: {e}")
         
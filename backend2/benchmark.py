@@ -0,0 +1,277 @@
+"""
+Scalability benchmarks for food filtering, scoring and prompt snippets
+
+Synthetic catalogs are bootstrapped from the real food dataset (so
+categories, food groups, macros and dosha effects keep its shape) up to
+any size, and synthetic profiles carry varying allergy, restriction and
+health-condition lists. Each benchmarked function gets latency
+percentiles and peak traced memory per catalog size; results are written
+to a JSON baseline that later runs can be compared against.
+
+    python benchmark.py --sizes 8000 100000 1000000 --output benchmark_baseline.json
+    python benchmark.py --compare benchmark_baseline.json
+"""
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import settings
+from dataset_loader import DatasetLoader
+from exceptions import DatasetError
+from filter_and_score import filter_foods_for_user, make_food_snippet, score_and_rank_foods
+from food_index import get_food_index
+from health_rules import get_health_rules
+from meal_optimizer import MealOptimizer
+from models import UserProfile
+
+
+DEFAULT_SIZES = (8_000, 100_000, 1_000_000)
+
+ALLERGENS = ("peanut", "milk", "egg", "soy", "wheat", "fish", "sesame", "cashew", "coconut", "mustard")
+RESTRICTIONS = ("pickle", "fried", "rice", "sweet", "maida", "onion", "garlic")
+PREFERENCES = (None, "vegetarian", "vegan", "non_vegetarian")
+DOSHAS = ("vata", "pitta", "kapha")
+
+# Relative increase over the baseline that counts as a regression...
+DEFAULT_TOLERANCE = 0.25
+# ...as long as it is also larger than these absolute amounts (noise floor)
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+def synthetic_catalog(rows: int, seed: int = 0, source: Optional[str] = None) -> pd.DataFrame:
+    """
+    A processed food catalog of ``rows`` foods shaped like the source CSV.
+
+    Rows are shuffled passes over the source with macros jittered by up
+    to +-15% and the pass number appended to repeated names, then run
+    through the loader's cleaning so dtypes and derived columns match
+    production.
+    """
+    source = source or settings.FOOD_DATASET_PATH
+    if not os.path.exists(source):
+        raise DatasetError(f"Benchmark source catalog not found: {source}", "FILE_NOT_FOUND")
+
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    # Whole shuffled passes over the source, so names repeat once per pass
+    passes = -(-rows // len(base))
+    picks = np.concatenate([rng.permutation(len(base)) for _ in range(passes)])[:rows]
+    df = base.iloc[picks].reset_index(drop=True)
+
+    for col in ("Calories", "Protein", "Carbs", "Fat"):
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+            df[col] = np.round(values * rng.uniform(0.85, 1.15, rows), 1)
+
+    copy = np.arange(rows) // max(len(base), 1)
+    df["Food_Item"] = np.where(copy > 0, df["Food_Item"].astype(str) + " " + copy.astype(str),
+                               df["Food_Item"].astype(str))
+    return DatasetLoader._process_food_frame(df)
+
+
+def synthetic_profiles(count: int, seed: int = 0) -> List[Dict]:
+    """Profiles with dosha results: 0-3 allergies, 0-2 restrictions and 0-2 health conditions each"""
+    rng = np.random.default_rng(seed)
+    conditions = list(get_health_rules().rules) or ["diabetes"]
+
+    def pick(vocabulary: Sequence[str], most: int) -> str:
+        size = int(rng.integers(0, most + 1))
+        return ", ".join(rng.choice(vocabulary, size, replace=False)) if size else ""
+
+    profiles = []
+    for _ in range(count):
+        profile = UserProfile(
+            Age=int(rng.integers(18, 80)), Gender=str(rng.choice(["male", "female"])),
+            Weight_kg=float(rng.integers(45, 110)), Height_cm=float(rng.integers(150, 190)),
+            Food_preference=PREFERENCES[int(rng.integers(len(PREFERENCES)))],
+            Allergies=pick(ALLERGENS, 3), Dietary_Restrictions=pick(RESTRICTIONS, 2),
+            Health_Conditions=pick(conditions, 2),
+        )
+        weights = rng.dirichlet(np.ones(len(DOSHAS)))
+        dosha_result = {
+            "dosha": DOSHAS[int(np.argmax(weights))],
+            "scores": {dosha: round(float(w), 3) for dosha, w in zip(DOSHAS, weights)},
+        }
+        profiles.append({"profile": profile, "dosha_result": dosha_result})
+    return profiles
+
+
+def measure(run: Callable[[int], object], repeats: int, warmup: int = 1) -> Dict:
+    """
+    Latency percentiles (ms) of ``run(i)`` for i in range(repeats), and the
+    peak memory (MB) traced by tracemalloc over one extra, untimed call.
+    """
+    for i in range(warmup):
+        run(i)
+
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        run(i)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        run(0)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = np.array(timings)
+    return {
+        "repeats": repeats,
+        "mean_ms": round(float(timings.mean()), 3),
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+        "peak_mb": round(peak / 2 ** 20, 3),
+    }
+
+
+def benchmark_catalog(food_df: pd.DataFrame, profiles: List[Dict], repeats: int) -> Dict[str, Dict]:
+    """Benchmark every function over one catalog, rotating through the profiles"""
+    def profile(i: int) -> Dict:
+        return profiles[i % len(profiles)]
+
+    def filtered(i: int) -> pd.DataFrame:
+        entry = profile(i)
+        return filter_foods_for_user(food_df, entry["profile"], entry["dosha_result"]["dosha"], max_items=200)
+
+    results = {}
+    start = time.perf_counter()
+    get_food_index(food_df)
+    results["build_food_index"] = {"repeats": 1, "cold_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    candidates = [filtered(i) for i in range(len(profiles))]
+    ranked = [
+        score_and_rank_foods(candidates[i], profile(i)["profile"], profile(i)["dosha_result"], top_n=100)
+        for i in range(len(profiles))
+    ]
+
+    results["filter_foods_for_user"] = measure(filtered, repeats)
+    results["score_and_rank_foods"] = measure(
+        lambda i: score_and_rank_foods(
+            candidates[i % len(profiles)], profile(i)["profile"], profile(i)["dosha_result"], top_n=100
+        ),
+        repeats,
+    )
+    results["score_and_rank_catalog"] = measure(
+        lambda i: score_and_rank_foods(food_df, profile(i)["profile"], profile(i)["dosha_result"], top_n=100),
+        repeats,
+    )
+    results["make_food_snippet"] = measure(
+        lambda i: make_food_snippet(ranked[i % len(profiles)], n=60, catalog=food_df), repeats
+    )
+    optimizer = MealOptimizer()
+    results["optimize_meal_plan_30_days"] = measure(
+        lambda i: optimizer.optimize(ranked[i % len(profiles)], 2200, days=30,
+                                     dosha=profile(i)["dosha_result"]["dosha"]),
+        repeats,
+    )
+    return results
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES, repeats: int = 20, profiles: int = 50,
+              seed: int = 0, source: Optional[str] = None) -> Dict:
+    """Benchmark every catalog size; results are keyed by function, then catalog size"""
+    cohort = synthetic_profiles(profiles, seed)
+    results: Dict[str, Dict[str, Dict]] = {}
+    for size in sizes:
+        logger.info(f"Benchmarking catalog of {size} foods")
+        food_df = synthetic_catalog(size, seed, source)
+        for name, stats in benchmark_catalog(food_df, cohort, repeats).items():
+            results.setdefault(name, {})[str(size)] = stats
+        del food_df
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "sizes": list(sizes),
+            "repeats": repeats,
+            "profiles": profiles,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """
+    Regressions of ``current`` against ``baseline``: p50/p95 latency or peak
+    memory more than ``tolerance`` above the baseline and above the noise
+    floor. Functions or sizes missing from either run are skipped.
+    """
+    metrics = (("p50_ms", MIN_LATENCY_DELTA_MS), ("p95_ms", MIN_LATENCY_DELTA_MS),
+               ("cold_ms", MIN_LATENCY_DELTA_MS), ("peak_mb", MIN_MEMORY_DELTA_MB))
+    regressions = []
+    for name, by_size in current.get("results", {}).items():
+        for size, stats in by_size.items():
+            before = baseline.get("results", {}).get(name, {}).get(size)
+            if before is None:
+                continue
+            for metric, floor in metrics:
+                if metric not in stats or metric not in before:
+                    continue
+                old, new = before[metric], stats[metric]
+                if new > old * (1 + tolerance) and new - old > floor:
+                    regressions.append({
+                        "function": name, "size": int(size), "metric": metric,
+                        "baseline": old, "current": new,
+                        "change": round(new / old - 1, 3) if old else None,
+                    })
+    return regressions
+
+
+def save_results(results: Dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark filtering and scoring on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--profiles", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--source", default=None, help="CSV the synthetic catalogs are resampled from")
+    parser.add_argument("--output", default=None, help="Write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    results = run_suite(args.sizes, args.repeats, args.profiles, args.seed, args.source)
+    if args.output:
+        save_results(results, args.output)
+    print(json.dumps(results["results"], indent=2))
+
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['function']} @ {regression['size']} rows: "
+                  f"{regression['metric']} {regression['baseline']} -> {regression['current']}")
+        sys.exit(1 if regressions else 0)
@@ -201,34 +201,32 @@ def _fallback_calorie_calculation(user_profile: UserProfile) -> float:
         return 2000.0  # Safe default
 
 
+# Macronutrient distribution (standard ratios) as shares of daily calories
+MACRO_RATIOS = {"protein": 0.25, "carb": 0.45, "fat": 0.30}
+
+# 4 cal/g protein, 4 cal/g carbs, 9 cal/g fat
+CALORIES_PER_GRAM = {"protein": 4, "carb": 4, "fat": 9}
+
+
+def macro_targets(target_calories: float) -> Dict[str, float]:
+    """Calories and grams of each macronutrient for a daily calorie target"""
+    targets = {}
+    for macro, ratio in MACRO_RATIOS.items():
+        calories = target_calories * ratio
+        targets[f"{macro}_calories"] = round(calories, 1)
+        targets[f"{macro}_grams"] = round(calories / CALORIES_PER_GRAM[macro], 1)
+    return targets
+
+
 def get_calorie_breakdown(user_profile: UserProfile) -> Dict[str, float]:
     """Get detailed calorie breakdown including macronutrients"""
     try:
         results = calorie_calculator.calculate_calories_comprehensive(user_profile)
         target_calories = results["target_calories"]
         
-        # Calculate macronutrient distribution (standard ratios)
-        protein_ratio = 0.25  # 25% protein
-        fat_ratio = 0.30      # 30% fat
-        carb_ratio = 0.45     # 45% carbohydrates
-        
-        protein_calories = target_calories * protein_ratio
-        fat_calories = target_calories * fat_ratio
-        carb_calories = target_calories * carb_ratio
-        
-        # Convert to grams (4 cal/g protein, 9 cal/g fat, 4 cal/g carbs)
-        protein_grams = protein_calories / 4
-        fat_grams = fat_calories / 9
-        carb_grams = carb_calories / 4
-        
         breakdown = {
             **results,  # Include all previous results
-            "protein_calories": round(protein_calories, 1),
-            "fat_calories": round(fat_calories, 1),
-            "carb_calories": round(carb_calories, 1),
-            "protein_grams": round(protein_grams, 1),
-            "fat_grams": round(fat_grams, 1),
-            "carb_grams": round(carb_grams, 1)
+            **macro_targets(target_calories)
         }
         
         return breakdown
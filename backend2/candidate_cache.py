@@ -0,0 +1,114 @@
+"""
+LRU cache of ranked food candidates per constraint signature
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import settings
+
+
+class CandidateCache:
+    """
+    Thread-safe LRU cache with a size bound and per-entry TTL.
+
+    Keys combine the dataset snapshot version with a canonical constraint
+    signature, so a reload never serves candidates ranked over an older
+    catalog; entries a catalog delta cannot affect are carried over to
+    the new version (see ``carry``), the rest simply age out.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = settings.CANDIDATE_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl_seconds = settings.CANDIDATE_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries past the size bound"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def carry(self, transform: Callable[[Hashable, Any], Optional[Tuple[Hashable, Any]]]) -> int:
+        """
+        Copy live entries under new keys, keeping their expiry.
+
+        ``transform(key, value)`` returns the (key, value) to store a copy
+        under, or None to leave the entry alone. It runs without the lock
+        held. Returns how many entries were copied.
+        """
+        if not self.enabled:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            entries = [(key, entry) for key, entry in self._entries.items() if entry[0] >= now]
+
+        carried = []
+        for key, (expiry, value) in entries:
+            moved = transform(key, value)
+            if moved is not None:
+                carried.append((expiry, moved))
+
+        with self._lock:
+            for expiry, (key, value) in carried:
+                self._entries[key] = (expiry, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return len(carried)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+# Global candidate cache instance
+candidate_cache = CandidateCache()
@@ -36,13 +36,60 @@ class Settings:
         self.DOSHA_DATASET_PATH = os.getenv("DOSHA_DATASET_PATH", "data/dosha_dataset.csv")
         self.PATIENT_DATASET_PATH = os.getenv("PATIENT_DATASET_PATH", "data/patient_dataset.csv")
         self.LIFESTYLE_DATASET_PATH = os.getenv("LIFESTYLE_DATASET_PATH", "data/lifestyle_dataset.csv")
+        self.HEALTH_RULES_PATH = os.getenv("HEALTH_RULES_PATH", "data/health_condition_rules.csv")
+        
+        # Processed dataset snapshot cache
+        self.DATASET_CACHE_ENABLED = os.getenv("DATASET_CACHE_ENABLED", "True").lower() == "true"
+        self.DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "data/.snapshots")
+        self.PRELOAD_DATASETS = [
+            name.strip() for name in os.getenv("PRELOAD_DATASETS", "food,dosha").split(",") if name.strip()
+        ]
+        self.DATASET_WATCH_INTERVAL = float(os.getenv("DATASET_WATCH_INTERVAL", 0))  # seconds, 0 disables
+        
+        # Streaming ingest for large food catalogs
+        self.FOOD_STREAMING_INGEST = os.getenv("FOOD_STREAMING_INGEST", "False").lower() == "true"
+        self.INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", 50000))
+        self.INGEST_QUARANTINE_DIR = os.getenv("INGEST_QUARANTINE_DIR", "data/quarantine")
+        
+        # Food catalog backend for filtering: "pandas" (in-memory masks) or "sqlite"
+        # (filters pushed down into an SQLite mirror of the in-memory catalog)
+        self.FOOD_CATALOG_BACKEND = os.getenv("FOOD_CATALOG_BACKEND", "pandas").lower()
+        self.FOOD_CATALOG_DB_PATH = os.getenv("FOOD_CATALOG_DB_PATH", "data/.snapshots/food_catalog.sqlite")
+        
+        # Ranked candidate cache (0 entries disables)
+        self.CANDIDATE_CACHE_SIZE = int(os.getenv("CANDIDATE_CACHE_SIZE", 512))
+        self.CANDIDATE_CACHE_TTL = float(os.getenv("CANDIDATE_CACHE_TTL", 3600))  # seconds
+        # Relevance vs. diversity of selected candidates (1.0 = score order only)
+        self.CANDIDATE_DIVERSITY = float(os.getenv("CANDIDATE_DIVERSITY", 0.7))
+        # Bucket dosha weights to this step in candidate cache keys (0 = exact weights).
+        # Bucketing shares one patient's ranking with others in the same bucket.
+        self.CANDIDATE_DOSHA_SCORE_STEP = float(os.getenv("CANDIDATE_DOSHA_SCORE_STEP", 0))
+        # Bulk /foods/filter: largest cohort per request, worker processes (0 = in-process)
+        self.BATCH_FILTER_MAX_PROFILES = int(os.getenv("BATCH_FILTER_MAX_PROFILES", 1000))
+        self.BATCH_FILTER_PROCESSES = int(os.getenv("BATCH_FILTER_PROCESSES", 0))
         
         # LLM settings
         self.DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4")
         self.MAX_TOKENS = int(os.getenv("MAX_TOKENS", 2000))
         self.TEMPERATURE = float(os.getenv("TEMPERATURE", 0.7))
+        # "llm" tries the LLM strategies first; "local" only runs the local optimizer
+        self.MEAL_PLAN_STRATEGY = os.getenv("MEAL_PLAN_STRATEGY", "llm").lower()
+        # Persistent cache of parsed LLM responses (0 entries disables)
+        self.LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/.snapshots/llm_cache.sqlite")
+        self.LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", 2000))
+        self.LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))  # seconds
+        # Seconds without a valid plan before the next LLM strategy is started
+        # alongside the running one (0 = strictly one after another)
+        self.PLANNER_HEDGE_DELAY = float(os.getenv("PLANNER_HEDGE_DELAY", 0))
         self.FOOD_SNIPPET_ROWS = int(os.getenv("FOOD_SNIPPET_ROWS", 60))
         
+        # Prompt packing (token counts are local estimates)
+        self.LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 8192))
+        self.PROMPT_FOOD_TOKEN_BUDGET = int(os.getenv("PROMPT_FOOD_TOKEN_BUDGET", 2500))
+        self.PROMPT_FOODS_PER_DAY = int(os.getenv("PROMPT_FOODS_PER_DAY", 12))
+        self.PROMPT_CATEGORY_QUOTA = int(os.getenv("PROMPT_CATEGORY_QUOTA", 3))
+        self.PROMPT_TOKEN_SCALE = float(os.getenv("PROMPT_TOKEN_SCALE", 1.0))
+        
         # Rate limiting
         self.RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", 30))
         self.RATE_LIMIT_PER_HOUR = int(os.getenv("RATE_LIMIT_PER_HOUR", 500))
@@ -0,0 +1,229 @@
+"""
+Binary columnar snapshot cache for processed datasets
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import settings
+
+
+# Bump whenever the on-disk layout or the loader's processing changes,
+# so snapshots written by older code are never picked up.
+CACHE_FORMAT_VERSION = 2
+
+
+class SnapshotCache:
+    """
+    Stores fully processed DataFrames as one .npy file per column.
+
+    Snapshots are keyed by the SHA-256 of the source CSV, so a changed file
+    simply misses the cache and gets re-processed. Numeric and boolean
+    columns are memory-mapped on load; text columns are stored as
+    fixed-width unicode arrays with a separate null mask, and categoricals
+    as their codes with the categories kept in the metadata.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, enabled: Optional[bool] = None):
+        self.cache_dir = cache_dir or settings.DATASET_CACHE_DIR
+        self.enabled = settings.DATASET_CACHE_ENABLED if enabled is None else enabled
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """Compute the SHA-256 of a file's content"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def snapshot_dir(self, name: str, content_hash: str) -> str:
+        """Directory holding the snapshot for a dataset/content pair"""
+        return os.path.join(
+            self.cache_dir, f"{name}-v{CACHE_FORMAT_VERSION}-{content_hash[:16]}"
+        )
+
+    def load(self, name: str, content_hash: str) -> Optional[pd.DataFrame]:
+        """Load a snapshot, returning None on a miss or unreadable snapshot"""
+        if not self.enabled:
+            return None
+
+        snap_dir = self.snapshot_dir(name, content_hash)
+        meta_path = os.path.join(snap_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+
+        try:
+            with open(meta_path, "r") as fh:
+                meta = json.load(fh)
+
+            if meta.get("content_hash") != content_hash:
+                return None
+
+            columns = {}
+            for i, col in enumerate(meta["columns"]):
+                columns[col["name"]] = self._read_column(snap_dir, i, col)
+
+            # No copy: numeric columns stay backed by the memory-mapped files
+            df = pd.DataFrame(columns, copy=False)
+            if len(df) != meta["rows"]:
+                logger.warning(f"Snapshot row count mismatch for {name}, ignoring snapshot")
+                return None
+            df.attrs.update(meta.get("attrs", {}))
+
+            logger.debug(f"Snapshot hit for {name} dataset: {snap_dir}")
+            return df
+
+        except Exception as e:
+            logger.warning(f"Failed to read {name} snapshot, falling back to CSV: {e}")
+            return None
+
+    def store(self, name: str, content_hash: str, df: pd.DataFrame) -> bool:
+        """Write a snapshot atomically; returns False if the frame can't be cached"""
+        if not self.enabled:
+            return False
+
+        if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+            logger.debug(f"Not caching {name} dataset: non-default index")
+            return False
+
+        snap_dir = self.snapshot_dir(name, content_hash)
+        if os.path.exists(os.path.join(snap_dir, "meta.json")):
+            return True
+
+        tmp_dir = None
+        try:
+            tmp_dir = self.staging_dir(name)
+
+            columns = []
+            for i, col_name in enumerate(df.columns):
+                col_meta = self._write_column(tmp_dir, i, col_name, df[col_name])
+                if col_meta is None:
+                    logger.debug(f"Not caching {name} dataset: unsupported column {col_name}")
+                    return False
+                columns.append(col_meta)
+
+            self.publish(name, content_hash, tmp_dir, len(df), columns, df.attrs)
+            tmp_dir = None
+            return True
+
+        except Exception as e:
+            logger.warning(f"Failed to write {name} snapshot: {e}")
+            return False
+        finally:
+            if tmp_dir and os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def staging_dir(self, name: str) -> str:
+        """Create a private directory to write a snapshot's column files into"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._ensure_gitignore()
+        return tempfile.mkdtemp(prefix=f".{name}-", dir=self.cache_dir)
+
+    def publish(self, name: str, content_hash: str, staging: str, rows: int,
+                columns: List[Dict], attrs: Optional[Dict] = None) -> str:
+        """
+        Write the metadata into a staging directory and move it into place.
+
+        ``columns`` holds one entry per ``col{i}.npy`` file, as returned by
+        ``_write_column``. The staging directory is consumed either way.
+        """
+        snap_dir = self.snapshot_dir(name, content_hash)
+        meta = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "content_hash": content_hash,
+            "rows": int(rows),
+            "columns": columns,
+            "attrs": dict(attrs or {}),
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as fh:
+            json.dump(meta, fh)
+
+        try:
+            os.replace(staging, snap_dir)
+        except OSError:
+            # Another worker published the same snapshot first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(os.path.join(snap_dir, "meta.json")):
+                raise
+
+        self._prune(name, keep=snap_dir)
+        logger.info(f"Wrote {name} dataset snapshot: {snap_dir}")
+        return snap_dir
+
+    @staticmethod
+    def _write_column(directory: str, position: int, name: str, series: pd.Series) -> Optional[Dict]:
+        """Write a single column and return its metadata entry"""
+        base = os.path.join(directory, f"col{position}")
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if categories.dtype != object or not all(isinstance(c, str) for c in categories):
+                return None
+            np.save(f"{base}.npy", series.cat.codes.to_numpy())
+            return {"name": name, "kind": "category", "categories": list(categories),
+                    "ordered": bool(series.cat.ordered)}
+
+        if series.dtype == object:
+            nulls = series.isna().to_numpy()
+            values = series[~nulls]
+            if not values.map(lambda v: isinstance(v, str)).all():
+                return None
+            np.save(f"{base}.npy", series.fillna("").to_numpy(dtype=str))
+            if nulls.any():
+                np.save(f"{base}.null.npy", nulls)
+            return {"name": name, "kind": "string", "has_nulls": bool(nulls.any())}
+
+        if series.dtype == bool or pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.to_numpy()
+            if values.dtype == object:
+                return None
+            np.save(f"{base}.npy", values)
+            return {"name": name, "kind": "numeric"}
+
+        return None
+
+    @staticmethod
+    def _read_column(directory: str, position: int, meta: Dict):
+        """Read a single column written by _write_column"""
+        base = os.path.join(directory, f"col{position}")
+        values = np.load(f"{base}.npy", mmap_mode="r")
+
+        if meta["kind"] == "category":
+            return pd.Categorical.from_codes(np.asarray(values), categories=meta["categories"],
+                                             ordered=meta["ordered"])
+
+        if meta["kind"] == "string":
+            values = values.astype(object)
+            if meta.get("has_nulls"):
+                values[np.load(f"{base}.null.npy")] = np.nan
+            return values
+
+        # A plain ndarray view of the mapping, so pandas sees no subclass
+        return np.asarray(values)
+
+    def _prune(self, name: str, keep: str) -> None:
+        """Remove stale snapshots of the same dataset"""
+        prefix = f"{name}-v"
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if entry.startswith(prefix) and path != keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _ensure_gitignore(self) -> None:
+        """Keep generated snapshots out of version control"""
+        path = os.path.join(self.cache_dir, ".gitignore")
+        if not os.path.exists(path):
+            with open(path, "w") as fh:
+                fh.write("*\n")
+
+
+# Global snapshot cache instance
+snapshot_cache = SnapshotCache()
@@ -1,24 +1,292 @@
 """
 Enhanced dataset loader with validation, caching, and error handling
 """
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Optional
-from functools import lru_cache
+import threading
+from datetime import datetime, timezone
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from functools import lru_cache, partial
 from loguru import logger
 from config import settings
 from exceptions import DatasetError
+from dataset_cache import snapshot_cache
+from food_index import CatalogDelta, FoodIndex, diff_catalogs, get_food_index, register_food_index
+from filter_and_score import carry_candidates, start_batch_pool
+from food_snippets import SnippetLines, get_snippet_lines, register_snippet_lines
+from health_rules import ConditionMasks, HealthRules, activate_health_rules, read_health_rules
+from substitutes import get_substitute_index
 
 
 # Mapping for Dosha text values in food
 DOSHA_MAP = {"decreases": -1, "neutral": 0, "increases": 1}
 
 
+# Datasets a snapshot cannot be published without
+CRITICAL_DATASETS = ("food", "dosha")
+
+# Above this share of added/edited food rows a reload rebuilds the index from scratch
+MAX_DELTA_FRACTION = 0.5
+
+# Compact dtypes for the food catalog's numeric columns
+FOOD_COLUMN_DTYPES = {
+    "Dosha_Vata": np.int8,
+    "Dosha_Pitta": np.int8,
+    "Dosha_Kapha": np.int8,
+    "Calories": np.float32,
+    "Protein": np.float32,
+    "Carbs": np.float32,
+    "Fat": np.float32,
+    "Fat_Adjusted": np.float32,
+}
+
+# Food columns looked up by value, never converted to categoricals
+FOOD_KEY_COLUMNS = ("Food_Item", "food_key")
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+CATEGORICAL_MAX_CATEGORIES = 65536
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """Deep memory footprint of a frame in MB"""
+    return round(df.memory_usage(deep=True).sum() / 1024**2, 2)
+
+
+def is_low_cardinality(n_unique: int, n_rows: int) -> bool:
+    """Whether a text column with this many distinct values should be categorical"""
+    return 0 < n_unique <= min(CATEGORICAL_MAX_UNIQUE_RATIO * n_rows, CATEGORICAL_MAX_CATEGORIES)
+
+
+def compute_dataset_stats(df: pd.DataFrame) -> Dict:
+    """Summary statistics served by /datasets/info"""
+    stats = {
+        "shape": df.shape,
+        "columns": list(df.columns),
+        "memory_usage_mb": frame_memory_mb(df),
+        "null_counts": {col: int(n) for col, n in df.isnull().sum().items()}
+    }
+    if "memory_uncompacted_mb" in df.attrs:
+        stats["memory_uncompacted_mb"] = df.attrs["memory_uncompacted_mb"]
+    return stats
+
+
+def compact_frame(name: str, df: pd.DataFrame, dtypes: Optional[Dict] = None,
+                  keep_object: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Shrink a processed frame's dtypes and report the memory saved.
+    
+    Columns named in ``dtypes`` are cast to the given dtype; remaining
+    text columns become categoricals when few of their values are
+    distinct, except those in ``keep_object`` (keys looked up by value).
+    The footprint before compaction is kept in ``df.attrs``.
+    """
+    before = frame_memory_mb(df)
+    keep_object = set(keep_object)
+    
+    for col, dtype in (dtypes or {}).items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    
+    for col in df.columns:
+        if col in keep_object or df[col].dtype != object:
+            continue
+        values = df[col]
+        if is_low_cardinality(values.nunique(), len(values)) \
+                and values.dropna().map(type).eq(str).all():
+            df[col] = values.astype("category")
+    
+    after = frame_memory_mb(df)
+    df.attrs["memory_uncompacted_mb"] = before
+    logger.info(f"Compacted {name} dataset: {before} MB -> {after} MB")
+    return df
+
+
+class DatasetHandle:
+    """Loads a single dataset on first access and keeps the result"""
+    
+    def __init__(self, name: str, reader: Callable[[], pd.DataFrame]):
+        self.name = name
+        self._reader = reader
+        self._lock = threading.Lock()
+        self._df: Optional[pd.DataFrame] = None
+        self._error: Optional[DatasetError] = None
+        self.stats: Optional[Dict] = None
+    
+    @property
+    def loaded(self) -> bool:
+        return self._df is not None
+    
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+    
+    def get(self) -> pd.DataFrame:
+        """Return the dataset, loading it if needed; raises DatasetError on failure"""
+        if self._df is not None:
+            return self._df
+        
+        with self._lock:
+            if self._df is None and self._error is None:
+                try:
+                    df = self._reader()
+                    # Computed once per load; memory_usage(deep=True) walks every string
+                    self.stats = compute_dataset_stats(df)
+                    self._df = df
+                except DatasetError as e:
+                    logger.error(f"Failed to load {self.name} dataset: {e.message}")
+                    self._error = e
+        
+        if self._error is not None:
+            raise self._error
+        return self._df
+    
+    def try_get(self) -> Optional[pd.DataFrame]:
+        """Like get(), but returns None instead of raising"""
+        try:
+            return self.get()
+        except DatasetError:
+            return None
+
+
+class LazyDatasets(Mapping):
+    """
+    Read-only mapping of dataset name to frame, loading each on first access.
+    
+    Datasets that failed to load behave as missing keys, matching the old
+    eager dict, so ``datasets.get("patient")`` returns None.
+    """
+    
+    def __init__(self, handles: Dict[str, DatasetHandle]):
+        self._handles = dict(handles)
+    
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        handle = self._handles.get(name)
+        df = handle.try_get() if handle is not None else None
+        if df is None:
+            raise KeyError(name)
+        return df
+    
+    def __iter__(self) -> Iterator[str]:
+        for name, handle in self._handles.items():
+            if handle.try_get() is not None:
+                yield name
+    
+    def __len__(self) -> int:
+        # Same datasets as iteration, so it may load the ones not yet tried;
+        # use loaded() to count without loading
+        return sum(1 for _ in self)
+    
+    def loaded(self) -> Dict[str, pd.DataFrame]:
+        """Datasets loaded so far, without triggering any loads"""
+        return {name: h.get() for name, h in self._handles.items() if h.loaded}
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Precomputed statistics per dataset, without triggering any loads"""
+        info = {}
+        for name, handle in self._handles.items():
+            if handle.loaded:
+                info[name] = {"loaded": True, **handle.stats}
+            elif not handle.failed:
+                info[name] = {"loaded": False}
+        return info
+
+
+class DatasetSnapshot:
+    """
+    Immutable set of loaded datasets and their derived indexes.
+    
+    Snapshots are never modified after construction; a reload builds a
+    new one and swaps it in. Frames inside a snapshot must be treated as
+    read-only. Non-critical datasets are loaded lazily on first access.
+    """
+    
+    def __init__(self, version: int, datasets: Mapping,
+                 source_mtimes: Optional[Dict[str, float]] = None,
+                 food_delta: Optional[CatalogDelta] = None,
+                 previous: Optional["DatasetSnapshot"] = None):
+        self.version = version
+        if not isinstance(datasets, LazyDatasets):
+            handles = {name: DatasetHandle(name, lambda df=df: df) for name, df in datasets.items()}
+            datasets = LazyDatasets(handles)
+            list(datasets)
+        self.datasets = datasets
+        self.source_mtimes = dict(source_mtimes or {})
+        self.loaded_at = datetime.now(timezone.utc)
+        
+        # Food rows changed since the previous snapshot, when it was diffed
+        # against one (its index, prompt lines and health masks were then
+        # patched rather than rebuilt)
+        self.food_delta = food_delta
+        if food_delta is None:
+            previous = None
+        
+        # Read now, made the active rule set only when this snapshot is published
+        self.health_rules: HealthRules = read_health_rules()
+        
+        # Derived indexes are built eagerly so the swap publishes them too
+        food_df = self.datasets.get("food")
+        self.food_index = get_food_index(food_df) if food_df is not None else None
+        if self.food_index is not None:
+            self.food_index.snapshot_version = version
+            self.food_index.condition_masks = self._compile_health_rules(previous)
+        self.food_snippets = get_snippet_lines(food_df) if food_df is not None else None
+        self.food_substitutes = get_substitute_index(food_df) if food_df is not None else None
+        
+        # Cached rankings the delta cannot have changed stay valid
+        if previous is not None and self.food_index is not None:
+            try:
+                carry_candidates(previous.datasets["food"], food_df, food_delta.row_map)
+            except Exception as e:
+                logger.warning(f"Failed to carry cached candidates over: {e}")
+        
+        # Bulk filtering workers hold this snapshot's catalog for its lifetime
+        if (food_df is not None and settings.BATCH_FILTER_PROCESSES > 1
+                and settings.FOOD_CATALOG_BACKEND != "sqlite"):
+            start_batch_pool(food_df, settings.BATCH_FILTER_PROCESSES)
+    
+    def _compile_health_rules(self, previous: Optional["DatasetSnapshot"] = None) -> ConditionMasks:
+        """
+        Compile this snapshot's health rules, precomputing the patient dataset's
+        conditions when it is preloaded (other conditions compile on first use).
+        Unchanged rows reuse the ``previous`` snapshot's masks.
+        """
+        rules = self.health_rules
+        patient_df = self.datasets.loaded().get("patient")
+        diseases = []
+        if patient_df is not None and "Disease" in patient_df.columns:
+            diseases = patient_df["Disease"].dropna().astype(str).unique().tolist()
+        
+        if previous is not None and previous.food_index.condition_masks is not None:
+            masks = ConditionMasks.from_delta(previous.food_index.condition_masks, self.food_index,
+                                              rules, self.food_delta.row_map, diseases)
+        else:
+            masks = ConditionMasks(self.food_index, rules, diseases)
+        if diseases:
+            uncovered = rules.uncovered(diseases)
+            logger.info(f"Health rules cover {len(diseases) - len(uncovered)}/{len(diseases)} "
+                        f"patient dataset conditions")
+        return masks
+    
+    def dataset_info(self) -> Dict[str, Dict]:
+        """Statistics for this snapshot's datasets, computed once at load time"""
+        return {name: {**details, "snapshot_version": self.version}
+                for name, details in self.datasets.stats().items()}
+
+
 class DatasetLoader:
     """Enhanced dataset loader with caching and validation"""
     
     def __init__(self):
         self._cache = {}
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._version = 0
+        self._build_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
     
     @staticmethod
     def _validate_file_exists(path: str) -> None:
@@ -37,60 +305,116 @@ class DatasetLoader:
                     logger.warning(f"Failed to convert {col} to numeric: {e}")
         return df
     
-    @lru_cache(maxsize=4)
-    def load_food_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
-        """Load and process food dataset with caching"""
+    @classmethod
+    def _process_food_frame(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply cleaning, derived columns and compact dtypes to a raw food frame"""
+        df = cls._clean_food_frame(df)
+        return compact_frame("food", df, FOOD_COLUMN_DTYPES, keep_object=FOOD_KEY_COLUMNS)
+    
+    @classmethod
+    def _clean_food_frame(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Apply cleaning and derived columns to a raw food frame"""
+        # Clean column names
+        df.columns = [c.strip() for c in df.columns]
+        
+        # Convert numeric columns safely
+        numeric_cols = ["Calories", "Protein", "Carbs", "Fat"]
+        df = cls._safe_numeric_conversion(df, numeric_cols)
+        
+        # Process dosha mappings
+        for dosha in ["Vata", "Pitta", "Kapha"]:
+            col = f"Dosha_{dosha}"
+            if col in df.columns:
+                df[col] = (df[col]
+                          .fillna("neutral")
+                          .astype(str)
+                          .str.lower()
+                          .str.strip()
+                          .map(DOSHA_MAP)
+                          .fillna(0))
+        
+        # Create dietary flags
+        df["is_veg"] = (df.get("Vegetarian", "")
+                       .astype(str)
+                       .str.lower()
+                       .isin(["yes", "true", "y", "1"]))
+        
+        df["is_vegan"] = (df.get("Vegan", "")
+                         .astype(str)
+                         .str.lower()
+                         .isin(["yes", "true", "y", "1"]))
+        
+        # Create searchable food key
+        df["food_key"] = (df["Food_Item"]
+                         .astype(str)
+                         .str.strip()
+                         .str.lower())
+        
+        # Validate essential columns
+        required_cols = ["Food_Item", "Calories"]
+        missing_cols = [col for col in required_cols if col not in df.columns]
+        if missing_cols:
+            raise DatasetError(
+                f"Missing required columns in food dataset: {missing_cols}",
+                "MISSING_COLUMNS"
+            )
+        
+        return df
+    
+    @staticmethod
+    def _process_dosha_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Clean and validate a raw dosha frame"""
+        df.columns = [c.strip() for c in df.columns]
+        
+        # Validate dosha column exists
+        if "Dosha" not in df.columns:
+            raise DatasetError("Missing 'Dosha' column", "MISSING_COLUMNS")
+        
+        return compact_frame("dosha", df)
+    
+    @staticmethod
+    def _load_cached_frame(name: str, path: str, process) -> pd.DataFrame:
+        """Serve a processed frame from the snapshot cache, rebuilding from CSV on a miss"""
+        content_hash = snapshot_cache.file_hash(path)
+        
+        df = snapshot_cache.load(name, content_hash)
+        if df is not None:
+            logger.info(f"Loaded {name} dataset from snapshot cache")
+            return df
+        
+        df = process(pd.read_csv(path))
+        snapshot_cache.store(name, content_hash, df)
+        return df
+    
+    @staticmethod
+    def _load_streamed_food_frame(path: str) -> pd.DataFrame:
+        """Serve the food frame from its snapshot, producing it with the streaming ingest on a miss"""
+        from food_ingest import ingest_food_csv
+        
+        content_hash = snapshot_cache.file_hash(path)
+        df = snapshot_cache.load("food", content_hash)
+        if df is None:
+            ingest_food_csv(path, cache=snapshot_cache, content_hash=content_hash)
+            df = snapshot_cache.load("food", content_hash)
+        if df is None:
+            raise DatasetError(f"Streaming ingest left no readable snapshot for {path}", "INGEST_FAILED")
+        return df
+    
+    def _read_food_dataset(self, path: Optional[str] = None, build_index: bool = True) -> pd.DataFrame:
+        """Load and process food dataset with caching, bypassing the in-process cache"""
         path = path or settings.FOOD_DATASET_PATH
         logger.info(f"Loading food dataset from: {path}")
         
         try:
             self._validate_file_exists(path)
-            df = pd.read_csv(path)
-            
-            # Clean column names
-            df.columns = [c.strip() for c in df.columns]
-            
-            # Convert numeric columns safely
-            numeric_cols = ["Calories", "Protein", "Carbs", "Fat"]
-            df = self._safe_numeric_conversion(df, numeric_cols)
+            if settings.FOOD_STREAMING_INGEST and snapshot_cache.enabled:
+                df = self._load_streamed_food_frame(path)
+            else:
+                df = self._load_cached_frame("food", path, self._process_food_frame)
             
-            # Process dosha mappings
-            for dosha in ["Vata", "Pitta", "Kapha"]:
-                col = f"Dosha_{dosha}"
-                if col in df.columns:
-                    df[col] = (df[col]
-                              .fillna("neutral")
-                              .astype(str)
-                              .str.lower()
-                              .str.strip()
-                              .map(DOSHA_MAP)
-                              .fillna(0))
-            
-            # Create dietary flags
-            df["is_veg"] = (df.get("Vegetarian", "")
-                           .astype(str)
-                           .str.lower()
-                           .isin(["yes", "true", "y", "1"]))
-            
-            df["is_vegan"] = (df.get("Vegan", "")
-                             .astype(str)
-                             .str.lower()
-                             .isin(["yes", "true", "y", "1"]))
-            
-            # Create searchable food key
-            df["food_key"] = (df["Food_Item"]
-                             .astype(str)
-                             .str.strip()
-                             .str.lower())
-            
-            # Validate essential columns
-            required_cols = ["Food_Item", "Calories"]
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            if missing_cols:
-                raise DatasetError(
-                    f"Missing required columns in food dataset: {missing_cols}",
-                    "MISSING_COLUMNS"
-                )
+            # Build the filtering index once, alongside the frame it describes
+            if build_index:
+                get_food_index(df)
             
             logger.success(f"Loaded food dataset: {df.shape[0]} items")
             return df
@@ -99,20 +423,14 @@ class DatasetLoader:
             logger.error(f"Failed to load food dataset: {e}")
             raise DatasetError(f"Failed to load food dataset: {e}", "LOAD_FAILED")
     
-    @lru_cache(maxsize=4)
-    def load_dosha_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
-        """Load dosha dataset with validation"""
+    def _read_dosha_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load dosha dataset with validation, bypassing the in-process cache"""
         path = path or settings.DOSHA_DATASET_PATH
         logger.info(f"Loading dosha dataset from: {path}")
         
         try:
             self._validate_file_exists(path)
-            df = pd.read_csv(path)
-            df.columns = [c.strip() for c in df.columns]
-            
-            # Validate dosha column exists
-            if "Dosha" not in df.columns:
-                raise DatasetError("Missing 'Dosha' column", "MISSING_COLUMNS")
+            df = self._load_cached_frame("dosha", path, self._process_dosha_frame)
             
             logger.success(f"Loaded dosha dataset: {df.shape[0]} records")
             return df
@@ -121,9 +439,8 @@ class DatasetLoader:
             logger.error(f"Failed to load dosha dataset: {e}")
             raise DatasetError(f"Failed to load dosha dataset: {e}", "LOAD_FAILED")
     
-    @lru_cache(maxsize=4)
-    def load_patient_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
-        """Load patient dataset with validation"""
+    def _read_patient_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load patient dataset with validation, bypassing the in-process cache"""
         path = path or settings.PATIENT_DATASET_PATH
         logger.info(f"Loading patient dataset from: {path}")
         
@@ -143,6 +460,8 @@ class DatasetLoader:
                                    .str.strip()
                                    .str.lower())
             
+            df = compact_frame("patient", df, keep_object=("Patient_ID", "patient_key"))
+            
             logger.success(f"Loaded patient dataset: {df.shape[0]} records")
             return df
             
@@ -150,9 +469,8 @@ class DatasetLoader:
             logger.error(f"Failed to load patient dataset: {e}")
             raise DatasetError(f"Failed to load patient dataset: {e}", "LOAD_FAILED")
     
-    @lru_cache(maxsize=4)
-    def load_lifestyle_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
-        """Load lifestyle dataset with validation"""
+    def _read_lifestyle_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load lifestyle dataset with validation, bypassing the in-process cache"""
         path = path or settings.LIFESTYLE_DATASET_PATH
         logger.info(f"Loading lifestyle dataset from: {path}")
         
@@ -173,6 +491,8 @@ class DatasetLoader:
                                    .str.strip()
                                    .str.lower())
             
+            df = compact_frame("lifestyle", df, keep_object=("Patient_ID", "patient_key"))
+            
             logger.success(f"Loaded lifestyle dataset: {df.shape[0]} records")
             return df
             
@@ -180,54 +500,201 @@ class DatasetLoader:
             logger.error(f"Failed to load lifestyle dataset: {e}")
             raise DatasetError(f"Failed to load lifestyle dataset: {e}", "LOAD_FAILED")
     
-    def load_all_datasets(self) -> Dict[str, pd.DataFrame]:
-        """Load all datasets with comprehensive error handling"""
-        logger.info("Loading all datasets...")
+    @lru_cache(maxsize=4)
+    def load_food_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load and process food dataset with caching"""
+        return self._read_food_dataset(path)
+    
+    @lru_cache(maxsize=4)
+    def load_dosha_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load dosha dataset with validation"""
+        return self._read_dosha_dataset(path)
+    
+    @lru_cache(maxsize=4)
+    def load_patient_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load patient dataset with validation"""
+        return self._read_patient_dataset(path)
+    
+    @lru_cache(maxsize=4)
+    def load_lifestyle_dataset(self, path: Optional[str] = None) -> pd.DataFrame:
+        """Load lifestyle dataset with validation"""
+        return self._read_lifestyle_dataset(path)
+    
+    def _dataset_readers(self) -> Dict[str, Callable[[], pd.DataFrame]]:
+        """Uncached readers for every dataset, keyed by dataset name"""
+        return {
+            "food": self._read_food_dataset,
+            "dosha": self._read_dosha_dataset,
+            "patient": self._read_patient_dataset,
+            "lifestyle": self._read_lifestyle_dataset
+        }
+    
+    @staticmethod
+    def _source_paths() -> Dict[str, str]:
+        """CSV path backing each dataset"""
+        return {
+            "food": settings.FOOD_DATASET_PATH,
+            "dosha": settings.DOSHA_DATASET_PATH,
+            "patient": settings.PATIENT_DATASET_PATH,
+            "lifestyle": settings.LIFESTYLE_DATASET_PATH,
+            # Not a dataset, but compiled into every snapshot
+            "health_rules": settings.HEALTH_RULES_PATH
+        }
+    
+    def build_snapshot(self, preload: Optional[Iterable[str]] = None,
+                       previous: Optional[DatasetSnapshot] = None) -> DatasetSnapshot:
+        """
+        Build a new, unpublished snapshot.
         
-        datasets = {}
-        errors = []
+        Datasets named in ``preload`` (default: settings.PRELOAD_DATASETS
+        plus the critical ones) are loaded concurrently right away; the
+        rest load on first access. Given the ``previous`` snapshot, the
+        food index, prompt lines and health masks are updated from the rows
+        that changed since then, and cached rankings those rows cannot
+        affect are carried over.
+        """
+        readers = self._dataset_readers()
+        if previous is not None and previous.food_index is not None:
+            readers["food"] = partial(self._read_food_dataset, build_index=False)
+        handles = {name: DatasetHandle(name, reader) for name, reader in readers.items()}
         
-        dataset_loaders = {
-            "food": self.load_food_dataset,
-            "dosha": self.load_dosha_dataset,
-            "patient": self.load_patient_dataset,
-            "lifestyle": self.load_lifestyle_dataset
-        }
+        names = list(settings.PRELOAD_DATASETS if preload is None else preload)
+        names += [name for name in CRITICAL_DATASETS if name not in names]
+        names = [name for name in names if name in handles]
+        logger.info(f"Loading datasets: {', '.join(names)}")
         
-        for name, loader in dataset_loaders.items():
-            try:
-                datasets[name] = loader()
-            except DatasetError as e:
-                logger.error(f"Failed to load {name} dataset: {e.message}")
-                errors.append(f"{name}: {e.message}")
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="dataset-load") as pool:
+            list(pool.map(lambda name: handles[name].try_get(), names))
         
-        if not datasets.get("food") or not datasets.get("dosha"):
+        if any(handles[name].failed for name in CRITICAL_DATASETS):
             raise DatasetError(
                 "Critical datasets (food, dosha) failed to load",
                 "CRITICAL_DATASETS_MISSING"
             )
         
-        if errors:
-            logger.warning(f"Some datasets failed to load: {errors}")
+        with self._build_lock:
+            self._version += 1
+            version = self._version
+        
+        food_delta = None
+        if previous is not None and previous.food_index is not None:
+            food_delta = self._apply_food_delta(previous, handles["food"].get())
         
-        logger.success(f"Successfully loaded {len(datasets)} datasets")
-        return datasets
+        snapshot = DatasetSnapshot(version, LazyDatasets(handles), self._source_mtimes(), food_delta, previous)
+        logger.success(f"Built dataset snapshot v{version} ({len(names)} datasets preloaded)")
+        return snapshot
     
-    def get_dataset_info(self) -> Dict[str, Dict]:
-        """Get information about loaded datasets"""
+    @staticmethod
+    def _apply_food_delta(previous: DatasetSnapshot, food_df: pd.DataFrame) -> Optional[CatalogDelta]:
+        """Index a reloaded food frame from its diff against the previous snapshot"""
         try:
-            datasets = self.load_all_datasets()
-            info = {}
+            delta = diff_catalogs(previous.datasets["food"], food_df)
+            if delta is None or delta.fresh_fraction > MAX_DELTA_FRACTION:
+                logger.info("Food catalog changed wholesale, rebuilding its index")
+                return None
             
-            for name, df in datasets.items():
-                info[name] = {
-                    "shape": df.shape,
-                    "columns": list(df.columns),
-                    "memory_usage_mb": round(df.memory_usage(deep=True).sum() / 1024**2, 2),
-                    "null_counts": df.isnull().sum().to_dict()
-                }
+            register_food_index(food_df, FoodIndex.from_delta(previous.food_index, food_df, delta.row_map))
+            if previous.food_snippets is not None:
+                register_snippet_lines(food_df, SnippetLines.from_delta(previous.food_snippets, food_df,
+                                                                        delta.row_map))
+        except Exception as e:
+            logger.warning(f"Failed to apply food catalog delta, rebuilding its index: {e}")
+            return None
+        
+        logger.info(f"Applied food catalog delta: {len(delta.added)} added, "
+                    f"{len(delta.changed)} changed, {len(delta.removed)} removed")
+        return delta
+    
+    def _source_mtimes(self) -> Dict[str, float]:
+        """Modification times of the dataset files, for change detection"""
+        mtimes = {}
+        for name, path in self._source_paths().items():
+            try:
+                mtimes[name] = os.path.getmtime(path)
+            except OSError:
+                mtimes[name] = None
+        return mtimes
+    
+    def get_snapshot(self) -> DatasetSnapshot:
+        """
+        Return the active snapshot, loading it on first use.
+        
+        Readers never lock: the active snapshot is swapped by a single
+        reference assignment, so a request that grabbed a snapshot keeps
+        using it even if a reload publishes a newer one meanwhile.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        
+        with self._reload_lock:
+            if self._snapshot is None:
+                self._publish(self.build_snapshot())
+            return self._snapshot
+    
+    def _publish(self, snapshot: DatasetSnapshot) -> None:
+        """Make a built snapshot, and the health rules it was compiled with, active"""
+        activate_health_rules(snapshot.health_rules)
+        self._snapshot = snapshot
+    
+    def reload(self) -> bool:
+        """Build a fresh snapshot and publish it; the old one stays active on failure"""
+        with self._reload_lock:
+            try:
+                snapshot = self.build_snapshot(previous=self._snapshot)
+            except Exception as e:
+                logger.error(f"Dataset reload failed, keeping current snapshot: {e}")
+                return False
             
-            return info
+            previous = self._snapshot
+            self._publish(snapshot)
+            logger.success(
+                f"Dataset snapshot v{snapshot.version} is now active"
+                + (f" (replaced v{previous.version})" if previous else "")
+            )
+            return True
+    
+    def reload_in_background(self) -> Optional[threading.Thread]:
+        """Rebuild the snapshot on a background thread; no-op if one is already running"""
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            logger.info("Dataset reload already in progress")
+            return None
+        
+        self._reload_thread = threading.Thread(
+            target=self.reload, name="dataset-reload", daemon=True
+        )
+        self._reload_thread.start()
+        return self._reload_thread
+    
+    def start_watcher(self, interval: float, stop_event: threading.Event) -> threading.Thread:
+        """Poll dataset files every ``interval`` seconds and reload when one changes"""
+        def watch():
+            last_seen = self._source_mtimes()
+            while not stop_event.wait(interval):
+                current = self._source_mtimes()
+                if current != last_seen:
+                    last_seen = current
+                    logger.info("Dataset files changed on disk, reloading...")
+                    self.reload()
+        
+        thread = threading.Thread(target=watch, name="dataset-watcher", daemon=True)
+        thread.start()
+        logger.info(f"Watching dataset files every {interval}s")
+        return thread
+    
+    def load_all_datasets(self) -> Dict[str, pd.DataFrame]:
+        """
+        Every dataset of the active snapshot, loading the lazy ones.
+        
+        Request paths should use ``datasets[name]`` or ``datasets.loaded()``
+        on the snapshot instead, so non-critical datasets stay unloaded.
+        """
+        return dict(self.get_snapshot().datasets)
+    
+    def get_dataset_info(self) -> Dict[str, Dict]:
+        """Get information about loaded datasets from the active snapshot"""
+        try:
+            return self.get_snapshot().dataset_info()
             
         except Exception as e:
             logger.error(f"Failed to get dataset info: {e}")
@@ -239,7 +706,7 @@ dataset_loader = DatasetLoader()
 
 
 def load_all_datasets() -> Dict[str, pd.DataFrame]:
-    """Convenience function for backward compatibility"""
+    """Convenience function for backward compatibility; loads every dataset"""
     return dataset_loader.load_all_datasets()
 
 
@@ -254,7 +721,8 @@ if __name__ == "__main__":
         info = dataset_loader.get_dataset_info()
         print("\nDataset Information:")
         for name, details in info.items():
-            print(f"{name}: {details['shape']} - {details['memory_usage_mb']}MB")
+            if details.get("loaded"):
+                print(f"{name}: {details['shape']} - {details['memory_usage_mb']}MB")
             
     except Exception as e:
         print(f"Error: {e}")
\ No newline at end of file
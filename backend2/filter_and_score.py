@@ -1,12 +1,22 @@
 """
 Enhanced food filtering and scoring system with advanced algorithms
 """
+import numpy as np
 import pandas as pd
 import re
-from typing import Dict, List, Optional, Tuple
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from loguru import logger
+from config import settings
 from models import UserProfile, DoshaEnum
 from exceptions import ValidationError
+from food_index import MACRO_COLUMNS, FoodIndex, get_food_index, term_pattern
+from candidate_cache import candidate_cache
+from selection import StreamingTopK, mmr_indices, top_k_indices
+from health_rules import ConditionMasks, HealthRules, condition_masks_for, get_health_rules, parse_conditions
+from food_snippets import SNIPPET_HEADER, get_snippet_lines, render_brief_lines, render_detailed_lines
 
 
 class FoodFilter:
@@ -32,13 +42,7 @@ class FoodFilter:
             return None
         
         # Escape special characters and handle spaces
-        escaped_terms = []
-        for term in terms:
-            # Replace spaces with flexible whitespace matching
-            escaped = re.escape(term).replace(r'\ ', r'\s*')
-            escaped_terms.append(escaped)
-        
-        return '|'.join(escaped_terms)
+        return '|'.join(term_pattern(term) for term in terms)
     
     @classmethod
     def filter_by_allergies(cls, df: pd.DataFrame, allergies: str) -> pd.DataFrame:
@@ -145,33 +149,22 @@ class FoodFilter:
         
         return filtered_df
     
+    @classmethod
+    def condition_avoid_terms(cls, health_conditions: str,
+                              rules: Optional[HealthRules] = None) -> List[str]:
+        """Collect food terms to avoid for comma-separated health conditions (default: active rules)"""
+        return (rules or get_health_rules()).avoid_terms(health_conditions)
+    
     @classmethod
     def filter_by_health_conditions(cls, df: pd.DataFrame, health_conditions: str) -> pd.DataFrame:
         """Filter foods based on health conditions"""
         if not health_conditions:
             return df
         
-        conditions = cls.parse_restrictions(health_conditions)
-        
-        # Common condition-based food restrictions
-        condition_restrictions = {
-            'diabetes': ['sugar', 'honey', 'jaggery', 'sweet'],
-            'hypertension': ['salt', 'sodium', 'pickle'],
-            'heart disease': ['saturated fat', 'trans fat', 'cholesterol'],
-            'kidney disease': ['protein', 'sodium', 'potassium'],
-            'ibs': ['spicy', 'high fiber', 'dairy'],
-            'gout': ['purine', 'organ meat', 'alcohol']
-        }
-        
-        avoid_foods = set()
-        for condition in conditions:
-            condition_lower = condition.lower().strip()
-            for health_condition, restrictions in condition_restrictions.items():
-                if condition_lower in health_condition or health_condition in condition_lower:
-                    avoid_foods.update(restrictions)
+        avoid_foods = cls.condition_avoid_terms(health_conditions)
         
         if avoid_foods:
-            pattern = cls.create_regex_pattern(list(avoid_foods))
+            pattern = cls.create_regex_pattern(avoid_foods)
             if pattern:
                 mask = ~df["food_key"].str.contains(pattern, na=False, regex=True)
                 filtered_df = df[mask]
@@ -184,82 +177,345 @@ class FoodFilter:
         
         return df
     
+    # Mask-based filters over a precompiled FoodIndex. Each returns a
+    # boolean "keep" mask, or None when the filter does not apply.
+    
+    @classmethod
+    def allergy_mask(cls, index: FoodIndex, allergies: str) -> Optional[np.ndarray]:
+        """Keep-mask excluding foods whose name or ingredients mention an allergen"""
+        allergen_list = cls.parse_restrictions(allergies)
+        if not allergen_list:
+            return None
+        return ~index.term_mask(allergen_list, include_ingredients=True)
+    
+    @classmethod
+    def health_condition_mask(cls, index: FoodIndex, health_conditions: str) -> Optional[np.ndarray]:
+        """Keep-mask excluding foods to avoid for the given health conditions"""
+        if not health_conditions:
+            return None
+        excluded = condition_masks_for(index).exclusion_mask(health_conditions)
+        if excluded is None:
+            return None
+        return ~excluded
+    
+    @classmethod
+    def diet_preference_mask(cls, index: FoodIndex, user_profile: UserProfile) -> Optional[np.ndarray]:
+        """Keep-mask for vegetarian/vegan preferences"""
+        food_pref = getattr(user_profile, 'Food_preference', None)
+        if not food_pref:
+            return None
+        
+        pref_str = food_pref.value.lower() if hasattr(food_pref, 'value') else str(food_pref).lower()
+        
+        if pref_str == "vegan":
+            return index.is_vegan
+        elif pref_str == "vegetarian":
+            return index.is_veg
+        return None
+    
+    @classmethod
+    def dietary_restriction_mask(cls, index: FoodIndex, restrictions: str) -> Optional[np.ndarray]:
+        """Keep-mask excluding foods named in dietary restrictions"""
+        restriction_list = cls.parse_restrictions(restrictions)
+        if not restriction_list:
+            return None
+        return ~index.term_mask(restriction_list)
+    
+    @classmethod
+    def dosha_balance_mask(cls, index: FoodIndex, target_dosha: str, strictness: float = 0.7) -> Optional[np.ndarray]:
+        """Keep-mask for foods that help balance the target dosha"""
+        if not target_dosha:
+            return None
+        mask = index.dosha_mask(target_dosha, strictness)
+        if mask is None:
+            logger.warning(f"Dosha column Dosha_{target_dosha.capitalize()} not found")
+        return mask
+    
+    @classmethod
+    def constraint_signature(cls, user_profile: UserProfile, dosha_result: Dict,
+                             max_items: int, top_n: int, min_items: int,
+                             rules: Optional[HealthRules] = None) -> Tuple:
+        """
+        Canonical, hashable form of everything that decides a user's ranked candidates.
+        
+        Profiles that filter and score identically share a signature: term
+        lists are de-duplicated and sorted, health conditions are reduced
+        to the food terms they exclude under ``rules`` (pass the rules the
+        catalog's masks were compiled from), and preferences other than vegan
+        or vegetarian are dropped since they filter nothing. Dosha weights
+        are exact unless settings.CANDIDATE_DOSHA_SCORE_STEP buckets them,
+        in which case profiles whose weights differ by less than a step
+        share one ranking.
+        """
+        food_pref = getattr(user_profile, 'Food_preference', None)
+        pref_str = food_pref.value.lower() if hasattr(food_pref, 'value') else str(food_pref or '').lower()
+        health_conditions = getattr(user_profile, 'Health_Conditions', None)
+        
+        dosha = dosha_result.get('dosha') or ''
+        dosha = (dosha.value if hasattr(dosha, 'value') else str(dosha)).lower()
+        # Score order matters: terms are accumulated in this order
+        step = settings.CANDIDATE_DOSHA_SCORE_STEP
+        scores = tuple((str(k), round(float(v) / step) if step > 0 else float(v))
+                       for k, v in (dosha_result.get('scores') or {}).items())
+        
+        return (
+            dosha,
+            scores,
+            pref_str if pref_str in ("vegan", "vegetarian") else None,
+            tuple(sorted(set(cls.parse_restrictions(getattr(user_profile, 'Allergies', None))))),
+            tuple(sorted(set(cls.parse_restrictions(getattr(user_profile, 'Dietary_Restrictions', None))))),
+            tuple(sorted(cls.condition_avoid_terms(health_conditions, rules))) if health_conditions else (),
+            max_items,
+            top_n,
+            min_items,
+        )
+    
+    BENEFICIAL_CATEGORIES = [
+        'vegetables', 'fruits', 'whole grains', 
+        'legumes', 'herbs', 'spices'
+    ]
+    PROCESSED_INDICATORS = ['processed', 'packaged', 'canned', 'instant']
+    
+    @classmethod
+    def _static_food_scores(cls, df: pd.DataFrame) -> List[np.ndarray]:
+        """Per-food score terms that do not depend on the user, in scoring order"""
+        n = len(df)
+        
+        # Nutritional balance score
+        calories = (df['Calories'].to_numpy(dtype=np.float64) if 'Calories' in df.columns
+                    else np.zeros(n))
+        protein = (df['Protein'].to_numpy(dtype=np.float64) if 'Protein' in df.columns
+                   else np.zeros(n))
+        
+        # Moderate calorie foods preferred
+        calorie_term = np.where((calories >= 50) & (calories <= 400), 10.0,
+                                np.where(calories > 600, -10.0, 0.0))
+        
+        # Protein content bonus
+        protein_term = np.where(protein > 5, 5.0, 0.0)
+        
+        # Category preferences
+        category = (df['Category'].astype(str).str.lower() if 'Category' in df.columns
+                    else pd.Series('', index=df.index))
+        beneficial = category.str.contains(
+            '|'.join(map(re.escape, cls.BENEFICIAL_CATEGORIES)), regex=True
+        ).to_numpy(dtype=bool)
+        category_term = np.where(beneficial, 15.0, 0.0)
+        
+        # Penalize processed foods
+        food_name = (df['Food_Item'].astype(str).str.lower() if 'Food_Item' in df.columns
+                     else pd.Series('', index=df.index))
+        processed_pattern = '|'.join(map(re.escape, cls.PROCESSED_INDICATORS))
+        processed = (food_name.str.contains(processed_pattern, regex=True).to_numpy(dtype=bool)
+                     | category.str.contains(processed_pattern, regex=True).to_numpy(dtype=bool))
+        processed_term = np.where(processed, -15.0, 0.0)
+        
+        return [calorie_term, protein_term, category_term, processed_term]
+    
+    @classmethod
+    def score_foods_batch(cls, df: pd.DataFrame, dosha_results: List[Dict]) -> np.ndarray:
+        """
+        Score every food for every user in one pass.
+        
+        Returns a (len(dosha_results), len(df)) matrix of rounded scores,
+        row i holding the scores score_foods_for_user would assign for
+        dosha_results[i]. Terms are accumulated in the same order as the
+        original per-row scorer so results match it exactly.
+        """
+        n_users, n_foods = len(dosha_results), len(df)
+        scores = np.zeros((n_users, n_foods))
+        
+        effects = {}
+        
+        def effect(dosha: str) -> Optional[np.ndarray]:
+            col = f"Dosha_{dosha.capitalize()}"
+            if col not in df.columns:
+                return None
+            if col not in effects:
+                effects[col] = df[col].to_numpy(dtype=np.float64)
+            return effects[col]
+        
+        # Dosha balance score (most important)
+        targets = [(r.get('dosha', '') or '').lower() for r in dosha_results]
+        for target in set(targets):
+            values = effect(target) if target else None
+            if values is None:
+                continue
+            # Negative effect on dominant dosha is good, increasing it is avoided
+            term = np.where(values < 0, 40.0, np.where(values == 0, 20.0, -20.0))
+            rows = [i for i, t in enumerate(targets) if t == target]
+            scores[rows] += term
+        
+        # Multi-dosha scoring, weighted by dosha prominence in each user
+        dosha_keys = []
+        for result in dosha_results:
+            for dosha in (result.get('scores') or {}):
+                if dosha not in dosha_keys:
+                    dosha_keys.append(dosha)
+        
+        for dosha in dosha_keys:
+            values = effect(dosha)
+            if values is None:
+                continue
+            for i, result in enumerate(dosha_results):
+                weights = result.get('scores') or {}
+                if dosha in weights:
+                    scores[i] += -values * weights[dosha] * 20
+        
+        for term in cls._static_food_scores(df):
+            scores += term
+        
+        return np.round(scores, 2)
+    
     @classmethod
     def score_foods_for_user(cls, df: pd.DataFrame, user_profile: UserProfile, 
                            dosha_result: Dict) -> pd.DataFrame:
         """Score foods based on user profile and dosha"""
         df_scored = df.copy()
-        df_scored['user_score'] = 0.0
+        df_scored['user_score'] = cls.score_foods_batch(df, [dosha_result])[0]
         
-        target_dosha = dosha_result.get('dosha', '').lower()
-        dosha_scores = dosha_result.get('scores', {})
+        # Sort by score (highest first), ties in catalog order
+        df_scored = df_scored.sort_values('user_score', ascending=False, kind='stable')
         
-        for idx, row in df_scored.iterrows():
-            score = 0.0
-            
-            # Dosha balance score (most important)
-            if target_dosha:
-                dosha_col = f"Dosha_{target_dosha.capitalize()}"
-                if dosha_col in row:
-                    dosha_effect = row[dosha_col]
-                    # Negative effect on dominant dosha is good
-                    if dosha_effect < 0:
-                        score += 40  # Strong positive
-                    elif dosha_effect == 0:
-                        score += 20  # Neutral is okay
-                    else:
-                        score -= 20  # Avoid increasing dominant dosha
-            
-            # Multi-dosha scoring
-            for dosha, dosha_score in dosha_scores.items():
-                dosha_col = f"Dosha_{dosha.capitalize()}"
-                if dosha_col in row:
-                    dosha_effect = row[dosha_col]
-                    # Weight by dosha prominence in user
-                    contribution = -dosha_effect * dosha_score * 20
-                    score += contribution
-            
-            # Nutritional balance score
-            calories = row.get('Calories', 0)
-            protein = row.get('Protein', 0)
-            
-            # Moderate calorie foods preferred
-            if 50 <= calories <= 400:
-                score += 10
-            elif calories > 600:
-                score -= 10
-            
-            # Protein content bonus
-            if protein > 5:
-                score += 5
-            
-            # Category preferences
-            category = str(row.get('Category', '')).lower()
-            beneficial_categories = [
-                'vegetables', 'fruits', 'whole grains', 
-                'legumes', 'herbs', 'spices'
-            ]
-            
-            for beneficial in beneficial_categories:
-                if beneficial in category:
-                    score += 15
-                    break
-            
-            # Penalize processed foods
-            processed_indicators = ['processed', 'packaged', 'canned', 'instant']
-            food_name = str(row.get('Food_Item', '')).lower()
-            
-            for indicator in processed_indicators:
-                if indicator in food_name or indicator in category:
-                    score -= 15
-                    break
-            
-            df_scored.at[idx, 'user_score'] = round(score, 2)
+        return df_scored
+
+
+# Fewer strictly filtered foods than this falls back to the relaxed level
+MIN_VARIETY = 20
+
+LENIENT_STRICTNESS = 0.3
+
+
+class FilterLadder:
+    """
+    Every relaxation level of a user's filters, from masks computed once.
+    
+    Each filter is evaluated a single time into a named keep-mask (None
+    when it does not apply); a level is just the AND of a subset of them,
+    so relaxing never re-runs a filter. All levels are counted up front:
+    
+    - ``strict``: every filter, dosha at the requested strictness
+    - ``relaxed``: only allergy and diet preference, lenient dosha
+    - ``lenient``: every filter, lenient dosha
+    """
+    
+    LEVELS = [
+        ("strict", ("allergy", "health_condition", "diet_preference", "dietary_restriction", "dosha")),
+        ("relaxed", ("allergy", "diet_preference", "dosha_lenient")),
+        ("lenient", ("allergy", "health_condition", "diet_preference", "dietary_restriction", "dosha_lenient")),
+    ]
+    
+    def __init__(self, index: FoodIndex, masks: Dict[str, Optional[np.ndarray]], dosha_strictness: float):
+        self.index = index
+        self.masks = masks
+        self.dosha_strictness = dosha_strictness
+        self.levels = {name: self._combine(names) for name, names in self.LEVELS}
+        self.counts = {name: int(mask.sum()) for name, mask in self.levels.items()}
+    
+    @classmethod
+    def build(cls, food_df: pd.DataFrame, user_profile: UserProfile,
+              target_dosha: str = None, dosha_strictness: float = 0.7,
+              memo: Optional[Dict[Tuple, Optional[np.ndarray]]] = None) -> "FilterLadder":
+        """
+        Evaluate each of the user's filters once over the catalog's index
         
-        # Sort by score (highest first)
-        df_scored = df_scored.sort_values('user_score', ascending=False)
+        ``memo`` shares masks between ladders of the same catalog: each is
+        stored under its filter and normalized argument, so profiles with
+        the same allergies, preference or dosha reuse one mask.
+        """
+        index = get_food_index(food_df)
         
-        return df_scored
+        def mask(key: Tuple, compute) -> Optional[np.ndarray]:
+            if memo is None:
+                return compute()
+            if key not in memo:
+                memo[key] = compute()
+            return memo[key]
+        
+        allergies = getattr(user_profile, 'Allergies', None)
+        health_conditions = getattr(user_profile, 'Health_Conditions', None)
+        restrictions = getattr(user_profile, 'Dietary_Restrictions', None)
+        food_pref = getattr(user_profile, 'Food_preference', None)
+        pref_str = food_pref.value.lower() if hasattr(food_pref, 'value') else str(food_pref or '').lower()
+        masks = {
+            "allergy": mask(("allergy", *sorted(set(FoodFilter.parse_restrictions(allergies)))),
+                            lambda: FoodFilter.allergy_mask(index, allergies)),
+            "health_condition": mask(("health_condition", *sorted(set(parse_conditions(health_conditions)))),
+                                     lambda: FoodFilter.health_condition_mask(index, health_conditions)),
+            "diet_preference": mask(("diet_preference", pref_str),
+                                    lambda: FoodFilter.diet_preference_mask(index, user_profile)),
+            "dietary_restriction": mask(
+                ("dietary_restriction", *sorted(set(FoodFilter.parse_restrictions(restrictions)))),
+                lambda: FoodFilter.dietary_restriction_mask(index, restrictions)),
+            "dosha": None,
+            "dosha_lenient": None,
+        }
+        if target_dosha:
+            dosha = target_dosha.lower()
+            masks["dosha"] = mask(("dosha", dosha, dosha_strictness),
+                                  lambda: FoodFilter.dosha_balance_mask(index, target_dosha, dosha_strictness))
+            masks["dosha_lenient"] = mask(("dosha", dosha, LENIENT_STRICTNESS),
+                                          lambda: index.dosha_mask(target_dosha, LENIENT_STRICTNESS))
+        
+        ladder = cls(index, masks, dosha_strictness)
+        if memo is None:
+            ladder._log_removals()
+        return ladder
+    
+    def _combine(self, names: Tuple[str, ...]) -> np.ndarray:
+        mask = self.index.all_rows()
+        for name in names:
+            if self.masks[name] is not None:
+                mask &= self.masks[name]
+        return mask
+    
+    def _log_removals(self) -> None:
+        """Log how many foods each strict filter removed, in order of importance"""
+        mask = self.index.all_rows()
+        for name in self.LEVELS[0][1]:
+            keep = self.masks[name]
+            if keep is None:
+                continue
+            combined = mask & keep
+            removed = int(mask.sum() - combined.sum())
+            if removed > 0:
+                logger.info(f"{name.replace('_', ' ').capitalize()} filter removed {removed} items")
+            mask = combined
+    
+    def choose(self, min_items: int = 0) -> str:
+        """
+        Level filter_foods_for_user would select: strict, or relaxed when
+        strict keeps fewer than MIN_VARIETY foods. If that still leaves
+        fewer than ``min_items``, the lenient level is used instead.
+        """
+        level = "strict"
+        if self.counts["strict"] < MIN_VARIETY and self.dosha_strictness > LENIENT_STRICTNESS:
+            logger.warning("Too few foods after strict filtering, relaxing dosha filter")
+            level = "relaxed"
+        if self.counts[level] < min_items:
+            logger.warning("Very few suitable foods found, relaxing filters")
+            level = "lenient"
+        return level
+    
+    def positions(self, level: str, max_items: Optional[int] = None) -> np.ndarray:
+        """Catalog positions of a level, capped to the lowest-calorie ``max_items``"""
+        positions = np.flatnonzero(self.levels[level])
+        if max_items is not None and len(positions) > max_items and "Calories" in self.index.macros:
+            # Prioritize by calories for variety
+            positions = positions[top_k_indices(self.index.macros["Calories"][positions], max_items)]
+        return positions
+    
+    def reach(self) -> np.ndarray:
+        """Foods kept by at least one level; nothing outside it can affect the ladder"""
+        return np.logical_or.reduce(list(self.levels.values()))
+    
+    def summary(self) -> List[Dict]:
+        """Each level with the filters it applies and how many foods it keeps"""
+        return [
+            {"level": name, "filters": [n for n in names if self.masks[n] is not None],
+             "count": self.counts[name]}
+            for name, names in self.LEVELS
+        ]
 
 
 def filter_foods_for_user(
@@ -275,36 +531,20 @@ def filter_foods_for_user(
     try:
         logger.info(f"Starting food filtering for user with {len(food_df)} foods")
         
-        df = food_df.copy()
-        
-        # Apply filters in order of importance
-        
-        # 1. Critical health and safety filters
-        df = FoodFilter.filter_by_allergies(df, getattr(user_profile, 'Allergies', None))
-        df = FoodFilter.filter_by_health_conditions(df, getattr(user_profile, 'Health_Conditions', None))
+        if settings.FOOD_CATALOG_BACKEND == "sqlite":
+            # Same selection, pushed down into one indexed SQLite query
+            from sqlite_catalog import get_food_catalog
+            positions = get_food_catalog(food_df).filter_food_positions(
+                user_profile, target_dosha, max_items, dosha_strictness
+            )
+            df = food_df.iloc[positions]
+            logger.success(f"Food filtering complete: {len(df)} foods remaining")
+            return df
         
-        # 2. Dietary preference filters
-        df = FoodFilter.filter_by_diet_preference(df, user_profile)
-        df = FoodFilter.filter_by_dietary_restrictions(df, getattr(user_profile, 'Dietary_Restrictions', None))
+        ladder = FilterLadder.build(food_df, user_profile, target_dosha, dosha_strictness)
+        positions = ladder.positions(ladder.choose(), max_items)
         
-        # 3. Dosha-based filtering
-        if target_dosha:
-            df = FoodFilter.filter_by_dosha_balance(df, target_dosha, dosha_strictness)
-        
-        # 4. Ensure minimum variety
-        if len(df) < 20 and dosha_strictness > 0.3:
-            logger.warning("Too few foods after strict filtering, relaxing dosha filter")
-            df = food_df.copy()
-            # Reapply only critical filters
-            df = FoodFilter.filter_by_allergies(df, getattr(user_profile, 'Allergies', None))
-            df = FoodFilter.filter_by_diet_preference(df, user_profile)
-            if target_dosha:
-                df = FoodFilter.filter_by_dosha_balance(df, target_dosha, 0.3)  # More lenient
-        
-        # 5. Limit results for performance
-        if len(df) > max_items:
-            # Prioritize by calories for variety
-            df = df.sort_values('Calories').head(max_items)
+        df = ladder.index.take(food_df, positions)
         
         logger.success(f"Food filtering complete: {len(df)} foods remaining")
         return df
@@ -314,84 +554,66 @@ def filter_foods_for_user(
         raise ValidationError(f"Failed to filter foods: {e}")
 
 
-def make_food_snippet(food_df: pd.DataFrame, n: int = 60) -> str:
+def make_food_snippet(food_df: pd.DataFrame, n: int = 60, catalog: Optional[pd.DataFrame] = None) -> str:
     """
     Create optimized food snippet for LLM with better formatting
+    
+    Lines come pre-rendered from ``catalog`` (the frame ``food_df`` was
+    selected from) when given, so only the score suffix is formatted here.
     """
     try:
         if len(food_df) == 0:
             return "No suitable foods found."
         
-        # Select most important columns
-        essential_cols = ["Food_Item", "Category", "Calories", "Protein", "Carbs", "Fat"]
-        dosha_cols = ["Dosha_Vata", "Dosha_Pitta", "Dosha_Kapha"]
-        diet_cols = ["is_veg", "is_vegan"]
-        
-        available_cols = [col for col in essential_cols if col in food_df.columns]
-        available_cols += [col for col in dosha_cols if col in food_df.columns]
-        available_cols += [col for col in diet_cols if col in food_df.columns]
-        
-        # Add score column if available
-        if 'user_score' in food_df.columns:
-            available_cols.append('user_score')
-        
         # Get top N foods
-        sample_df = food_df.head(n)
-        
-        # Create compact representation
-        lines = []
-        lines.append("Available Foods (Name | Category | Calories | Protein | Carbs | Fat | Dosha Effects | Diet):")
-        lines.append("-" * 100)
-        
-        for _, row in sample_df.iterrows():
-            # Basic info
-            name = str(row.get('Food_Item', 'Unknown'))[:30]
-            category = str(row.get('Category', ''))[:15]
-            calories = int(row.get('Calories', 0))
-            protein = round(float(row.get('Protein', 0)), 1)
-            carbs = round(float(row.get('Carbs', 0)), 1)
-            fat = round(float(row.get('Fat', 0)), 1)
-            
-            # Dosha effects (simplified)
-            dosha_effects = []
-            for dosha in ['Vata', 'Pitta', 'Kapha']:
-                col = f'Dosha_{dosha}'
-                if col in row:
-                    effect = row[col]
-                    if effect > 0:
-                        dosha_effects.append(f"{dosha}+")
-                    elif effect < 0:
-                        dosha_effects.append(f"{dosha}-")
-            
-            dosha_str = ",".join(dosha_effects) if dosha_effects else "neutral"
-            
-            # Diet info
-            diet_info = []
-            if row.get('is_vegan', False):
-                diet_info.append('vegan')
-            elif row.get('is_veg', False):
-                diet_info.append('veg')
-            
-            diet_str = ",".join(diet_info) if diet_info else "non-veg"
-            
-            # Score if available
-            score_str = f" ({round(row.get('user_score', 0), 1)})" if 'user_score' in row else ""
-            
-            line = f"{name} | {category} | {calories}cal | {protein}p | {carbs}c | {fat}f | {dosha_str} | {diet_str}{score_str}"
-            lines.append(line)
-        
-        result = "\n".join(lines)
-        
-        # Add summary
-        lines.append(f"\nTotal available foods: {len(food_df)}, showing top {min(n, len(food_df))}")
-        
-        return result
+        lines = food_prompt_lines(food_df.head(n), catalog, "detailed")
+        return "\n".join([SNIPPET_HEADER, "-" * 100, *lines])
         
     except Exception as e:
         logger.error(f"Failed to create food snippet: {e}")
         return f"Error creating food list: {e}"
 
 
+def make_food_list(food_df: pd.DataFrame, n: int = 40, catalog: Optional[pd.DataFrame] = None) -> str:
+    """Short 'Name (N cal, score: S)' list of the top N foods for simple prompts"""
+    return "\n".join(food_prompt_lines(food_df.head(n), catalog, "brief"))
+
+
+def food_prompt_lines(food_df: pd.DataFrame, catalog: Optional[pd.DataFrame] = None,
+                      kind: str = "detailed") -> List[str]:
+    """
+    One prompt line per food, with its score when scored
+    
+    ``kind`` is "detailed" (make_food_snippet lines) or "brief"
+    (make_food_list lines).
+    """
+    lines = _static_lines(food_df, catalog, kind)
+    has_scores = 'user_score' in food_df.columns
+    
+    if kind == "detailed":
+        if not has_scores:
+            return lines
+        suffixes = [f" ({round(score, 1)})" for score in food_df['user_score'].tolist()]
+    elif has_scores:
+        suffixes = [f", score: {score:.1f})" for score in food_df['user_score'].tolist()]
+    else:
+        suffixes = [")"] * len(lines)
+    
+    return [line + suffix for line, suffix in zip(lines, suffixes)]
+
+
+def _static_lines(sample_df: pd.DataFrame, catalog: Optional[pd.DataFrame], kind: str) -> List[str]:
+    """Pre-rendered lines of the sampled foods, rendering them here if they aren't in the catalog"""
+    if catalog is not None:
+        store = get_snippet_lines(catalog)
+        positions = store.positions(sample_df)
+        if positions is not None:
+            return getattr(store, kind)[positions].tolist()
+    
+    render = render_detailed_lines if kind == "detailed" else render_brief_lines
+    return render(sample_df).tolist()
+
+
 def score_and_rank_foods(
     food_df: pd.DataFrame,
     user_profile: UserProfile,
@@ -402,13 +624,15 @@ def score_and_rank_foods(
     Score and rank foods for a specific user
     """
     try:
-        scored_df = FoodFilter.score_foods_for_user(food_df, user_profile, dosha_result)
+        scores = FoodFilter.score_foods_batch(food_df, [dosha_result])[0]
         
-        # Add ranking
-        scored_df['rank'] = range(1, len(scored_df) + 1)
+        # Select the top N without sorting the rest
+        positions = top_k_indices(scores, top_n, descending=True)
+        result = food_df.iloc[positions].copy()
+        result['user_score'] = scores[positions]
         
-        # Return top N
-        result = scored_df.head(top_n)
+        # Add ranking
+        result['rank'] = range(1, len(result) + 1)
         
         logger.info(f"Scored and ranked {len(result)} foods for user")
         
@@ -419,6 +643,437 @@ def score_and_rank_foods(
         return food_df.head(top_n)  # Fallback
 
 
+# Diversity weights of the candidate similarity: same Category, same
+# Food_Group, and macro profile (cosine of z-scored macros)
+DIVERSITY_WEIGHTS = {"Category": 0.4, "Food_Group": 0.3, "macros": 0.3}
+
+# Candidates considered by diversify_candidates, as a multiple of top_n
+DIVERSITY_POOL_FACTOR = 3
+
+
+def diversify_candidates(ranked: pd.DataFrame, top_n: int, trade_off: float = 0.7) -> pd.DataFrame:
+    """
+    Pick ``top_n`` scored foods by maximal marginal relevance
+    
+    Trades ``user_score`` against similarity to the foods already picked
+    (shared Category or Food_Group, similar macros), so the list does not
+    cluster in one regional cuisine or food group. ``trade_off=1`` keeps
+    the plain score order. Returns the picks in pick order, re-ranked.
+    """
+    if len(ranked) == 0:
+        return ranked
+    
+    labels, macros = _diversity_features(ranked)
+    picked = _diverse_picks(ranked['user_score'].to_numpy(), labels, macros, top_n, trade_off)
+    result = ranked.iloc[picked].copy()
+    result['rank'] = range(1, len(result) + 1)
+    return result
+
+
+def _diversity_features(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+    """Category/Food_Group codes and raw macros the diversity similarity is built from"""
+    labels = {column: pd.factorize(df[column])[0]
+              for column in ("Category", "Food_Group") if column in df.columns}
+    macro_cols = [col for col in MACRO_COLUMNS if col in df.columns]
+    macros = np.nan_to_num(df[macro_cols].to_numpy(dtype=np.float64)) if macro_cols else None
+    return labels, macros
+
+
+def _diverse_picks(scores: np.ndarray, labels: Dict[str, np.ndarray], macros: Optional[np.ndarray],
+                   top_n: int, trade_off: float) -> np.ndarray:
+    """MMR picks among scored foods; macros are z-scored over these foods only"""
+    weights = [DIVERSITY_WEIGHTS[column] for column in labels]
+    vectors = None
+    if macros is not None:
+        std = macros.std(axis=0)
+        vectors = (macros - macros.mean(axis=0)) / np.where(std > 0, std, 1.0)
+        weights.append(DIVERSITY_WEIGHTS["macros"])
+    return mmr_indices(scores, top_n, list(labels.values()), vectors, weights, trade_off)
+
+
+class RankedCandidates(NamedTuple):
+    """
+    A ranking held in the candidate cache, as catalog positions and scores.
+    
+    ``reach`` packs the bits of FilterLadder.reach and, with the profile
+    and dosha the ladder was built for, lets carry_candidates check whether
+    a catalog delta can change the ranking. Rankings without one (from
+    the SQLite backend) are not carried.
+    """
+    positions: np.ndarray
+    scores: np.ndarray
+    reach: Optional[np.ndarray] = None
+    user_profile: Optional[UserProfile] = None
+    target_dosha: Optional[str] = None
+
+
+def select_candidates(
+    food_df: pd.DataFrame,
+    user_profile: UserProfile,
+    dosha_result: Dict,
+    max_items: int = 200,
+    top_n: int = 100,
+    min_items: int = 10
+) -> pd.DataFrame:
+    """
+    Filter, score and rank foods for a user, memoized per constraint signature
+    
+    Filters strictly, falls back to the lenient level of the filter ladder
+    when fewer than ``min_items`` foods remain, then picks ``top_n`` of the
+    best scored with diversify_candidates. For catalogs published by a
+    dataset snapshot the ranked positions are cached under the snapshot
+    version, so repeated constraint combinations skip filtering and scoring.
+    """
+    index = get_food_index(food_df)
+    key = None
+    if index.snapshot_version is not None and food_df.index.is_unique:
+        key = (index.snapshot_version,
+               FoodFilter.constraint_signature(user_profile, dosha_result, max_items, top_n, min_items,
+                                               condition_masks_for(index).rules))
+        cached = candidate_cache.get(key)
+        if cached is not None:
+            ranked = food_df.iloc[cached.positions].copy()
+            ranked['user_score'] = cached.scores
+            ranked['rank'] = range(1, len(ranked) + 1)
+            logger.info(f"Reused {len(ranked)} ranked candidates from cache")
+            return ranked
+    
+    target_dosha = dosha_result.get("dosha")
+    reach = None
+    if settings.FOOD_CATALOG_BACKEND == "sqlite":
+        candidate_df = filter_foods_for_user(food_df, user_profile, target_dosha, max_items=max_items)
+        if len(candidate_df) < min_items:
+            logger.warning("Very few suitable foods found, relaxing filters")
+            candidate_df = filter_foods_for_user(
+                food_df, user_profile, target_dosha, max_items=max_items,
+                dosha_strictness=LENIENT_STRICTNESS
+            )
+    else:
+        # One pass over the filters; the retry is just another cached level
+        ladder = FilterLadder.build(food_df, user_profile, target_dosha)
+        level = ladder.choose(min_items)
+        logger.info(f"Filter ladder counts: {ladder.counts}, using {level}")
+        candidate_df = index.take(food_df, ladder.positions(level, max_items))
+        reach = np.packbits(ladder.reach())
+    
+    trade_off = settings.CANDIDATE_DIVERSITY
+    pool = top_n if trade_off >= 1 else top_n * DIVERSITY_POOL_FACTOR
+    ranked = score_and_rank_foods(candidate_df, user_profile, dosha_result, pool)
+    if trade_off < 1 and 'user_score' in ranked.columns:
+        ranked = diversify_candidates(ranked, top_n, trade_off)
+    
+    if key is not None and 'user_score' in ranked.columns:
+        positions = food_df.index.get_indexer(ranked.index)
+        scores = ranked['user_score'].to_numpy()
+        positions.flags.writeable = False
+        scores.flags.writeable = False
+        candidate_cache.put(key, RankedCandidates(positions, scores, reach, user_profile, target_dosha))
+    
+    return ranked
+
+
+def carry_candidates(previous_df: pd.DataFrame, food_df: pd.DataFrame, row_map: np.ndarray) -> int:
+    """
+    Carry cached rankings of the previous catalog's snapshot over to this one
+    
+    ``row_map`` comes from ``diff_catalogs``. A ranking is kept when no
+    removed or edited row was within its filters' reach and no added or
+    edited row passes any of its filter levels: its ladder then holds the
+    same foods with the same values, so the positions are renumbered and
+    the scores reused. Anything else is left to age out, as is every
+    ranking when the health rules changed. Returns how many were carried.
+    """
+    previous, index = get_food_index(previous_df), get_food_index(food_df)
+    if previous.snapshot_version is None or index.snapshot_version is None:
+        return 0
+    rules = condition_masks_for(index).rules
+    if condition_masks_for(previous).rules.rules != rules.rules:
+        return 0
+    
+    carried = np.flatnonzero(row_map >= 0)
+    fresh = np.flatnonzero(row_map < 0)
+    old_to_new = np.full(previous.size, -1, dtype=np.int64)
+    old_to_new[row_map[carried]] = carried
+    
+    # Added and edited rows, filtered on their own with the snapshot's rules
+    fresh_df = food_df.iloc[fresh]
+    fresh_index = get_food_index(fresh_df)
+    fresh_index.condition_masks = ConditionMasks(fresh_index, rules)
+    memo: Dict[Tuple, Optional[np.ndarray]] = {}
+    
+    def carry(key, value):
+        if key[0] != previous.snapshot_version or getattr(value, "reach", None) is None:
+            return None
+        moved = old_to_new[np.flatnonzero(np.unpackbits(value.reach, count=previous.size))]
+        # Ties are broken by position, so the reach must also keep its order
+        if (moved < 0).any() or (np.diff(moved) <= 0).any():
+            return None
+        if len(fresh_df):
+            ladder = FilterLadder.build(fresh_df, value.user_profile, value.target_dosha, memo=memo)
+            if ladder.reach().any():
+                return None
+        
+        reach = np.zeros(index.size, dtype=bool)
+        reach[moved] = True
+        positions = old_to_new[value.positions]
+        positions.flags.writeable = False
+        return (index.snapshot_version, key[1]), value._replace(positions=positions, reach=np.packbits(reach))
+    
+    count = candidate_cache.carry(carry)
+    logger.info(f"Carried {count} cached candidate rankings over to snapshot v{index.snapshot_version}")
+    return count
+
+
+# Distinct profiles below this are ranked in-process even when a pool is configured
+PARALLEL_MIN_PROFILES = 200
+
+# Users scored per score matrix in batch ranking
+SCORE_CHUNK_SIZE = 256
+
+
+def _rank_profiles(
+    food_df: pd.DataFrame,
+    user_profiles: List[UserProfile],
+    dosha_results: List[Dict],
+    max_items: int,
+    top_n: int,
+    min_items: int
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    select_candidates for many profiles without the cache, as catalog
+    positions, scores and packed filter reach. Filter masks are shared
+    across the profiles and each chunk of users is scored against the
+    whole catalog in one matrix.
+    """
+    memo: Dict[Tuple, Optional[np.ndarray]] = {}
+    trade_off = settings.CANDIDATE_DIVERSITY
+    pool = top_n if trade_off >= 1 else top_n * DIVERSITY_POOL_FACTOR
+    labels, macros = _diversity_features(food_df) if trade_off < 1 else ({}, None)
+    
+    results = []
+    for start in range(0, len(user_profiles), SCORE_CHUNK_SIZE):
+        chunk = dosha_results[start:start + SCORE_CHUNK_SIZE]
+        scores = FoodFilter.score_foods_batch(food_df, chunk)
+        for user_profile, dosha_result, user_scores in zip(
+                user_profiles[start:start + SCORE_CHUNK_SIZE], chunk, scores):
+            ladder = FilterLadder.build(food_df, user_profile, dosha_result.get("dosha"), memo=memo)
+            positions = ladder.positions(ladder.choose(min_items), max_items)
+            candidate_scores = user_scores[positions]
+            
+            # Same order score_and_rank_foods gives the filtered frame
+            picked = top_k_indices(candidate_scores, pool, descending=True)
+            positions, candidate_scores = positions[picked], candidate_scores[picked]
+            if trade_off < 1:
+                picked = _diverse_picks(
+                    candidate_scores, {column: codes[positions] for column, codes in labels.items()},
+                    None if macros is None else macros[positions], top_n, trade_off
+                )
+                positions, candidate_scores = positions[picked], candidate_scores[picked]
+            results.append((positions, candidate_scores, np.packbits(ladder.reach())))
+    return results
+
+
+# Catalog of a batch worker process, set once by its initializer
+_worker_catalog: Optional[pd.DataFrame] = None
+
+# The long-lived batch pool and the catalog its workers hold
+_batch_pool: Optional[Tuple[pd.DataFrame, int, ProcessPoolExecutor]] = None
+_batch_pool_lock = threading.Lock()
+
+
+def _init_batch_worker(food_df: pd.DataFrame, rules: HealthRules) -> None:
+    """Keep the catalog and build its index and health masks, once per worker"""
+    global _worker_catalog
+    _worker_catalog = food_df
+    index = get_food_index(food_df)
+    index.condition_masks = ConditionMasks(index, rules)
+
+
+def _batch_worker_ready() -> None:
+    pass
+
+
+def _rank_profiles_in_worker(args: Tuple) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    return _rank_profiles(_worker_catalog, *args)
+
+
+def start_batch_pool(food_df: pd.DataFrame, processes: int) -> ProcessPoolExecutor:
+    """
+    The batch worker pool over ``food_df``, started if needed.
+    
+    One pool lives per catalog: snapshots start it when built, and
+    starting one for a new catalog retires the previous pool once its
+    running batches finish. Workers are spawned rather than forked (the
+    server is multithreaded) and start as soon as the pool does. They
+    compile the health rules the catalog's masks were built from.
+    """
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is not None:
+            pool_df, pool_processes, executor = _batch_pool
+            if pool_df is food_df and pool_processes == processes:
+                return executor
+            executor.shutdown(wait=False)
+        
+        executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_batch_worker,
+            initargs=(food_df, condition_masks_for(get_food_index(food_df)).rules)
+        )
+        for _ in range(processes):
+            executor.submit(_batch_worker_ready)
+        _batch_pool = (food_df, processes, executor)
+        logger.info(f"Started {processes} batch filter workers")
+        return executor
+
+
+def shutdown_batch_pool() -> None:
+    """Stop the batch worker pool, if one is running"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is not None:
+            _batch_pool[2].shutdown(wait=True)
+            _batch_pool = None
+
+
+def select_candidates_batch(
+    food_df: pd.DataFrame,
+    user_profiles: List[UserProfile],
+    dosha_results: List[Dict],
+    max_items: int = 200,
+    top_n: int = 100,
+    min_items: int = 10,
+    processes: Optional[int] = None
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    select_candidates for a cohort, as (catalog positions, scores) per profile
+    
+    Profiles with the same constraint signature are ranked once, and
+    signatures already in the candidate cache are not ranked at all. The
+    rest share their filter masks and are scored in users x foods
+    matrices. With ``processes`` > 1 (default settings.BATCH_FILTER_PROCESSES)
+    and at least PARALLEL_MIN_PROFILES distinct profiles, the work is
+    split over the catalog's long-lived worker pool (see start_batch_pool).
+    """
+    if len(user_profiles) != len(dosha_results):
+        raise ValidationError("Each profile needs exactly one dosha result")
+    
+    if settings.FOOD_CATALOG_BACKEND == "sqlite":
+        results = []
+        for user_profile, dosha_result in zip(user_profiles, dosha_results):
+            ranked = select_candidates(food_df, user_profile, dosha_result, max_items, top_n, min_items)
+            scores = ranked['user_score'].to_numpy() if 'user_score' in ranked.columns else np.zeros(len(ranked))
+            results.append((food_df.index.get_indexer(ranked.index), scores))
+        return results
+    
+    index = get_food_index(food_df)
+    use_cache = index.snapshot_version is not None and food_df.index.is_unique
+    rules = condition_masks_for(index).rules
+    signatures = [FoodFilter.constraint_signature(user_profile, dosha_result, max_items, top_n, min_items, rules)
+                  for user_profile, dosha_result in zip(user_profiles, dosha_results)]
+    
+    by_signature: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+    pending: Dict[Tuple, int] = {}
+    for i, signature in enumerate(signatures):
+        if signature in by_signature or signature in pending:
+            continue
+        cached = candidate_cache.get((index.snapshot_version, signature)) if use_cache else None
+        if cached is not None:
+            by_signature[signature] = (cached.positions, cached.scores)
+        else:
+            pending[signature] = i
+    
+    todo = list(pending.values())
+    profiles = [user_profiles[i] for i in todo]
+    doshas = [dosha_results[i] for i in todo]
+    processes = settings.BATCH_FILTER_PROCESSES if processes is None else processes
+    if processes > 1 and len(todo) >= PARALLEL_MIN_PROFILES:
+        step = -(-len(todo) // processes)
+        jobs = [(profiles[start:start + step], doshas[start:start + step], max_items, top_n, min_items)
+                for start in range(0, len(todo), step)]
+        executor = start_batch_pool(food_df, processes)
+        computed = [entry for part in executor.map(_rank_profiles_in_worker, jobs) for entry in part]
+    else:
+        computed = _rank_profiles(food_df, profiles, doshas, max_items, top_n, min_items)
+    
+    for i, (positions, scores, reach) in zip(todo, computed):
+        positions.flags.writeable = False
+        scores.flags.writeable = False
+        by_signature[signatures[i]] = (positions, scores)
+        if use_cache:
+            candidate_cache.put((index.snapshot_version, signatures[i]), RankedCandidates(
+                positions, scores, reach, user_profiles[i], dosha_results[i].get("dosha")))
+    
+    logger.info(f"Selected candidates for {len(user_profiles)} profiles: "
+                f"{len(by_signature) - len(todo)} reused, {len(todo)} ranked")
+    return [by_signature[signature] for signature in signatures]
+
+
+def score_and_rank_foods_batch(
+    food_df: pd.DataFrame,
+    dosha_results: List[Dict],
+    top_n: int = 100,
+    chunk_size: int = 256
+) -> List[pd.DataFrame]:
+    """
+    Score and rank one catalog for many users at once
+    
+    Users are scored in chunks of ``chunk_size`` to bound the size of the
+    users x foods score matrix.
+    """
+    try:
+        results = []
+        for start in range(0, len(dosha_results), chunk_size):
+            chunk = dosha_results[start:start + chunk_size]
+            scores = FoodFilter.score_foods_batch(food_df, chunk)
+            for user_scores in scores:
+                positions = top_k_indices(user_scores, top_n, descending=True)
+                ranked = food_df.iloc[positions].copy()
+                ranked['user_score'] = user_scores[positions]
+                ranked['rank'] = range(1, len(ranked) + 1)
+                results.append(ranked)
+        
+        logger.info(f"Scored and ranked foods for {len(dosha_results)} users")
+        return results
+        
+    except Exception as e:
+        logger.error(f"Batch food scoring failed: {e}")
+        raise ValidationError(f"Failed to score foods: {e}")
+
+
+def score_and_rank_food_chunks(
+    chunks: Iterable[pd.DataFrame],
+    dosha_result: Dict,
+    top_n: int = 100
+) -> pd.DataFrame:
+    """
+    Score and rank a catalog that arrives in chunks
+    
+    Only the best ``top_n`` rows seen so far are kept between chunks, so a
+    catalog streamed from disk (e.g. ``FoodCatalogIngest.processed_chunks``)
+    can be ranked without loading it whole. Ranks match scoring the
+    concatenated catalog with ``score_and_rank_foods``.
+    """
+    try:
+        top = StreamingTopK(top_n, descending=True)
+        for chunk in chunks:
+            if len(chunk):
+                top.push(FoodFilter.score_foods_batch(chunk, [dosha_result])[0], chunk)
+        
+        result = top.rows()
+        if result is None:
+            return pd.DataFrame()
+        result['user_score'] = top.result()[1]
+        result['rank'] = range(1, len(result) + 1)
+        
+        logger.info(f"Ranked {len(result)} of {top.seen} streamed foods")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Streamed food scoring failed: {e}")
+        raise ValidationError(f"Failed to score foods: {e}")
+
+
 # Backward compatibility
 def filter_foods_by_preferences(food_df: pd.DataFrame, preferences: Dict) -> pd.DataFrame:
     """Legacy function for backward compatibility"""
@@ -0,0 +1,456 @@
+"""
+Precompiled food catalog index for copy-free filtering
+"""
+import re
+import threading
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+DOSHAS = ("Vata", "Pitta", "Kapha")
+MACRO_COLUMNS = ("Calories", "Protein", "Carbs", "Fat")
+
+
+def term_pattern(term: str) -> str:
+    """Regex for a single restriction term, with flexible whitespace between words"""
+    return re.escape(term).replace(r'\ ', r'\s*')
+
+
+class TermIndex:
+    """
+    Trigram inverted index over a text column.
+
+    Matching keeps the exact semantics of ``str.contains(term_pattern(term))``:
+    every space-separated word of a term is a literal that must occur in
+    the text, so the posting lists of its trigrams are intersected to get
+    candidate rows, and only those candidates are checked with the
+    compiled pattern. Per-term results are cached, so a repeated term
+    costs a dictionary lookup.
+    """
+
+    NGRAM = 3
+    MAX_CACHED_TERMS = 4096
+
+    def __init__(self, texts: Iterable):
+        self._texts: List[Optional[str]] = [t if isinstance(t, str) else None for t in texts]
+        self.size = len(self._texts)
+
+        postings: Dict[str, List[int]] = {}
+        for row, text in enumerate(self._texts):
+            if not text:
+                continue
+            for gram in self._grams(text):
+                postings.setdefault(gram, []).append(row)
+
+        self._postings = {gram: np.asarray(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self._term_masks: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def _grams(cls, text: str) -> set:
+        n = cls.NGRAM
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def _candidates(self, term: str) -> np.ndarray:
+        """Rows containing every trigram of every word in the term"""
+        grams = set()
+        for word in term.split(" "):
+            grams |= self._grams(word)
+
+        if not grams:
+            # Words too short to index: verify every row
+            return np.arange(self.size, dtype=np.int32)
+
+        lists = sorted((self._postings.get(g) for g in grams),
+                       key=lambda rows: -1 if rows is None else len(rows))
+        if lists[0] is None:
+            return np.empty(0, dtype=np.int32)
+
+        rows = lists[0]
+        for other in lists[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+            if len(rows) == 0:
+                break
+        return rows
+
+    def match(self, term: str) -> np.ndarray:
+        """Rows whose text matches the term's pattern"""
+        cached = self._term_masks.get(term)
+        if cached is not None:
+            return cached
+
+        regex = re.compile(term_pattern(term))
+        mask = np.zeros(self.size, dtype=bool)
+        for row in self._candidates(term):
+            text = self._texts[row]
+            if text is not None and regex.search(text):
+                mask[row] = True
+
+        if len(self._term_masks) >= self.MAX_CACHED_TERMS:
+            self._term_masks.pop(next(iter(self._term_masks)), None)
+        self._term_masks[term] = mask
+        return mask
+
+    def match_any(self, terms: Iterable[str]) -> np.ndarray:
+        """Rows matching at least one of the terms"""
+        mask = np.zeros(self.size, dtype=bool)
+        for term in terms:
+            mask |= self.match(term)
+        return mask
+
+    def match_rows(self, terms: Iterable[str], rows: np.ndarray) -> np.ndarray:
+        """match_any over just ``rows`` (one flag per row), checked without the postings"""
+        regexes = [re.compile(term_pattern(term)) for term in terms]
+        return np.array([
+            self._texts[row] is not None and any(regex.search(self._texts[row]) for regex in regexes)
+            for row in rows
+        ], dtype=bool)
+
+    def updated(self, texts: Iterable, row_map: np.ndarray) -> "TermIndex":
+        """
+        Index over a new version of the texts, reusing this one.
+
+        ``row_map[i]`` is the position in this index of new row ``i`` when
+        its text is unchanged, or -1 for added or edited rows. Postings of
+        carried rows are renumbered, only fresh rows are tokenized, and
+        cached term matches are kept with just the fresh rows re-checked.
+        """
+        index = TermIndex.__new__(TermIndex)
+        index._texts = [t if isinstance(t, str) else None for t in texts]
+        index.size = len(index._texts)
+
+        carried = np.flatnonzero(row_map >= 0)
+        fresh = np.flatnonzero(row_map < 0)
+        old_to_new = np.full(self.size, -1, dtype=np.int32)
+        old_to_new[row_map[carried]] = carried
+
+        fresh_postings: Dict[str, List[int]] = {}
+        for row in fresh:
+            text = index._texts[row]
+            if text:
+                for gram in self._grams(text):
+                    fresh_postings.setdefault(gram, []).append(int(row))
+
+        postings: Dict[str, np.ndarray] = {}
+        for gram, rows in self._postings.items():
+            rows = old_to_new[rows]
+            rows = rows[rows >= 0]
+            extra = fresh_postings.pop(gram, None)
+            if extra:
+                rows = np.sort(np.concatenate([rows, np.asarray(extra, dtype=np.int32)]))
+            if len(rows):
+                postings[gram] = rows
+        for gram, rows in fresh_postings.items():
+            postings[gram] = np.asarray(rows, dtype=np.int32)
+        index._postings = postings
+
+        index._term_masks = {}
+        for term, old_mask in self._term_masks.items():
+            regex = re.compile(term_pattern(term))
+            mask = np.zeros(index.size, dtype=bool)
+            mask[carried] = old_mask[row_map[carried]]
+            for row in fresh:
+                text = index._texts[row]
+                mask[row] = text is not None and regex.search(text) is not None
+            index._term_masks[term] = mask
+        return index
+
+
+class FoodIndex:
+    """
+    Column arrays extracted once from a processed food catalog.
+
+    Filters are evaluated as boolean row masks over these arrays and
+    combined with bitwise AND; a DataFrame is only materialized for the
+    final selection via ``take``. Row ``i`` of every array corresponds to
+    ``food_df.iloc[i]`` of the frame the index was built from, which must
+    be treated as read-only afterwards.
+    """
+
+    def __init__(self, food_df: pd.DataFrame, with_terms: bool = True):
+        self.size = len(food_df)
+        self.labels = food_df.index
+
+        # Set by the dataset snapshot that publishes this index
+        self.snapshot_version: Optional[int] = None
+        # Health rules compiled against this catalog (health_rules.ConditionMasks)
+        self.condition_masks = None
+
+        # Dosha effects (-1 decreases, 0 neutral, 1 increases)
+        self.dosha_effects: Dict[str, np.ndarray] = {}
+        for dosha in DOSHAS:
+            col = f"Dosha_{dosha}"
+            if col in food_df.columns:
+                self.dosha_effects[dosha.lower()] = self._compact_effects(food_df[col])
+
+        # Macros
+        self.macros: Dict[str, np.ndarray] = {}
+        for col in MACRO_COLUMNS:
+            if col in food_df.columns:
+                self.macros[col] = pd.to_numeric(food_df[col], errors="coerce").to_numpy(dtype=np.float32)
+
+        # Diet flags
+        self.is_veg = self._flag(food_df, "is_veg")
+        self.is_vegan = self._flag(food_df, "is_vegan")
+
+        # Category codes (-1 for missing)
+        if "Category" in food_df.columns:
+            codes, categories = pd.factorize(food_df["Category"])
+            self.categories = pd.Index(list(categories), dtype=object)
+            self.category_codes = codes.astype(self._code_dtype(self.categories))
+        else:
+            self.category_codes = np.full(self.size, -1, dtype=np.int16)
+            self.categories = pd.Index([], dtype=object)
+
+        # Inverted indexes used by allergy, restriction and condition filters
+        self.name_terms = self.ingredient_terms = None
+        if with_terms:
+            if "food_key" in food_df.columns:
+                self.name_terms = TermIndex(food_df["food_key"])
+            if "Ingredients" in food_df.columns:
+                self.ingredient_terms = TermIndex(self._ingredient_texts(food_df))
+
+    @classmethod
+    def from_delta(cls, previous: "FoodIndex", food_df: pd.DataFrame, row_map: np.ndarray) -> "FoodIndex":
+        """
+        Index for an updated catalog, reusing ``previous`` for unchanged rows.
+
+        ``row_map`` comes from ``diff_catalogs``: only rows mapped to -1 are
+        read from ``food_df``; all other arrays, trigram postings and cached
+        term matches are carried over from the previous index by position.
+        """
+        carried = np.flatnonzero(row_map >= 0)
+        fresh = np.flatnonzero(row_map < 0)
+        source = row_map[carried]
+        partial = cls(food_df.iloc[fresh], with_terms=False)
+
+        index = cls.__new__(cls)
+        index.size = len(food_df)
+        index.labels = food_df.index
+        index.snapshot_version = None
+        index.condition_masks = None
+
+        def merge(old: Optional[np.ndarray], new: Optional[np.ndarray]) -> Optional[np.ndarray]:
+            if old is None or new is None:
+                return None
+            merged = np.empty(index.size, dtype=np.result_type(old.dtype, new.dtype))
+            merged[carried] = old[source]
+            merged[fresh] = new
+            return merged
+
+        index.dosha_effects = {dosha: merge(effects, partial.dosha_effects.get(dosha))
+                               for dosha, effects in previous.dosha_effects.items()}
+        index.macros = {col: merge(values, partial.macros.get(col))
+                        for col, values in previous.macros.items()}
+        index.is_veg = merge(previous.is_veg, partial.is_veg)
+        index.is_vegan = merge(previous.is_vegan, partial.is_vegan)
+
+        # New categories are appended so existing codes stay valid
+        index.categories = previous.categories.append(
+            partial.categories.difference(previous.categories)
+        )
+        lookup = np.append(index.categories.get_indexer(partial.categories), -1)
+        index.category_codes = merge(previous.category_codes, lookup[partial.category_codes]) \
+            .astype(cls._code_dtype(index.categories))
+
+        index.name_terms = (previous.name_terms.updated(food_df["food_key"], row_map)
+                            if previous.name_terms is not None else None)
+        index.ingredient_terms = (previous.ingredient_terms.updated(cls._ingredient_texts(food_df), row_map)
+                                  if previous.ingredient_terms is not None else None)
+        return index
+
+    @staticmethod
+    def _code_dtype(categories: pd.Index) -> type:
+        return np.int16 if len(categories) < 2 ** 15 else np.int32
+
+    @staticmethod
+    def _ingredient_texts(food_df: pd.DataFrame) -> pd.Series:
+        return food_df["Ingredients"].astype(str).str.lower()
+
+    @staticmethod
+    def _compact_effects(series: pd.Series) -> np.ndarray:
+        """Store dosha effects as int8 when they are whole numbers, float32 otherwise"""
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+        if np.isfinite(values).all() and np.array_equal(values, np.round(values)) \
+                and (np.abs(values) <= 127).all():
+            return values.astype(np.int8)
+        return values.astype(np.float32)
+
+    def _flag(self, food_df: pd.DataFrame, column: str) -> Optional[np.ndarray]:
+        """Boolean flag column, or None if the catalog lacks it"""
+        if column not in food_df.columns:
+            return None
+        return (food_df[column] == True).to_numpy(dtype=bool)
+
+    def all_rows(self) -> np.ndarray:
+        """Mask selecting every food"""
+        return np.ones(self.size, dtype=bool)
+
+    def dosha_mask(self, target_dosha: str, strictness: float) -> Optional[np.ndarray]:
+        """Foods that do not aggravate the target dosha, or None if unknown"""
+        effects = self.dosha_effects.get(target_dosha.lower())
+        if effects is None:
+            return None
+
+        # strictness: 1.0 = only decreasing foods, 0.0 = all foods
+        if strictness >= 0.8:
+            return effects < 0
+        elif strictness >= 0.5:
+            return effects <= 0
+        return effects <= 0.5
+
+    def term_mask(self, terms: List[str], include_ingredients: bool = False,
+                  rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Foods whose key (and optionally ingredients) match any of the terms
+
+        Given ``rows``, only those positions are checked and the mask has
+        one flag per row instead of one per food.
+        """
+        if self.name_terms is None:
+            return np.zeros(self.size if rows is None else len(rows), dtype=bool)
+
+        if rows is not None:
+            mask = self.name_terms.match_rows(terms, rows)
+            if include_ingredients and self.ingredient_terms is not None:
+                mask = mask | self.ingredient_terms.match_rows(terms, rows)
+            return mask
+
+        mask = self.name_terms.match_any(terms)
+        if include_ingredients and self.ingredient_terms is not None:
+            mask = mask | self.ingredient_terms.match_any(terms)
+        return mask
+
+    def take(self, food_df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+        """Materialize the given row positions of the indexed frame"""
+        return food_df.iloc[positions]
+
+
+class CatalogDelta:
+    """
+    Row-level difference between two versions of a food catalog.
+
+    Rows are matched by ``food_key``. ``row_map[i]`` is the old position of
+    new row ``i`` when it was carried over unchanged, or -1 when it was
+    added or edited.
+    """
+
+    def __init__(self, row_map: np.ndarray, added: set, changed: set, removed: set):
+        self.row_map = row_map
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+
+    @property
+    def fresh_fraction(self) -> float:
+        """Share of the new catalog that has to be re-indexed"""
+        return float((self.row_map < 0).mean()) if len(self.row_map) else 0.0
+
+    def __repr__(self) -> str:
+        return (f"CatalogDelta(added={len(self.added)}, changed={len(self.changed)}, "
+                f"removed={len(self.removed)})")
+
+
+def diff_catalogs(old_df: pd.DataFrame, new_df: pd.DataFrame, key: str = "food_key") -> Optional[CatalogDelta]:
+    """
+    Compare two processed catalogs row by row.
+
+    Returns None when they cannot be aligned: a missing or duplicated key,
+    or a different set of columns.
+    """
+    if key not in new_df.columns or list(old_df.columns) != list(new_df.columns):
+        return None
+
+    old_keys = pd.Index(old_df[key])
+    new_keys = pd.Index(new_df[key])
+    if not old_keys.is_unique or not new_keys.is_unique:
+        return None
+
+    row_map = old_keys.get_indexer(new_keys)
+    added = np.flatnonzero(row_map < 0)
+    matched = np.flatnonzero(row_map >= 0)
+    differs = np.zeros(len(matched), dtype=bool)
+    for col in new_df.columns:
+        new_values = new_df[col].to_numpy()[matched]
+        old_values = old_df[col].to_numpy()[row_map[matched]]
+        same = (new_values == old_values) | (pd.isna(new_values) & pd.isna(old_values))
+        differs |= ~same
+
+    edited = matched[differs]
+    row_map[edited] = -1
+    return CatalogDelta(
+        row_map=row_map,
+        added=set(new_keys[added]),
+        changed=set(new_keys[edited]),
+        removed=set(old_keys.difference(new_keys)),
+    )
+
+
+class FrameRegistry:
+    """
+    Values derived from catalog frames, one per frame, built on first use.
+    
+    Entries are keyed by id() of the frame. The weak reference guards
+    against a recycled id pointing at a different frame, and an entry is
+    dropped once its frame is garbage collected. Lookups take no lock;
+    builds are serialized so a frame's value is built once.
+    """
+    
+    def __init__(self, builder: Callable[..., Any]):
+        self._builder = builder
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def lookup(self, food_df: pd.DataFrame) -> Optional[Any]:
+        """The value registered for this frame, or None"""
+        entry = self._entries.get(id(food_df))
+        if entry is not None and entry[0]() is food_df:
+            return entry[1]
+        return None
+    
+    def __call__(self, food_df: pd.DataFrame, *args) -> Any:
+        value = self.lookup(food_df)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self.lookup(food_df)
+            if value is None:
+                value = self.register(food_df, self._builder(food_df, *args))
+            return value
+    
+    def register(self, food_df: pd.DataFrame, value: Any) -> Any:
+        """Make ``value`` the one returned for this frame"""
+        self._entries[id(food_df)] = (weakref.ref(food_df), value)
+        weakref.finalize(food_df, self._entries.pop, id(food_df), None)
+        return value
+    
+    def values(self) -> List[Any]:
+        """Values of frames that are still alive"""
+        return [value for ref, value in list(self._entries.values()) if ref() is not None]
+
+
+def frame_registry(builder: Callable[..., Any]) -> FrameRegistry:
+    """A memoized ``get_x(food_df, *args)`` calling ``builder`` once per frame"""
+    return FrameRegistry(builder)
+
+
+def _build_food_index(food_df: pd.DataFrame) -> FoodIndex:
+    index = FoodIndex(food_df)
+    logger.debug(f"Built food index over {index.size} items")
+    return index
+
+
+_food_indexes = frame_registry(_build_food_index)
+
+
+def get_food_index(food_df: pd.DataFrame) -> FoodIndex:
+    """Return the FoodIndex for a catalog frame, building it on first use"""
+    return _food_indexes(food_df)
+
+
+def register_food_index(food_df: pd.DataFrame, index: FoodIndex) -> FoodIndex:
+    """Make ``index`` the one get_food_index returns for this frame"""
+    return _food_indexes.register(food_df, index)
@@ -0,0 +1,305 @@
+"""
+Chunked streaming ingest for large food catalogs
+"""
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import settings
+from dataset_cache import SnapshotCache, snapshot_cache
+from dataset_loader import (
+    DOSHA_MAP, FOOD_COLUMN_DTYPES, FOOD_KEY_COLUMNS, CATEGORICAL_MAX_CATEGORIES,
+    DatasetLoader, is_low_cardinality
+)
+from exceptions import DatasetError
+
+
+FLAG_VALUES = {"yes", "no", "true", "false", "y", "n", "1", "0"}
+
+# Declared schema of a raw food catalog. Blank optional numbers become 0
+# (or NaN for Fat_Adjusted) and blank choices fall back to the loader's
+# defaults; anything else that does not fit sends the row to quarantine.
+# Undeclared columns are carried through as text.
+FOOD_SCHEMA = {
+    "Food_Item": {"type": "text", "required": True},
+    "Category": {"type": "text"},
+    "Calories": {"type": "number", "required": True, "min": 0},
+    "Protein": {"type": "number", "min": 0},
+    "Carbs": {"type": "number", "min": 0},
+    "Fat": {"type": "number", "min": 0},
+    "Vegetarian": {"type": "choice", "choices": FLAG_VALUES},
+    "Vegan": {"type": "choice", "choices": FLAG_VALUES},
+    "Dosha_Vata": {"type": "choice", "choices": set(DOSHA_MAP)},
+    "Dosha_Pitta": {"type": "choice", "choices": set(DOSHA_MAP)},
+    "Dosha_Kapha": {"type": "choice", "choices": set(DOSHA_MAP)},
+    "Food_Group": {"type": "text"},
+    "Fat_Adjusted": {"type": "number"},
+}
+
+
+def validate_chunk(chunk: pd.DataFrame, schema: Dict = FOOD_SCHEMA) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Check a raw chunk (read with ``dtype=str``) against the schema.
+
+    Returns the chunk with number columns converted, and the reasons each
+    row was rejected ('' for valid rows).
+    """
+    reasons = pd.Series("", index=chunk.index, dtype=object)
+
+    for col, spec in schema.items():
+        if col not in chunk.columns:
+            continue
+
+        raw = chunk[col]
+        text = raw.str.strip()
+        blank = text.isna() | (text == "")
+
+        if spec.get("required"):
+            reasons[blank] += f"{col}: missing; "
+
+        if spec["type"] == "number":
+            values = pd.to_numeric(text.where(~blank), errors="coerce")
+            bad = ~blank & ~np.isfinite(values)
+            reasons[bad] += f"{col}: not a number '" + raw[bad] + "'; "
+            if "min" in spec:
+                below = ~bad & (values < spec["min"])
+                reasons[below] += f"{col}: below {spec['min']}; "
+            chunk[col] = values
+
+        elif spec["type"] == "choice":
+            bad = ~blank & ~text.str.lower().isin(spec["choices"])
+            reasons[bad] += f"{col}: unexpected value '" + raw[bad] + "'; "
+
+    return chunk, reasons.str.rstrip("; ")
+
+
+class _ColumnProfile:
+    """What the first pass learns about a processed column"""
+
+    def __init__(self, dtype: np.dtype):
+        self.dtype = dtype
+        self.width = 1
+        self.has_nulls = False
+        self.values: Optional[set] = set()
+
+    @property
+    def is_text(self) -> bool:
+        return self.dtype == object
+
+    def update(self, series: pd.Series) -> None:
+        if not self.is_text:
+            return
+        nulls = series.isna()
+        self.has_nulls = self.has_nulls or bool(nulls.any())
+        present = series[~nulls]
+        if len(present):
+            self.width = max(self.width, int(present.str.len().max()))
+        if self.values is not None:
+            self.values.update(present.unique())
+            if len(self.values) > CATEGORICAL_MAX_CATEGORIES:
+                self.values = None
+
+
+class FoodCatalogIngest:
+    """
+    Two-pass chunked conversion of a food CSV into a processed snapshot.
+
+    The first pass validates every chunk, writes rejected rows to the
+    quarantine file and profiles the valid rows (row count, string widths,
+    distinct values). The second pass re-reads the CSV and writes each
+    chunk into memory-mapped column files laid out exactly like
+    ``SnapshotCache.store``, so peak memory is bounded by the chunk size
+    rather than the catalog size. The resulting snapshot loads like one
+    built by ``DatasetLoader._process_food_frame``.
+    """
+
+    def __init__(self, path: str, cache: Optional[SnapshotCache] = None,
+                 chunk_rows: Optional[int] = None, quarantine_path: Optional[str] = None):
+        self.path = path
+        self.cache = cache or snapshot_cache
+        self.chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self.quarantine_path = quarantine_path or os.path.join(
+            settings.INGEST_QUARANTINE_DIR, f"{stem}.quarantine.csv"
+        )
+
+    def _read_chunks(self) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(self.path, dtype=str, chunksize=self.chunk_rows) as reader:
+            for chunk in reader:
+                chunk.columns = [c.strip() for c in chunk.columns]
+                yield chunk
+
+    @staticmethod
+    def _check_header(columns: List[str]) -> None:
+        required = [col for col, spec in FOOD_SCHEMA.items() if spec.get("required")]
+        missing = [col for col in required if col not in columns]
+        if missing:
+            raise DatasetError(
+                f"Missing required columns in food dataset: {missing}",
+                "MISSING_COLUMNS"
+            )
+
+    @staticmethod
+    def _split_chunk(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Processed valid rows and the raw rejected rows (with reasons) of a chunk"""
+        coerced, reasons = validate_chunk(chunk.copy())
+        rejected = reasons != ""
+
+        quarantined = chunk[rejected].copy()
+        quarantined.insert(0, "reasons", reasons[rejected])
+        quarantined.insert(0, "row", quarantined.index + 1)
+
+        processed = DatasetLoader._clean_food_frame(coerced[~rejected].copy())
+        for col, dtype in FOOD_COLUMN_DTYPES.items():
+            if col in processed.columns:
+                processed[col] = processed[col].astype(dtype)
+        return processed, quarantined
+
+    def processed_chunks(self) -> Iterator[pd.DataFrame]:
+        """Processed valid rows of each chunk, skipping rejected rows without quarantining them"""
+        for chunk in self._read_chunks():
+            self._check_header(list(chunk.columns))
+            yield self._split_chunk(chunk)[0]
+
+    def _profile(self) -> Tuple[int, int, Dict[str, _ColumnProfile]]:
+        """First pass: validate, quarantine and profile; returns (rows, rejected, profiles)"""
+        rows = rejected = 0
+        profiles: Dict[str, _ColumnProfile] = {}
+
+        if os.path.exists(self.quarantine_path):
+            os.remove(self.quarantine_path)
+
+        for chunk in self._read_chunks():
+            self._check_header(list(chunk.columns))
+            processed, quarantined = self._split_chunk(chunk)
+
+            if len(quarantined):
+                os.makedirs(os.path.dirname(self.quarantine_path) or ".", exist_ok=True)
+                quarantined.to_csv(self.quarantine_path, mode="a", index=False,
+                                   header=rejected == 0)
+                rejected += len(quarantined)
+
+            if not len(processed):
+                continue
+            if not profiles:
+                profiles = {col: _ColumnProfile(processed[col].dtype) for col in processed.columns}
+            for col, profile in profiles.items():
+                profile.update(processed[col])
+            rows += len(processed)
+
+        return rows, rejected, profiles
+
+    def _open_columns(self, staging: str, rows: int, profiles: Dict[str, _ColumnProfile]) -> List[Dict]:
+        """Create the memory-mapped column files and their metadata entries"""
+        columns = []
+        for i, (name, profile) in enumerate(profiles.items()):
+            base = os.path.join(staging, f"col{i}")
+
+            if not profile.is_text:
+                target = np.lib.format.open_memmap(f"{base}.npy", mode="w+", dtype=profile.dtype, shape=(rows,))
+                columns.append({"meta": {"name": name, "kind": "numeric"}, "values": target})
+
+            elif name not in FOOD_KEY_COLUMNS and profile.values is not None \
+                    and is_low_cardinality(len(profile.values), rows):
+                categories = pd.Index(sorted(profile.values))
+                code_dtype = np.int8 if len(categories) < 127 else np.int16 if len(categories) < 32767 else np.int32
+                target = np.lib.format.open_memmap(f"{base}.npy", mode="w+", dtype=code_dtype, shape=(rows,))
+                columns.append({
+                    "meta": {"name": name, "kind": "category", "categories": list(categories), "ordered": False},
+                    "values": target, "categories": categories,
+                })
+
+            else:
+                target = np.lib.format.open_memmap(f"{base}.npy", mode="w+", dtype=f"<U{profile.width}", shape=(rows,))
+                nulls = (np.lib.format.open_memmap(f"{base}.null.npy", mode="w+", dtype=bool, shape=(rows,))
+                         if profile.has_nulls else None)
+                columns.append({
+                    "meta": {"name": name, "kind": "string", "has_nulls": profile.has_nulls},
+                    "values": target, "nulls": nulls,
+                })
+        return columns
+
+    @staticmethod
+    def _write_chunk(columns: List[Dict], processed: pd.DataFrame, start: int) -> None:
+        end = start + len(processed)
+        for column in columns:
+            series = processed[column["meta"]["name"]]
+            kind = column["meta"]["kind"]
+            if kind == "numeric":
+                column["values"][start:end] = series.to_numpy()
+            elif kind == "category":
+                column["values"][start:end] = column["categories"].get_indexer(series)
+            else:
+                column["values"][start:end] = series.fillna("").to_numpy(dtype=str)
+                if column["nulls"] is not None:
+                    column["nulls"][start:end] = series.isna().to_numpy()
+
+    def run(self, content_hash: Optional[str] = None) -> Dict:
+        """Ingest the CSV into the snapshot cache and return a summary report"""
+        content_hash = content_hash or self.cache.file_hash(self.path)
+        logger.info(f"Streaming ingest of {self.path} in chunks of {self.chunk_rows} rows")
+
+        rows, rejected, profiles = self._profile()
+        if rows == 0:
+            raise DatasetError(f"No valid rows in food dataset: {self.path}", "EMPTY_DATASET")
+
+        staging = self.cache.staging_dir("food")
+        try:
+            columns = self._open_columns(staging, rows, profiles)
+
+            start = 0
+            for chunk in self._read_chunks():
+                processed, _ = self._split_chunk(chunk)
+                if list(processed.columns) != list(profiles):
+                    raise DatasetError("Food dataset columns changed during ingest", "INGEST_FAILED")
+                self._write_chunk(columns, processed, start)
+                start += len(processed)
+
+            if start != rows:
+                raise DatasetError("Food dataset changed during ingest", "INGEST_FAILED")
+
+            for column in columns:
+                column["values"].flush()
+                if column.get("nulls") is not None:
+                    column["nulls"].flush()
+            column_meta = [column["meta"] for column in columns]
+            del columns
+
+            snap_dir = self.cache.publish("food", content_hash, staging, rows, column_meta)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        report = {
+            "rows_ingested": rows,
+            "rows_quarantined": rejected,
+            "quarantine_path": self.quarantine_path if rejected else None,
+            "snapshot_dir": snap_dir,
+        }
+        if rejected:
+            logger.warning(f"Quarantined {rejected} food rows: {self.quarantine_path}")
+        logger.success(f"Ingested {rows} food items into {snap_dir}")
+        return report
+
+
+def ingest_food_csv(path: str, cache: Optional[SnapshotCache] = None,
+                    chunk_rows: Optional[int] = None, quarantine_path: Optional[str] = None,
+                    content_hash: Optional[str] = None) -> Dict:
+    """Convenience wrapper around FoodCatalogIngest"""
+    return FoodCatalogIngest(path, cache, chunk_rows, quarantine_path).run(content_hash)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a food CSV into the dataset snapshot cache")
+    parser.add_argument("path", nargs="?", default=settings.FOOD_DATASET_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--quarantine", default=None)
+    args = parser.parse_args()
+
+    print(ingest_food_csv(args.path, chunk_rows=args.chunk_rows, quarantine_path=args.quarantine))
@@ -0,0 +1,139 @@
+"""
+Pre-rendered food lines for LLM prompts
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from food_index import frame_registry
+
+
+SNIPPET_HEADER = "Available Foods (Name | Category | Calories | Protein | Carbs | Fat | Dosha Effects | Diet):"
+
+
+def _text(df: pd.DataFrame, column: str, default: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column].astype(str)
+
+
+def _whole(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column truncated to int the way int() does, as text"""
+    if column not in df.columns:
+        return pd.Series("0", index=df.index, dtype=object)
+    values = np.trunc(df[column].to_numpy(dtype=np.float64, na_value=0.0))
+    return pd.Series(values.astype(np.int64), index=df.index).astype(str)
+
+
+def _tenths(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column rounded to one decimal with Python's round(), as text"""
+    if column not in df.columns:
+        return pd.Series("0.0", index=df.index, dtype=object)
+    values = df[column].to_numpy(dtype=np.float64, na_value=0.0)
+    return pd.Series([str(round(v, 1)) for v in values.tolist()], index=df.index, dtype=object)
+
+
+def _flag(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return df[column].astype(bool).to_numpy()
+
+
+def render_detailed_lines(df: pd.DataFrame) -> np.ndarray:
+    """Static part of each food's make_food_snippet line (everything but the score)"""
+    dosha = pd.Series("", index=df.index, dtype=object)
+    for name in ("Vata", "Pitta", "Kapha"):
+        col = f"Dosha_{name}"
+        if col not in df.columns:
+            continue
+        effect = df[col].to_numpy(dtype=np.float64)
+        sign = np.where(effect > 0, f"{name}+", np.where(effect < 0, f"{name}-", ""))
+        dosha = dosha + np.where((dosha != "") & (sign != ""), ",", "") + sign
+    dosha = dosha.mask(dosha == "", "neutral")
+
+    diet = np.where(_flag(df, "is_vegan"), "vegan", np.where(_flag(df, "is_veg"), "veg", "non-veg"))
+
+    lines = (
+        _text(df, "Food_Item", "Unknown").str[:30] + " | "
+        + _text(df, "Category", "").str[:15] + " | "
+        + _whole(df, "Calories") + "cal | "
+        + _tenths(df, "Protein") + "p | "
+        + _tenths(df, "Carbs") + "c | "
+        + _tenths(df, "Fat") + "f | "
+        + dosha + " | " + diet
+    )
+    return lines.to_numpy(dtype=object)
+
+
+def render_brief_lines(df: pd.DataFrame) -> np.ndarray:
+    """Static part of each food's short 'Name (N cal' line, without the closing score"""
+    lines = _text(df, "Food_Item", "Unknown") + " (" + _whole(df, "Calories") + " cal"
+    return lines.to_numpy(dtype=object)
+
+
+class SnippetLines:
+    """
+    Prompt lines for every food of a catalog, rendered once.
+
+    Only the per-user score suffix is added at request time; selecting
+    lines for a candidate frame is an index lookup plus a string join.
+    Candidate frames are matched to the catalog by index label, so they
+    must be row subsets of the catalog the lines were rendered from.
+    """
+
+    def __init__(self, food_df: pd.DataFrame):
+        self.labels = food_df.index
+        self.detailed = render_detailed_lines(food_df)
+        self.brief = render_brief_lines(food_df)
+
+    @classmethod
+    def from_delta(cls, previous: "SnippetLines", food_df: pd.DataFrame, row_map: np.ndarray) -> "SnippetLines":
+        """
+        Lines for an updated catalog, reusing ``previous`` for unchanged rows.
+
+        ``row_map`` comes from ``diff_catalogs``: only rows mapped to -1 are
+        rendered; the others are carried over by position.
+        """
+        carried = np.flatnonzero(row_map >= 0)
+        fresh = np.flatnonzero(row_map < 0)
+        source = row_map[carried]
+        fresh_df = food_df.iloc[fresh]
+
+        lines = cls.__new__(cls)
+        lines.labels = food_df.index
+        for kind, render in (("detailed", render_detailed_lines), ("brief", render_brief_lines)):
+            merged = np.empty(len(food_df), dtype=object)
+            merged[carried] = getattr(previous, kind)[source]
+            merged[fresh] = render(fresh_df)
+            setattr(lines, kind, merged)
+        return lines
+
+    def positions(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """Catalog positions of a candidate frame's rows, or None if they can't all be found"""
+        if not self.labels.is_unique:
+            return None
+        positions = self.labels.get_indexer(df.index)
+        if (positions < 0).any():
+            return None
+        return positions
+
+
+def _render_lines(food_df: pd.DataFrame) -> SnippetLines:
+    lines = SnippetLines(food_df)
+    logger.debug(f"Rendered prompt lines for {len(food_df)} foods")
+    return lines
+
+
+_snippet_lines = frame_registry(_render_lines)
+
+
+def get_snippet_lines(food_df: pd.DataFrame) -> SnippetLines:
+    """Return the SnippetLines for a catalog frame, rendering them on first use"""
+    return _snippet_lines(food_df)
+
+
+def register_snippet_lines(food_df: pd.DataFrame, lines: SnippetLines) -> SnippetLines:
+    """Make ``lines`` the ones get_snippet_lines returns for this frame"""
+    return _snippet_lines.register(food_df, lines)
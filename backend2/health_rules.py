@@ -0,0 +1,228 @@
+"""
+Health-condition food rules loaded from a clinician-editable table
+"""
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import settings
+from exceptions import DatasetError
+
+
+# Used when the rules file is missing
+DEFAULT_RULES = {
+    'diabetes': ('sugar', 'honey', 'jaggery', 'sweet'),
+    'hypertension': ('salt', 'sodium', 'pickle'),
+    'heart disease': ('saturated fat', 'trans fat', 'cholesterol'),
+    'kidney disease': ('protein', 'sodium', 'potassium'),
+    'ibs': ('spicy', 'high fiber', 'dairy'),
+    'gout': ('purine', 'organ meat', 'alcohol'),
+}
+
+RULE_COLUMNS = ("condition", "avoid_term")
+
+# Distinct free-text conditions whose matching rules are remembered per rule set
+MATCH_CACHE_SIZE = 4096
+
+
+def parse_conditions(health_conditions: Optional[str]) -> List[str]:
+    """Comma-separated conditions, lowercased and stripped"""
+    if not health_conditions:
+        return []
+    return [c.strip().lower() for c in str(health_conditions).split(',') if c.strip()]
+
+
+class HealthRules:
+    """
+    Condition -> avoid-term rules.
+
+    A free-text condition triggers every rule whose name contains it or
+    is contained in it ("type 2 diabetes" and "diabet" both trigger
+    "diabetes"). Matches of the most recent MATCH_CACHE_SIZE condition
+    strings are memoized.
+    """
+
+    def __init__(self, rules: Dict[str, Iterable[str]], source: Optional[str] = None):
+        self.rules: Dict[str, Tuple[str, ...]] = {
+            condition: tuple(dict.fromkeys(terms)) for condition, terms in rules.items()
+        }
+        self.source = source
+        # Conditions are client free text, so the memo is bounded
+        self.matching_rules = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match)
+
+    def __getstate__(self) -> Dict:
+        # The memo wraps a bound method and is rebuilt, not pickled
+        return {"rules": self.rules, "source": self.source}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state["rules"], state["source"])
+
+    def _match(self, condition: str) -> Tuple[str, ...]:
+        """Names of the rules a single (lowercased) condition triggers"""
+        return tuple(rule for rule in self.rules if condition in rule or rule in condition)
+
+    def avoid_terms(self, health_conditions: Optional[str]) -> List[str]:
+        """Food terms to avoid for comma-separated health conditions"""
+        terms = set()
+        for condition in parse_conditions(health_conditions):
+            for rule in self.matching_rules(condition):
+                terms.update(self.rules[rule])
+        return list(terms)
+
+    def uncovered(self, conditions: Iterable[str]) -> List[str]:
+        """Conditions that trigger no rule"""
+        normalized = {c.strip().lower() for c in conditions if c.strip()}
+        return sorted(c for c in normalized if not self.matching_rules(c))
+
+
+def load_health_rules(path: Optional[str] = None) -> HealthRules:
+    """
+    Read the rules table: one ``condition,avoid_term`` pair per row; any
+    other columns (e.g. ``note``) are ignored. Falls back to
+    DEFAULT_RULES when the file does not exist.
+    """
+    path = path or settings.HEALTH_RULES_PATH
+    if not os.path.exists(path):
+        logger.warning(f"Health rules file not found: {path}, using built-in rules")
+        return HealthRules(DEFAULT_RULES)
+
+    try:
+        df = pd.read_csv(path, dtype=str, skipinitialspace=True)
+    except Exception as e:
+        raise DatasetError(f"Failed to read health rules: {e}", "LOAD_FAILED")
+
+    df.columns = [c.strip().lower() for c in df.columns]
+    missing = [col for col in RULE_COLUMNS if col not in df.columns]
+    if missing:
+        raise DatasetError(f"Missing required columns in health rules: {missing}", "MISSING_COLUMNS")
+
+    rules: Dict[str, List[str]] = {}
+    for condition, term in zip(df["condition"], df["avoid_term"]):
+        if pd.isna(condition) or pd.isna(term) or not condition.strip() or not term.strip():
+            continue
+        rules.setdefault(condition.strip().lower(), []).append(term.strip().lower())
+
+    logger.info(f"Loaded {len(rules)} health condition rules from {path}")
+    return HealthRules(rules, source=path)
+
+
+_current: Optional[HealthRules] = None
+_current_lock = threading.Lock()
+
+
+def get_health_rules() -> HealthRules:
+    """The active rule set, loaded on first use"""
+    global _current
+    if _current is None:
+        with _current_lock:
+            if _current is None:
+                _current = load_health_rules()
+    return _current
+
+
+def read_health_rules() -> HealthRules:
+    """
+    Re-read the rules file without activating it; the active rule set if
+    the file can't be read. Snapshots read their rules with this and make
+    them active only once published.
+    """
+    try:
+        return load_health_rules()
+    except DatasetError as e:
+        logger.error(f"Health rules reload failed, keeping current rules: {e.message}")
+        return get_health_rules()
+
+
+def activate_health_rules(rules: HealthRules) -> None:
+    """Make ``rules`` the active rule set"""
+    global _current
+    with _current_lock:
+        _current = rules
+
+
+class ConditionMasks:
+    """
+    Health rules compiled against one food catalog.
+
+    Every rule becomes an exclusion mask over the catalog when compiled.
+    A condition string resolves to the rules it triggers, and the OR of
+    those rules' masks is memoized per rule combination, so the memo is
+    bounded by the rule set rather than by what clients send; a patient
+    with several conditions costs a few lookups and mask ORs.
+    """
+
+    def __init__(self, index, rules: HealthRules, conditions: Iterable[str] = (),
+                 rule_masks: Optional[Dict[str, np.ndarray]] = None):
+        self.rules = rules
+        self.size = index.size
+        self.rule_masks: Dict[str, np.ndarray] = rule_masks if rule_masks is not None else {
+            rule: index.term_mask(list(terms)) for rule, terms in rules.rules.items()
+        }
+        self._combination_masks: Dict[Tuple[str, ...], Optional[np.ndarray]] = {(): None}
+        self._lock = threading.Lock()
+        for condition in conditions:
+            self.condition_mask(condition.strip().lower())
+
+    @classmethod
+    def from_delta(cls, previous: "ConditionMasks", index, rules: HealthRules,
+                   row_map: np.ndarray, conditions: Iterable[str] = ()) -> "ConditionMasks":
+        """
+        Masks for an updated catalog, reusing ``previous`` for unchanged rows.
+
+        ``row_map`` comes from ``diff_catalogs``: each rule's exclusions are
+        carried over by position and only rows mapped to -1 are matched.
+        Rules that are new or whose terms changed are compiled in full.
+        """
+        carried = np.flatnonzero(row_map >= 0)
+        fresh = np.flatnonzero(row_map < 0)
+        source = row_map[carried]
+
+        rule_masks: Dict[str, np.ndarray] = {}
+        for rule, terms in rules.rules.items():
+            old = previous.rule_masks.get(rule)
+            if old is None or previous.rules.rules.get(rule) != terms:
+                rule_masks[rule] = index.term_mask(list(terms))
+                continue
+            mask = np.empty(index.size, dtype=bool)
+            mask[carried] = old[source]
+            mask[fresh] = index.term_mask(list(terms), rows=fresh)
+            rule_masks[rule] = mask
+        return cls(index, rules, conditions, rule_masks)
+
+    def condition_mask(self, condition: str) -> Optional[np.ndarray]:
+        """Foods a single (lowercased) condition excludes, or None if no rule applies"""
+        matches = self.rules.matching_rules(condition)
+        if matches in self._combination_masks:
+            return self._combination_masks[matches]
+
+        mask = self.rule_masks[matches[0]].copy()
+        for rule in matches[1:]:
+            mask |= self.rule_masks[rule]
+        mask.flags.writeable = False
+        with self._lock:
+            self._combination_masks[matches] = mask
+        return mask
+
+    def exclusion_mask(self, health_conditions: Optional[str]) -> Optional[np.ndarray]:
+        """Foods to exclude for comma-separated health conditions, or None if none apply"""
+        excluded = None
+        for condition in parse_conditions(health_conditions):
+            mask = self.condition_mask(condition)
+            if mask is not None:
+                excluded = mask.copy() if excluded is None else excluded | mask
+        return excluded
+
+
+def condition_masks_for(index) -> ConditionMasks:
+    """
+    Compiled rules of a FoodIndex. Snapshots compile them when built;
+    other indexes compile the active rules on first use.
+    """
+    if index.condition_masks is None:
+        index.condition_masks = ConditionMasks(index, get_health_rules())
+    return index.condition_masks
@@ -0,0 +1,180 @@
+"""
+Persistent cache of parsed LLM responses, shared across worker processes
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from config import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    prompt_chars INTEGER NOT NULL,
+    response_chars INTEGER NOT NULL,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses (last_access);
+"""
+
+# Seconds a writer waits for another process's lock before giving up
+BUSY_TIMEOUT = 5.0
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed LRU cache of parsed LLM responses with a TTL.
+
+    Entries are keyed by a hash of everything that determines the
+    response (model, messages, temperature, max_tokens) and store the
+    parsed JSON with metadata: model, sizes, the original call's latency,
+    and access time and count. The database runs in WAL mode with a busy
+    timeout, so gunicorn workers can share one file; each thread keeps
+    its own connection. Eviction to ``max_entries`` happens on write, by
+    least recent access. Store failures are logged and ignored, since a
+    cache must never fail a request.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.db_path = db_path or settings.LLM_CACHE_PATH
+        self.max_entries = settings.LLM_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl_seconds = settings.LLM_CACHE_TTL if ttl_seconds is None else ttl_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(model: str, messages: Any, temperature: float, max_tokens: int) -> str:
+        """Hash of a request's model, messages, temperature and max_tokens"""
+        payload = json.dumps([model, messages, round(float(temperature), 6), int(max_tokens)],
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread, creating the database on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Parsed response for key, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connection()
+            now = time.time()
+            row = conn.execute("SELECT response, expires FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_responses WHERE key = ? AND expires < ?", (key, now))
+                self._count("misses")
+                return None
+            conn.execute("UPDATE llm_responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            value = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self._count("errors")
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        self._count("hits")
+        return value
+
+    def put(self, key: str, value: Any, model: str, prompt_chars: int = 0,
+            latency: Optional[float] = None) -> bool:
+        """Store a parsed response; returns False if it was not stored"""
+        if not self.enabled:
+            return False
+        try:
+            response = json.dumps(value, ensure_ascii=False)
+            now = time.time()
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses "
+                    "(key, model, response, created, expires, last_access, hits, prompt_chars, "
+                    "response_chars, latency) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                    (key, model, response, now, now + self.ttl_seconds, now, prompt_chars, len(response), latency)
+                )
+                conn.execute("DELETE FROM llm_responses WHERE expires < ?", (now,))
+                conn.execute(
+                    "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses "
+                    "ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return True
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._count("errors")
+            logger.warning(f"LLM cache write failed: {e}")
+            return False
+
+    def delete(self, key: str) -> None:
+        """Drop an entry, e.g. a response that parsed but was unusable"""
+        try:
+            self._connection().execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache delete failed: {e}")
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM llm_responses")
+        with self._lock:
+            self.hits = self.misses = self.errors = 0
+
+    def stats(self) -> Dict:
+        """Entry count and size on disk, plus this process's hit/miss counters"""
+        entries = size = 0
+        if self.enabled:
+            try:
+                entries, size = self._connection().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(response_chars), 0) FROM llm_responses"
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache stats failed: {e}")
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "response_chars": size,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Global cache instance
+llm_cache = LLMResponseCache()
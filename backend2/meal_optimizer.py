@@ -0,0 +1,356 @@
+"""
+Deterministic local meal-plan optimizer over scored candidate foods
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from calorie_calculator import CALORIES_PER_GRAM, MACRO_RATIOS
+from exceptions import MealPlanGenerationError
+
+
+# Share of daily calories per meal
+MEAL_SPLIT = {"breakfast": 0.25, "lunch": 0.40, "dinner": 0.30, "snacks": 0.05}
+
+ITEMS_PER_MEAL = {"breakfast": 2, "lunch": 3, "dinner": 3, "snacks": 1}
+
+# Food groups that suit each meal; other groups are allowed, just not preferred
+MEAL_GROUPS = {
+    "breakfast": ("Grains", "Fruits", "Dairy Products", "Beverages", "Legumes/Pulses"),
+    "lunch": ("Grains", "Legumes/Pulses", "Vegetables", "Non-Veg Protein", "Dairy Products"),
+    "dinner": ("Grains", "Vegetables", "Legumes/Pulses", "Non-Veg Protein"),
+    "snacks": ("Fruits", "Beverages", "Sweets/Desserts", "Dairy Products"),
+}
+
+# Servings are multiples of PORTION_STEP between these bounds
+PORTION_STEP = 0.25
+MIN_PORTION = 0.25
+MAX_PORTION = 3.0
+
+# Meals within this share of their calorie target need no repair
+MEAL_TOLERANCE = 0.10
+
+# Each macro's share of the day's calories may be this far from MACRO_RATIOS
+MACRO_TOLERANCE = 0.05
+
+# Most foods swapped per day to bring its macros within tolerance, and the
+# least a swap must cut the day's macro deviation (L1 of shares) by
+MAX_MACRO_SWAPS = 8
+MIN_MACRO_GAIN = 0.02
+
+# A food is not repeated within this many days while others are available
+VARIETY_DAYS = 3
+
+# Cost weights of a candidate for one slot of a meal
+CALORIE_WEIGHT = 2.0
+MACRO_WEIGHT = 3.0
+SCORE_WEIGHT = 1.0
+GROUP_BONUS = 0.3
+SAME_GROUP_PENALTY = 0.5
+REPEAT_PENALTY = 0.2
+
+MACROS = tuple(MACRO_RATIOS)
+MACRO_COLUMNS = {"protein": "Protein", "carb": "Carbs", "fat": "Fat"}
+
+# Foods richest in each macro that macro_reserve adds to a candidate pool
+MACRO_RESERVE = 15
+
+
+def macro_reserve(food_df: pd.DataFrame, per_macro: int = MACRO_RESERVE) -> pd.Index:
+    """
+    Labels of the foods with the highest share of calories from each macro.
+
+    Top-scored candidates can all lean one way (a kapha pool holds almost
+    no fat), leaving the optimizer nothing to balance a day with; these
+    foods are worth adding to the pool it plans from.
+    """
+    columns = [MACRO_COLUMNS[m] for m in MACROS]
+    if len(food_df) == 0 or not set(columns) <= set(food_df.columns):
+        return food_df.index[:0]
+    macro_calories = np.nan_to_num(food_df[columns].to_numpy(dtype=np.float64)) \
+        * np.array([CALORIES_PER_GRAM[m] for m in MACROS])
+    total = macro_calories.sum(axis=1)
+    shares = np.where(total[:, None] > 0, macro_calories / np.maximum(total, 1e-9)[:, None], 0.0)
+    picks = np.unique(np.concatenate([
+        np.argsort(-shares[:, i], kind="stable")[:per_macro] for i in range(len(MACROS))
+    ]))
+    return food_df.index[picks]
+
+
+class MealOptimizer:
+    """
+    Greedy day-by-day meal assembly with portion repair.
+
+    Each meal fills its slots one food at a time. Every candidate is
+    costed at once, vectorized: the portion that best fills the meal's
+    remaining calories, how far the day's macro split drifts from the
+    target after adding it, its user score, whether its food group suits
+    the meal, and how often it has been used. Foods eaten in the last
+    VARIETY_DAYS days are skipped while anything else fits, and a meal's
+    last food must bring it within MEAL_TOLERANCE of its calorie target
+    when one can. Failing that, portions are nudged a step at a time.
+
+    Once a day is assembled, foods are swapped out, best swap first, while
+    any macro's share of the day is more than MACRO_TOLERANCE from
+    MACRO_RATIOS. A swap keeps its meal within MEAL_TOLERANCE, respects
+    the variety rule and stays within the meal's food groups. Ties go to
+    the higher-ranked candidate, so the same inputs always give the same
+    plan.
+    """
+
+    def __init__(self, meal_split: Optional[Dict[str, float]] = None,
+                 items_per_meal: Optional[Dict[str, int]] = None,
+                 variety_days: int = VARIETY_DAYS, meal_tolerance: float = MEAL_TOLERANCE,
+                 macro_tolerance: float = MACRO_TOLERANCE):
+        self.meal_split = meal_split or MEAL_SPLIT
+        self.items_per_meal = items_per_meal or ITEMS_PER_MEAL
+        self.variety_days = variety_days
+        self.meal_tolerance = meal_tolerance
+        self.macro_tolerance = macro_tolerance
+
+    def optimize(self, food_df: pd.DataFrame, daily_calories: float, days: int,
+                 dosha: Optional[str] = None) -> Dict:
+        """A plan in the LLM strategies' format: day_N meals, totals and summary"""
+        if daily_calories <= 0 or days <= 0:
+            raise MealPlanGenerationError("Local optimizer needs positive calories and days")
+
+        calories = (food_df["Calories"].to_numpy(dtype=np.float64) if "Calories" in food_df.columns
+                    else np.zeros(len(food_df)))
+        usable = np.flatnonzero(np.nan_to_num(calories) > 0)
+        if len(usable) == 0:
+            raise MealPlanGenerationError("No candidate foods with calories to plan from")
+
+        foods = food_df.iloc[usable]
+        calories = calories[usable]
+        grams = np.column_stack([
+            np.nan_to_num(foods[MACRO_COLUMNS[m]].to_numpy(dtype=np.float64)) if MACRO_COLUMNS[m] in foods.columns
+            else np.zeros(len(foods))
+            for m in MACROS
+        ])
+        macro_calories = grams * np.array([CALORIES_PER_GRAM[m] for m in MACROS])
+        ratios = np.array([MACRO_RATIOS[m] for m in MACROS])
+
+        if "user_score" in foods.columns:
+            score = foods["user_score"].to_numpy(dtype=np.float64)
+            span = np.nanmax(score) - np.nanmin(score)
+            score = np.nan_to_num((score - np.nanmin(score)) / span) if span > 0 else np.ones(len(foods))
+        else:
+            score = np.ones(len(foods))
+
+        groups = (foods["Food_Group"].astype(str).to_numpy() if "Food_Group" in foods.columns
+                  else np.full(len(foods), "", dtype=object))
+        group_codes, group_names = pd.factorize(groups)
+        suits = {meal: np.isin(groups, MEAL_GROUPS.get(meal, ())) for meal in self.meal_split}
+        details = self._details(foods, groups)
+
+        last_used = np.full(len(foods), -self.variety_days - 1)
+        uses = np.zeros(len(foods))
+        plan: Dict = {}
+        totals: Dict[str, int] = {}
+        meal_errors: List[float] = []
+        macro_errors: List[float] = []
+        macro_misses = 0
+
+        for day in range(days):
+            day_macros = np.zeros(len(MACROS))
+            day_calories = 0.0
+            today = np.zeros(len(foods), dtype=bool)
+            chosen: Dict[str, Tuple[List[int], List[float], float]] = {}
+            meals = {}
+
+            for meal, share in self.meal_split.items():
+                target = daily_calories * share
+                slots = self.items_per_meal.get(meal, 1)
+                picks: List[int] = []
+                portions: List[float] = []
+                meal_calories = 0.0
+                meal_macros = np.zeros(len(MACROS))
+                meal_groups = np.zeros(len(group_names), dtype=bool)
+                base_cost = -SCORE_WEIGHT * score - GROUP_BONUS * suits[meal] + REPEAT_PENALTY * uses
+                for slot in range(slots):
+                    wanted = max(target - meal_calories, 0.0) / (slots - slot)
+                    portion = self._portions(wanted / calories)
+                    fill = np.abs(portion * calories - wanted) / max(wanted, 1.0)
+
+                    # Macro split of the day so far with this food added, against the target split
+                    macros = (day_macros + meal_macros)[None, :] + portion[:, None] * macro_calories
+                    shares = macros / np.maximum(macros.sum(axis=1, keepdims=True), 1.0)
+                    macro_dev = np.abs(shares - ratios).sum(axis=1)
+
+                    cost = base_cost + CALORIE_WEIGHT * fill + MACRO_WEIGHT * macro_dev
+                    if picks:
+                        cost = cost + SAME_GROUP_PENALTY * meal_groups[group_codes]
+
+                    # Recently eaten foods only when nothing else is left
+                    blocked = today | (last_used >= day - self.variety_days)
+                    if blocked.all():
+                        blocked = today
+                    if blocked.all():
+                        blocked = np.zeros(len(foods), dtype=bool)
+                    if slot == slots - 1:
+                        # The last food has to land the meal on target if any food can
+                        misses = np.abs(portion * calories - wanted) > self.meal_tolerance * target
+                        if not (blocked | misses).all():
+                            blocked = blocked | misses
+                    choice = int(np.argmin(np.where(blocked, np.inf, cost)))
+
+                    picks.append(choice)
+                    portions.append(float(portion[choice]))
+                    today[choice] = True
+                    meal_calories += portions[-1] * calories[choice]
+                    meal_macros += portions[-1] * macro_calories[choice]
+                    meal_groups[group_codes[choice]] = True
+
+                portions = self._repair(calories[picks], portions, target)
+                day_macros = day_macros + macro_calories[picks].T @ np.array(portions)
+                chosen[meal] = (picks, portions, target)
+
+            # Swaps may bring in any food the variety rule allows today
+            allowed = ~(today | (last_used >= day - self.variety_days))
+            day_macros = self._balance_macros(chosen, calories, macro_calories, ratios, day_macros,
+                                              allowed, suits, groups)
+            today = np.zeros(len(foods), dtype=bool)
+            for meal, (picks, portions, target) in chosen.items():
+                today[picks] = True
+                meal_calories = float(np.dot(portions, calories[picks]))
+                meal_errors.append(abs(meal_calories - target) / target)
+                day_calories += meal_calories
+                meals[meal] = [self._item(details, grams, calories, i, p, dosha)
+                               for i, p in zip(picks, portions)]
+
+            last_used[today] = day
+            uses[today] += 1
+            shares = day_macros / max(day_macros.sum(), 1.0)
+            macro_errors.append(float(np.abs(shares - ratios).sum()))
+            macro_misses += int(np.abs(shares - ratios).max() > self.macro_tolerance)
+            plan[f"day_{day + 1}"] = meals
+            totals[f"day_{day + 1}"] = int(round(day_calories))
+
+        plan["totals"] = totals
+        plan["summary"] = {
+            "total_foods_used": int((uses > 0).sum()),
+            "dosha_focus": dosha,
+            "avg_daily_calories": int(round(sum(totals.values()) / days)),
+            "max_meal_calorie_error": round(max(meal_errors), 3),
+            # L1 distance of the daily macro calorie split from MACRO_RATIOS
+            "avg_macro_deviation": round(float(np.mean(macro_errors)), 3),
+            "days_outside_macro_tolerance": macro_misses,
+            "method": "local_optimizer"
+        }
+        logger.info(f"Optimized {days}-day plan from {len(foods)} foods, "
+                    f"{plan['summary']['total_foods_used']} used")
+        if macro_misses:
+            logger.warning(f"{macro_misses} of {days} days miss the macro targets by more than "
+                           f"{self.macro_tolerance:.0%}; the candidates lack foods to balance them")
+        return plan
+
+    @staticmethod
+    def _portions(servings: np.ndarray) -> np.ndarray:
+        """Servings rounded to PORTION_STEP within the portion bounds"""
+        return np.clip(np.round(servings / PORTION_STEP) * PORTION_STEP, MIN_PORTION, MAX_PORTION)
+
+    def _repair(self, calories: np.ndarray, portions: List[float], target: float) -> List[float]:
+        """Step portions up or down, best step first, until the meal is within tolerance"""
+        portions = np.array(portions)
+        error = abs(float(portions @ calories) - target)
+        while error > self.meal_tolerance * target:
+            total = float(portions @ calories)
+            best, best_error = None, error
+            for i in range(len(portions)):
+                for step in (PORTION_STEP, -PORTION_STEP):
+                    if MIN_PORTION <= portions[i] + step <= MAX_PORTION:
+                        candidate = abs(total + step * calories[i] - target)
+                        if candidate < best_error:
+                            best, best_error = (i, step), candidate
+            if best is None:
+                break
+            portions[best[0]] += best[1]
+            error = best_error
+        return portions.tolist()
+
+    def _balance_macros(self, chosen: Dict[str, Tuple[List[int], List[float], float]],
+                        calories: np.ndarray, macro_calories: np.ndarray, ratios: np.ndarray,
+                        day_macros: np.ndarray, allowed: np.ndarray, suits: Dict[str, np.ndarray],
+                        groups: np.ndarray) -> np.ndarray:
+        """
+        Swap foods of a day, updating ``chosen`` in place, until its macro
+        split is within tolerance or no swap brings it closer. Returns the
+        day's macro calories.
+        """
+        # One row per meal slot of the day
+        slots = [(meal, slot) for meal, (picks, _, _) in chosen.items() for slot in range(len(picks))]
+        targets = np.array([chosen[meal][2] for meal, _ in slots])
+        suitable = np.array([suits[meal] for meal, _ in slots])
+        allowed = allowed.copy()
+        for _ in range(MAX_MACRO_SWAPS):
+            deviation = np.abs(day_macros / max(day_macros.sum(), 1.0) - ratios)
+            if deviation.max() <= self.macro_tolerance:
+                break
+
+            foods = np.array([chosen[meal][0][slot] for meal, slot in slots])
+            portions = np.array([chosen[meal][1][slot] for meal, slot in slots])
+            meal_calories = {meal: float(np.dot(p, calories[f])) for meal, (f, p, _) in chosen.items()}
+            rest = np.array([meal_calories[meal] for meal, _ in slots]) - portions * calories[foods]
+
+            # Every allowed food in every slot at once, at the portion that keeps the meal on target
+            candidates = np.flatnonzero(allowed)
+            portion_new = self._portions(np.maximum(targets - rest, 0.0)[:, None] / calories[candidates])
+            usable = (np.abs(rest[:, None] + portion_new * calories[candidates] - targets[:, None])
+                      <= self.meal_tolerance * targets[:, None])
+            usable &= suitable[:, candidates] | (groups[candidates][None, :] == groups[foods][:, None])
+            base = day_macros[None, :] - portions[:, None] * macro_calories[foods]
+            # Per macro, (slot, food) calories of the day after the swap
+            macros = [base[:, m, None] + portion_new * macro_calories[candidates, m] for m in range(len(ratios))]
+            total = np.maximum(sum(macros), 1.0)
+            error = sum(np.abs(macro / total - ratio) for macro, ratio in zip(macros, ratios))
+            error = np.where(usable, error, np.inf)
+
+            row, column = np.unravel_index(int(np.argmin(error)), error.shape)
+            if not error[row, column] < deviation.sum() - MIN_MACRO_GAIN:
+                break
+            meal, slot = slots[row]
+            choice = int(candidates[column])
+            chosen[meal][0][slot] = choice
+            chosen[meal][1][slot] = float(portion_new[row, column])
+            allowed[choice] = False
+            day_macros = np.array([macro[row, column] for macro in macros])
+        return day_macros
+
+    @staticmethod
+    def _details(foods: pd.DataFrame, groups: np.ndarray) -> List[Dict]:
+        """Name, ingredients and reason stem of each food, read once"""
+        names = (foods["Food_Item"].astype(str).tolist() if "Food_Item" in foods.columns
+                 else [f"Food {i + 1}" for i in range(len(foods))])
+        ingredients = (foods["Ingredients"].tolist() if "Ingredients" in foods.columns
+                       else [None] * len(foods))
+        details = []
+        for name, listed, group in zip(names, ingredients, groups):
+            parts = ([part.strip() for part in listed.split(",") if part.strip()]
+                     if isinstance(listed, str) else [])
+            details.append({"name": name, "ingredients": parts or [name],
+                            "group": group if group not in ("", "nan") else None})
+        return details
+
+    @staticmethod
+    def _item(details: List[Dict], grams: np.ndarray, calories: np.ndarray, i: int, portion: float,
+              dosha: Optional[str]) -> Dict:
+        detail = details[i]
+        reason = f"Balancing for {dosha} dosha" if dosha else "Balanced choice"
+        if detail["group"]:
+            reason += f" ({detail['group']})"
+        return {
+            "name": detail["name"],
+            "ingredients": list(detail["ingredients"]),
+            "portion": f"{portion:g} serving" + ("" if portion == 1 else "s"),
+            "calories": round(float(calories[i] * portion), 1),
+            "protein": round(float(grams[i, 0] * portion), 1),
+            "carbs": round(float(grams[i, 1] * portion), 1),
+            "fat": round(float(grams[i, 2] * portion), 1),
+            "reason": reason
+        }
+
+
+# Global optimizer instance
+meal_optimizer = MealOptimizer()
@@ -93,6 +93,22 @@ class DoshaResult(BaseModel):
     method: str = Field(..., description="Prediction method (ML/LLM/Hybrid)")
 
 
+class FoodFilterRequest(BaseModel):
+    profiles: List[UserProfile] = Field(..., min_length=1, description="Profiles of the cohort")
+    dosha_results: Optional[List[DoshaResult]] = Field(
+        None, description="Known dosha per profile, in profile order; predicted with the ML model when omitted"
+    )
+    top_n: int = Field(50, ge=1, le=200, description="Ranked foods per profile")
+    max_items: int = Field(200, ge=1, le=1000, description="Filtered foods considered per profile")
+    
+    @field_validator('dosha_results')
+    def validate_dosha_results(cls, v, info):
+        profiles = info.data.get('profiles')
+        if v is not None and profiles is not None and len(v) != len(profiles):
+            raise ValueError("dosha_results must have one entry per profile")
+        return v
+
+
 class MealItem(BaseModel):
     name: str = Field(..., description="Dish name")
     ingredients: List[str] = Field(..., description="List of ingredients")
@@ -0,0 +1,119 @@
+"""
+Incremental parsing of streamed meal plan JSON, and Server-Sent Events framing
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class IncrementalPlanParser:
+    """
+    Parses a JSON object that arrives in pieces, one member at a time.
+
+    ``feed`` takes the next chunk of text and returns the top-level
+    ``(key, value)`` members completed by it, so each ``day_N`` of a plan
+    is available as soon as its closing brace arrives rather than when
+    the whole response has. Only brace depth and string/escape state are
+    tracked per character; each member's text is decoded with
+    ``json.loads`` once it is complete. Anything before the first ``{``
+    (prose, a markdown fence) and after the matching ``}`` is ignored.
+    Malformed member text raises ``json.JSONDecodeError``.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.done = False
+        self._in_string = False
+        self._escaped = False
+        # "key", "colon", "value" or "comma", for the top-level object
+        self._expect = "key"
+        self._key_chars: List[str] = []
+        self._key: Optional[str] = None
+        self._value_chars: List[str] = []
+        self.members = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Members of the top-level object completed by ``chunk``"""
+        completed: List[Tuple[str, Any]] = []
+        for char in chunk:
+            if self.done:
+                break
+            if self.depth == 0:
+                if char == "{":
+                    self.depth = 1
+                continue
+
+            if self.depth == 1 and self._expect != "value":
+                self._top_level(char)
+                continue
+
+            # Inside a member's value
+            self._value_chars.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 1:
+                    # A scalar value ended by the object's closing brace
+                    self._value_chars.pop()
+                    self._finish_value(completed)
+                    self.done = True
+                    continue
+                self.depth -= 1
+                if self.depth == 1:
+                    self._finish_value(completed)
+            elif char == "," and self.depth == 1:
+                self._value_chars.pop()
+                self._finish_value(completed)
+                self._expect = "key"
+        return completed
+
+    def _top_level(self, char: str) -> None:
+        """Key, colon and separator characters of the top-level object"""
+        if self._expect == "key":
+            if self._in_string:
+                self._key_chars.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._key = json.loads('"' + "".join(self._key_chars))
+                    self._key_chars = []
+                    self._expect = "colon"
+            elif char == '"':
+                self._in_string = True
+            elif char == "}":
+                self.done = True
+        elif self._expect == "colon":
+            if char == ":":
+                self._expect = "value"
+        elif self._expect == "comma":
+            if char == ",":
+                self._expect = "key"
+            elif char == "}":
+                self.done = True
+
+    def _finish_value(self, completed: List[Tuple[str, Any]]) -> None:
+        text = "".join(self._value_chars).strip()
+        self._value_chars = []
+        self._expect = "comma"
+        if self._key is None or not text:
+            return
+        completed.append((self._key, json.loads(text)))
+        self._key = None
+        self.members += 1
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One Server-Sent Events message carrying ``data`` as JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
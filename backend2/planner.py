@@ -4,22 +4,111 @@ Enhanced meal planner with advanced LLM integration and fallback systems
 import os
 import json
 import re
-from typing import Dict, List, Optional, Any, Union
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple, Union
+
+import numpy as np
+import pandas as pd
 from openai import OpenAI
 from loguru import logger
 
 from config import settings
 from models import UserProfile, DoshaResult, MealPlan, MealItem, DayMeals
-from filter_and_score import filter_foods_for_user, make_food_snippet, score_and_rank_foods
+from filter_and_score import (
+    filter_foods_for_user, food_prompt_lines, make_food_list, make_food_snippet, score_and_rank_foods,
+    select_candidates
+)
+from prompt_packer import prompt_packer
+from meal_optimizer import macro_reserve, meal_optimizer
+from llm_cache import LLMResponseCache, llm_cache
+from plan_stream import IncrementalPlanParser
 from exceptions import MealPlanGenerationError, LLMError
 
 
+# Stands in for the food list while a prompt's own size is estimated
+FOOD_LIST_MARKER = "<<FOOD_LIST>>"
+
+# Ranked candidates the local optimizer plans from
+OPTIMIZER_CANDIDATES = 300
+
+# Sampling temperature of streamed plans (as for _call_llm_and_parse)
+STREAM_TEMPERATURE = 0.7
+
+
+def strategy_name(strategy: Callable) -> str:
+    """Short name of a generation strategy, e.g. structured_prompt"""
+    return getattr(strategy, "__name__", repr(strategy)).replace("_generate_with_", "")
+
+
+class StrategyStats:
+    """
+    Launches, outcomes and latencies of plan generation strategies.
+    
+    A launched strategy ends as exactly one of a win (its plan was used),
+    invalid, an error, or abandoned (a hedged run still in flight when
+    another strategy won). Latencies of the last ``window`` completed
+    runs of each strategy are kept for percentiles.
+    """
+    
+    OUTCOMES = ("wins", "invalid", "errors", "abandoned")
+    
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def _entry(self, name: str) -> Dict:
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = {"launched": 0, **{outcome: 0 for outcome in self.OUTCOMES},
+                     "latencies": deque(maxlen=self.window)}
+            self._stats[name] = entry
+        return entry
+    
+    def launched(self, name: str) -> None:
+        with self._lock:
+            self._entry(name)["launched"] += 1
+    
+    def record(self, name: str, outcome: Optional[str] = None, seconds: Optional[float] = None) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            if outcome is not None:
+                entry[outcome] += 1
+            if seconds is not None:
+                entry["latencies"].append(seconds)
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Counts, win rate and latency percentiles (seconds) per strategy"""
+        with self._lock:
+            result = {}
+            for name, entry in self._stats.items():
+                latencies = np.array(entry["latencies"])
+                result[name] = {
+                    "launched": entry["launched"],
+                    **{outcome: entry[outcome] for outcome in self.OUTCOMES},
+                    "win_rate": round(entry["wins"] / entry["launched"], 3) if entry["launched"] else 0.0,
+                    "latency_p50": round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+                    "latency_p95": round(float(np.percentile(latencies, 95)), 3) if len(latencies) else None,
+                }
+            return result
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
 class MealPlanner:
     """Enhanced meal planner with multiple strategies"""
     
     def __init__(self):
         self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
         self.fallback_templates = self._load_fallback_templates()
+        self.strategy_stats = StrategyStats()
+        # Cache key of the last LLM response parsed on each thread
+        self._llm_call = threading.local()
     
     def _load_fallback_templates(self) -> Dict[str, List[Dict]]:
         """Load fallback meal templates for different doshas"""
@@ -96,28 +185,16 @@ class MealPlanner:
             else:
                 dosha_dict = dosha_info
             
-            target_dosha = dosha_dict.get("dosha")
-            
-            # Filter and score foods
-            candidate_df = filter_foods_for_user(
-                food_df, 
-                user_profile, 
-                target_dosha,
-                max_items=200
-            )
-            
-            if len(candidate_df) < 10:
-                logger.warning("Very few suitable foods found, relaxing filters")
-                candidate_df = filter_foods_for_user(
-                    food_df,
-                    user_profile,
-                    target_dosha,
-                    max_items=200,
-                    dosha_strictness=0.3
+            strategy = ((preferences or {}).get("strategy") or settings.MEAL_PLAN_STRATEGY).lower()
+            if strategy == "local":
+                logger.info("Generating meal plan with the local optimizer")
+                return self._generate_with_local_optimizer(
+                    user_profile, food_df, dosha_dict, daily_calories, days, model, preferences,
+                    catalog=food_df
                 )
             
-            # Score and rank foods
-            scored_df = score_and_rank_foods(candidate_df, user_profile, dosha_dict)
+            # Filter and score foods (memoized for repeated constraints)
+            scored_df = select_candidates(food_df, user_profile, dosha_dict, max_items=200)
             
             # Try different generation strategies
             strategies = [
@@ -126,38 +203,304 @@ class MealPlanner:
                 self._generate_with_template_guidance
             ]
             
-            for i, strategy in enumerate(strategies):
-                try:
-                    logger.info(f"Trying meal plan generation strategy {i+1}")
-                    plan = strategy(
-                        user_profile, scored_df, dosha_dict, 
-                        daily_calories, days, model, preferences
-                    )
-                    
-                    if self._validate_plan(plan, days):
-                        logger.success(f"Meal plan generated successfully with strategy {i+1}")
-                        return plan
-                    else:
-                        logger.warning(f"Strategy {i+1} produced invalid plan")
-                        
-                except Exception as e:
-                    logger.warning(f"Strategy {i+1} failed: {e}")
-                    continue
+            args = (user_profile, scored_df, dosha_dict, daily_calories, days, model, preferences)
+            
+            if settings.PLANNER_HEDGE_DELAY > 0:
+                plan = self._run_hedged(strategies, args, food_df, days, settings.PLANNER_HEDGE_DELAY)
+            else:
+                plan = None
+                for strategy in strategies:
+                    plan = self._run_strategy(strategy, args, food_df, days)
+                    if plan is not None:
+                        break
+            if plan is not None:
+                return plan
+            
+            logger.warning("All LLM strategies failed, using the local optimizer")
+            plan = self._run_strategy(self._generate_with_local_optimizer, args, food_df, days)
+            if plan is not None:
+                return plan
             
             # Ultimate fallback
-            logger.warning("All LLM strategies failed, using fallback template")
+            logger.warning("Using fallback template")
             return self._generate_fallback_plan(user_profile, dosha_dict, daily_calories, days)
             
         except Exception as e:
             logger.error(f"Meal plan generation completely failed: {e}")
             raise MealPlanGenerationError(f"Failed to generate meal plan: {e}")
     
+    def _run_strategy(self, strategy: Callable, args: tuple, catalog, days: int,
+                      settled: Optional[threading.Lock] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run one strategy; its plan if valid, otherwise None. Never raises.
+        
+        Hedged runs pass ``settled``: whoever acquires it first records the
+        run's outcome, so a run the hedge already counted as abandoned
+        records nothing more, and a valid plan's win is left to the hedge.
+        """
+        name = strategy_name(strategy)
+        self.strategy_stats.launched(name)
+        logger.info(f"Trying meal plan generation strategy {name}")
+        self._llm_call.key = None
+        start = time.perf_counter()
+        
+        def finish(outcome: Optional[str], elapsed: float) -> None:
+            if outcome is not None and settled is not None and not settled.acquire(blocking=False):
+                outcome = None
+            self.strategy_stats.record(name, outcome, elapsed)
+        
+        try:
+            plan = strategy(*args, catalog=catalog)
+        except Exception as e:
+            finish("errors", time.perf_counter() - start)
+            logger.warning(f"Strategy {name} failed: {e}")
+            return None
+        
+        elapsed = time.perf_counter() - start
+        if not self._validate_plan(plan, days):
+            finish("invalid", elapsed)
+            logger.warning(f"Strategy {name} produced invalid plan")
+            # Don't serve the same unusable response to the next request
+            if self._llm_call.key is not None:
+                llm_cache.delete(self._llm_call.key)
+            return None
+        
+        if settled is None:
+            finish("wins", elapsed)
+            logger.success(f"Meal plan generated successfully with strategy {name} in {elapsed:.1f}s")
+        else:
+            # Hedged runs settle the win once the first plan arrives
+            finish(None, elapsed)
+        return plan
+    
+    def _run_hedged(self, strategies: List[Callable], args: tuple, catalog, days: int,
+                    delay: float) -> Optional[Dict[str, Any]]:
+        """
+        Run strategies with hedging: start the first, and start the next one
+        whenever ``delay`` seconds pass without a valid plan or a running
+        strategy fails. The first valid plan wins; strategies not yet
+        started are dropped and running ones are left to finish unused.
+        Every launch records exactly one outcome.
+        """
+        executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="plan-strategy")
+        waiting = list(strategies)
+        running: Dict = {}
+        
+        def launch() -> None:
+            strategy = waiting.pop(0)
+            settled = threading.Lock()
+            future = executor.submit(self._run_strategy, strategy, args, catalog, days, settled)
+            running[future] = (strategy, settled)
+        
+        try:
+            launch()
+            while running:
+                done, _ = wait(list(running), timeout=delay if waiting else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    strategy, settled = running.pop(future)
+                    plan = future.result()
+                    if plan is None:
+                        continue
+                    
+                    name = strategy_name(strategy)
+                    settled.acquire()
+                    self.strategy_stats.record(name, "wins")
+                    for other_future, (other, other_settled) in running.items():
+                        # Runs that already failed have recorded their outcome
+                        if not other_future.cancel() and other_settled.acquire(blocking=False):
+                            self.strategy_stats.record(strategy_name(other), "abandoned")
+                    logger.success(f"Meal plan generated successfully with hedged strategy {name}")
+                    return plan
+                
+                # No valid plan yet: the delay passed or a strategy failed
+                if waiting:
+                    logger.info(f"No valid plan yet, hedging with {strategy_name(waiting[0])}")
+                    launch()
+            return None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stream_meal_plan(
+        self,
+        user_profile: UserProfile,
+        food_df,
+        dosha_info: Union[DoshaResult, Dict],
+        daily_calories: float,
+        days: int = 7,
+        model: str = None,
+        preferences: Optional[Dict] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate a plan with the structured prompt, yielding ``(event, data)``
+        while the LLM is still writing it: a ``day`` event as soon as each
+        day closes in the token stream and passes validation, then ``done``
+        with the totals and summary. Days the LLM gets wrong or never sends
+        (everything from the first invalid day, or after the stream fails)
+        come from the local optimizer, so ``days`` days always arrive; each
+        event names its source. ``error`` is sent only if even that fails.
+        """
+        model = model or settings.DEFAULT_MODEL
+        dosha_dict = dosha_info.dict() if hasattr(dosha_info, 'dict') else dosha_info
+        name = "structured_prompt_stream"
+        day_keys = [f"day_{i+1}" for i in range(days)]
+        sent: Dict[str, Dict] = {}
+        extras: Dict[str, Any] = {}
+        first_day = None
+        outcome = "wins"
+        
+        self.strategy_stats.launched(name)
+        start = time.perf_counter()
+        scored_df = food_df
+        members = None
+        cache_key = None
+        cached = False
+        received: Dict[str, Any] = {}
+        try:
+            scored_df = select_candidates(food_df, user_profile, dosha_dict, max_items=200)
+            prompt = self._structured_prompt(user_profile, scored_df, dosha_dict, daily_calories, days, food_df)
+            # The key stays local: each resumption of this generator may run on a different thread
+            messages = self._llm_messages(prompt)
+            cache_key = LLMResponseCache.make_key(model, messages, STREAM_TEMPERATURE, settings.MAX_TOKENS)
+            plan = llm_cache.get(cache_key)
+            cached = isinstance(plan, dict)
+            if cached:
+                logger.info("Streaming cached LLM response")
+                members = (member for member in plan.items())
+            else:
+                members = self._stream_llm_members(messages, model, settings.MAX_TOKENS, STREAM_TEMPERATURE)
+            for key, value in members:
+                received[key] = value
+                if key not in day_keys:
+                    extras[key] = value
+                    continue
+                if key in sent:
+                    continue
+                if not self._validate_day(key, value):
+                    outcome = "invalid"
+                    if cached:
+                        # Don't serve the same unusable response to the next request
+                        llm_cache.delete(cache_key)
+                    break
+                sent[key] = value
+                if first_day is None:
+                    first_day = time.perf_counter() - start
+                    logger.info(f"First streamed day after {first_day:.1f}s")
+                yield "day", {"day": key, "meals": value, "source": "llm"}
+            else:
+                # Only complete responses whose every day passed validation are cached
+                if not cached and len(sent) == days:
+                    llm_cache.put(cache_key, received, model, len(prompt), time.perf_counter() - start)
+        except GeneratorExit:
+            # The client went away mid-stream
+            self.strategy_stats.record(name, "abandoned")
+            raise
+        except Exception as e:
+            outcome = "errors"
+            logger.warning(f"Streamed plan generation failed after {len(sent)} days: {e}")
+        finally:
+            if members is not None:
+                members.close()
+        
+        llm_days = len(sent)
+        if llm_days == days:
+            self.strategy_stats.record(name, outcome, time.perf_counter() - start)
+        else:
+            if outcome == "wins":
+                outcome = "invalid"
+            self.strategy_stats.record(name, outcome, time.perf_counter() - start)
+            logger.warning(f"Streamed plan has {len(sent)} of {days} days, completing with the local optimizer")
+            try:
+                plan = self._generate_with_local_optimizer(
+                    user_profile, scored_df, dosha_dict, daily_calories, days, model, preferences,
+                    catalog=food_df
+                )
+            except Exception as e:
+                logger.error(f"Local optimizer failed while completing streamed plan: {e}")
+                yield "error", {"message": f"Failed to generate meal plan: {e}", "days_sent": len(sent)}
+                return
+            for key in day_keys:
+                if key not in sent:
+                    sent[key] = plan[key]
+                    if first_day is None:
+                        first_day = time.perf_counter() - start
+                    yield "day", {"day": key, "meals": plan[key], "source": "local_optimizer"}
+        
+        llm_totals = extras.get("totals") if isinstance(extras.get("totals"), dict) else {}
+        totals = {}
+        for key in day_keys:
+            total = llm_totals.get(key)
+            if not isinstance(total, (int, float)) or total <= 0:
+                total = int(round(sum(
+                    item.get("calories", 0) for meal in sent[key].values() if isinstance(meal, list)
+                    for item in meal if isinstance(item, dict) and isinstance(item.get("calories"), (int, float))
+                )))
+            totals[key] = total
+        
+        summary = extras.get("summary") if isinstance(extras.get("summary"), dict) else {}
+        summary["method"] = ("structured_prompt_stream" if llm_days == days
+                             else "local_optimizer" if llm_days == 0
+                             else "structured_prompt_stream+local_optimizer")
+        yield "done", {
+            "totals": totals,
+            "summary": summary,
+            "llm_days": llm_days,
+            "first_day_seconds": round(first_day, 3),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    
+    def _stream_llm_members(
+        self, messages: List[Dict[str, str]], model: str, max_tokens: int, temperature: float
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream the LLM's JSON response, yielding each top-level member as
+        soon as it is complete. Raises LLMError if the stream ends before
+        the JSON object does.
+        """
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+        except Exception as e:
+            logger.error(f"LLM call failed: {e}")
+            raise LLMError(f"LLM request failed: {e}")
+        
+        parser = IncrementalPlanParser()
+        try:
+            for chunk in response:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                try:
+                    completed = parser.feed(text)
+                except json.JSONDecodeError as e:
+                    raise LLMError(f"Invalid JSON from LLM: {e}")
+                yield from completed
+                if parser.done:
+                    break
+        finally:
+            response.close()
+        
+        if not parser.done:
+            raise LLMError(f"LLM stream ended before the plan was complete ({parser.members} members)")
+    
     def _generate_with_structured_prompt(
-        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences
+        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences,
+        catalog=None
     ) -> Dict[str, Any]:
         """Generate meal plan with detailed structured prompt"""
         
-        food_snippet = make_food_snippet(food_df, n=80)
+        prompt = self._structured_prompt(user_profile, food_df, dosha_info, daily_calories, days, catalog)
+        return self._call_llm_and_parse(prompt, model, max_tokens=settings.MAX_TOKENS)
+    
+    def _structured_prompt(self, user_profile, food_df, dosha_info, daily_calories, days, catalog=None) -> str:
+        """The detailed structured prompt, with as many foods as its token budget allows"""
+        
+        # Filled in once the prompt's size is known
+        food_snippet = FOOD_LIST_MARKER
         
         # Calculate meal distribution
         breakfast_cal = int(daily_calories * 0.25)
@@ -232,25 +575,17 @@ Return ONLY valid JSON in this exact format:
 
 Remember: Use precise food names from the provided list. Ensure nutritional balance and Ayurvedic appropriateness."""
         
-        return self._call_llm_and_parse(prompt, model)
+        foods = self._pack_foods(food_df, prompt, days, settings.MAX_TOKENS, "detailed", catalog)
+        return prompt.replace(FOOD_LIST_MARKER, make_food_snippet(foods, n=len(foods), catalog=catalog))
     
     def _generate_with_simple_prompt(
-        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences
+        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences,
+        catalog=None
     ) -> Dict[str, Any]:
         """Simpler prompt for better parsing reliability"""
         
-        # Get top foods only
-        top_foods = food_df.head(40)
-        food_list = []
-        
-        for _, row in top_foods.iterrows():
-            food_info = f"{row['Food_Item']} ({int(row.get('Calories', 0))} cal"
-            if 'user_score' in row:
-                food_info += f", score: {row['user_score']:.1f}"
-            food_info += ")"
-            food_list.append(food_info)
-        
-        foods_text = "\n".join(food_list)
+        # Filled in once the prompt's size is known
+        foods_text = FOOD_LIST_MARKER
         
         prompt = f"""Create a {days}-day Ayurvedic meal plan for a {user_profile.Age}-year-old {user_profile.Gender.value}.
 Target: {int(daily_calories)} calories/day
@@ -268,10 +603,19 @@ Return only JSON format:
 
 Keep it simple but nutritionally balanced."""
         
+        foods = self._pack_foods(food_df, prompt, days, 1500, "brief", catalog)
+        prompt = prompt.replace(FOOD_LIST_MARKER, make_food_list(foods, n=len(foods), catalog=catalog))
+        
         return self._call_llm_and_parse(prompt, model, max_tokens=1500)
     
+    def _pack_foods(self, food_df, prompt, days, max_tokens, kind, catalog=None):
+        """Top foods whose prompt lines fit the token budget left by the prompt"""
+        lines = food_prompt_lines(food_df, catalog, kind)
+        return prompt_packer.pack(food_df, lines, days, prompt.replace(FOOD_LIST_MARKER, ""), max_tokens)
+    
     def _generate_with_template_guidance(
-        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences
+        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences,
+        catalog=None
     ) -> Dict[str, Any]:
         """Use template-based approach with LLM customization"""
         
@@ -279,7 +623,8 @@ Keep it simple but nutritionally balanced."""
         base_templates = self.fallback_templates.get(target_dosha, self.fallback_templates['vata'])
         
         # Get food categories
-        available_categories = food_df['Category'].value_counts().head(10).index.tolist()
+        category_counts = food_df['Category'].value_counts()
+        available_categories = category_counts[category_counts > 0].head(10).index.tolist()
         
         prompt = f"""Customize this meal template for {days} days using available foods.
 
@@ -295,24 +640,62 @@ Return simple JSON with day_1, day_2, etc. and totals."""
         
         return self._call_llm_and_parse(prompt, model, max_tokens=1000)
     
+    def _generate_with_local_optimizer(
+        self, user_profile, food_df, dosha_info, daily_calories, days, model, preferences,
+        catalog=None
+    ) -> Dict[str, Any]:
+        """Assemble the plan locally from scored candidates, without an LLM call"""
+        
+        # The prompt candidates are capped to the lowest-calorie foods;
+        # portions need the full calorie range of the catalog
+        if catalog is not None and len(catalog):
+            food_df = select_candidates(catalog, user_profile, dosha_info, max_items=len(catalog),
+                                        top_n=OPTIMIZER_CANDIDATES)
+            # Plus the allowed foods richest in each macro, so days can meet the macro targets
+            allowed = filter_foods_for_user(catalog, user_profile, dosha_info.get('dosha'),
+                                            max_items=len(catalog))
+            reserve = macro_reserve(allowed.drop(index=food_df.index, errors='ignore'))
+            if len(reserve):
+                food_df = pd.concat([
+                    food_df, score_and_rank_foods(allowed.loc[reserve], user_profile, dosha_info, len(reserve))
+                ])
+        
+        plan = meal_optimizer.optimize(food_df, daily_calories, days, dosha_info.get('dosha'))
+        if not self._validate_plan(plan, days):
+            raise MealPlanGenerationError("Local optimizer produced an invalid plan")
+        return plan
+    
+    @staticmethod
+    def _llm_messages(prompt: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": "You are an expert Ayurvedic nutritionist. Always return valid JSON only."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
     def _call_llm_and_parse(
         self, prompt: str, model: str, max_tokens: int = 2000, temperature: float = 0.7
     ) -> Dict[str, Any]:
         """Call LLM and parse response with error handling"""
         
+        messages = self._llm_messages(prompt)
+        cache_key = LLMResponseCache.make_key(model, messages, temperature, max_tokens)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Using cached LLM response")
+            self._llm_call.key = cache_key
+            return cached
+        
         try:
+            start = time.perf_counter()
             response = self.client.chat.completions.create(
                 model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert Ayurvedic nutritionist. Always return valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
@@ -325,6 +708,11 @@ Return simple JSON with day_1, day_2, etc. and totals."""
             # Parse JSON
             plan = json.loads(json_text)
             
+            # Only parsed plans are cached; failures above never reach here
+            if isinstance(plan, dict):
+                llm_cache.put(cache_key, plan, model, len(prompt), time.perf_counter() - start)
+                self._llm_call.key = cache_key
+            
             return plan
             
         except json.JSONDecodeError as e:
@@ -370,20 +758,8 @@ Return simple JSON with day_1, day_2, etc. and totals."""
                     logger.warning(f"Missing day key: {day_key}")
                     return False
                 
-                day_data = plan[day_key]
-                if not isinstance(day_data, dict):
+                if not self._validate_day(day_key, plan[day_key]):
                     return False
-                
-                # Check for required meal types
-                required_meals = ['breakfast', 'lunch', 'dinner']
-                for meal in required_meals:
-                    if meal not in day_data:
-                        logger.warning(f"Missing meal: {meal} in {day_key}")
-                        return False
-                    
-                    if not isinstance(day_data[meal], list) or len(day_data[meal]) == 0:
-                        logger.warning(f"Invalid meal data for {meal} in {day_key}")
-                        return False
             
             # Check totals if present
             if 'totals' in plan:
@@ -405,6 +781,26 @@ Return simple JSON with day_1, day_2, etc. and totals."""
             logger.error(f"Plan validation failed: {e}")
             return False
     
+    @staticmethod
+    def _validate_day(day_key: str, day_data: Any) -> bool:
+        """Validate one day of a plan: breakfast, lunch and dinner are non-empty lists"""
+        
+        if not isinstance(day_data, dict):
+            return False
+        
+        # Check for required meal types
+        required_meals = ['breakfast', 'lunch', 'dinner']
+        for meal in required_meals:
+            if meal not in day_data:
+                logger.warning(f"Missing meal: {meal} in {day_key}")
+                return False
+            
+            if not isinstance(day_data[meal], list) or len(day_data[meal]) == 0:
+                logger.warning(f"Invalid meal data for {meal} in {day_key}")
+                return False
+        
+        return True
+    
     def _generate_fallback_plan(
         self, user_profile: UserProfile, dosha_info: Dict, 
         daily_calories: float, days: int
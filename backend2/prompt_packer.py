@@ -0,0 +1,143 @@
+"""
+Token-budget-aware packing of food lists into LLM prompts
+"""
+import math
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import settings
+
+
+# Pieces a byte-pair tokenizer rarely merges across: letter runs, digit
+# groups of up to three (cl100k splits numbers that way), punctuation
+# runs and whitespace runs.
+_PIECES = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|\s+")
+
+# Letters per token in a word; common words are a single token and long
+# or rare words split into roughly this many characters per token.
+WORD_CHARS_PER_TOKEN = 6
+
+# Chat message framing and the system prompt, in tokens
+MESSAGE_OVERHEAD_TOKENS = 40
+
+
+def _raw_estimate(text: str) -> int:
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        first = piece[0]
+        if first.isspace():
+            # A single space is merged into the following word
+            tokens += 0 if piece == " " else 1
+        elif first.isalpha():
+            tokens += 1 + (len(piece) - 1) // WORD_CHARS_PER_TOKEN
+        else:
+            tokens += 1
+    return tokens
+
+
+def estimate_tokens(text: str, scale: Optional[float] = None) -> int:
+    """
+    Fast local estimate of how many tokens a BPE tokenizer produces for text.
+
+    ``scale`` (default ``settings.PROMPT_TOKEN_SCALE``) corrects the raw
+    piece count for a specific tokenizer; see ``calibrate_token_scale``.
+    """
+    scale = settings.PROMPT_TOKEN_SCALE if scale is None else scale
+    return math.ceil(_raw_estimate(text) * scale)
+
+
+def calibrate_token_scale(samples: Iterable[Tuple[str, int]]) -> float:
+    """
+    Scale that makes estimate_tokens match a real tokenizer on average.
+
+    Run offline with ``(text, true_token_count)`` pairs from the target
+    tokenizer over representative prompts and store the result in
+    ``PROMPT_TOKEN_SCALE``.
+    """
+    estimated = actual = 0
+    for text, count in samples:
+        estimated += _raw_estimate(text)
+        actual += count
+    if estimated == 0:
+        raise ValueError("Cannot calibrate on empty samples")
+    return actual / estimated
+
+
+class PromptPacker:
+    """
+    Chooses which ranked foods to list in a prompt.
+
+    The food list gets whatever is left of the context window after the
+    rest of the prompt and the reserved output tokens, capped by a
+    configured budget, and never lists more than ``foods_per_day`` foods
+    per planned day. Foods are taken best first, but at most
+    ``category_quota`` per category until every category has had its
+    turn, so a few dominant categories cannot crowd out the rest. The
+    chosen foods keep their ranked order.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, context_tokens: Optional[int] = None,
+                 foods_per_day: Optional[int] = None, category_quota: Optional[int] = None):
+        self.token_budget = settings.PROMPT_FOOD_TOKEN_BUDGET if token_budget is None else token_budget
+        self.context_tokens = settings.LLM_CONTEXT_TOKENS if context_tokens is None else context_tokens
+        self.foods_per_day = settings.PROMPT_FOODS_PER_DAY if foods_per_day is None else foods_per_day
+        self.category_quota = settings.PROMPT_CATEGORY_QUOTA if category_quota is None else category_quota
+
+    def food_budget(self, prompt_tokens: int, max_output_tokens: int) -> int:
+        """Tokens available to the food list of a prompt"""
+        remaining = self.context_tokens - max_output_tokens - prompt_tokens - MESSAGE_OVERHEAD_TOKENS
+        return max(0, min(self.token_budget, remaining))
+
+    def _priority(self, categories: Optional[Sequence]) -> np.ndarray:
+        """Order in which ranked lines are offered: rank within category tiers"""
+        n = len(categories) if categories is not None else 0
+        if n == 0 or self.category_quota <= 0:
+            return np.arange(n)
+
+        codes = pd.factorize(pd.Series(categories).astype(str))[0]
+        within = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+        tier = within // self.category_quota
+        return np.lexsort((np.arange(n), tier))
+
+    def select(self, lines: List[str], categories: Optional[Sequence], days: int, budget: int) -> np.ndarray:
+        """Positions of the lines to keep, in their original (ranked) order"""
+        limit = max(1, days) * self.foods_per_day
+        order = self._priority(categories) if categories is not None else np.arange(len(lines))
+
+        chosen, used = [], 0
+        for position in order:
+            cost = estimate_tokens(lines[position]) + 1  # line break
+            if used + cost > budget:
+                continue
+            chosen.append(position)
+            used += cost
+            if len(chosen) >= limit:
+                break
+
+        return np.sort(np.asarray(chosen, dtype=np.intp))
+
+    def pack(self, food_df: pd.DataFrame, lines: List[str], days: int, prompt: str,
+             max_output_tokens: int) -> pd.DataFrame:
+        """
+        Rows of ``food_df`` (one per entry of ``lines``) to list in ``prompt``.
+
+        ``prompt`` is the prompt without its food list.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        budget = self.food_budget(prompt_tokens, max_output_tokens)
+        categories = food_df["Category"].to_numpy() if "Category" in food_df.columns else None
+        positions = self.select(lines, categories, days, budget)
+
+        if len(positions) == 0 and len(food_df):
+            logger.warning(f"No foods fit the prompt budget ({budget} tokens)")
+        logger.info(f"Packed {len(positions)} of {len(food_df)} foods into a "
+                    f"{budget}-token budget ({prompt_tokens} prompt tokens, {days} days)")
+        return food_df.iloc[positions]
+
+
+# Global prompt packer instance
+prompt_packer = PromptPacker()
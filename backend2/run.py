@@ -27,6 +27,7 @@ class ProductionRunner:
         self.app = None
         self.shutdown_event = threading.Event()
         self.health_check_thread = None
+        self.dataset_watch_thread = None
         self.setup_signal_handlers()
     
     def setup_signal_handlers(self):
@@ -44,8 +45,10 @@ class ProductionRunner:
     
     def _reload_handler(self, signum, frame):
         """Handle reload signals (SIGHUP)"""
-        logger.info("Received SIGHUP, reloading configuration...")
-        # Implement configuration reload logic here
+        logger.info("Received SIGHUP, reloading datasets...")
+        # Build the new snapshot off the signal handler; in-flight requests
+        # keep the snapshot they already hold until they finish
+        dataset_loader.reload_in_background()
     
     def validate_environment(self):
         """Validate environment setup"""
@@ -106,8 +109,9 @@ class ProductionRunner:
         
         # Load datasets
         try:
-            datasets = dataset_loader.load_all_datasets()
-            logger.success(f"Loaded {len(datasets)} datasets")
+            snapshot = dataset_loader.get_snapshot()
+            datasets = snapshot.datasets.loaded()
+            logger.success(f"Loaded {len(datasets)} datasets (snapshot v{snapshot.version})")
             
             # Log dataset info
             for name, df in datasets.items():
@@ -142,6 +146,13 @@ class ProductionRunner:
             self.health_check_thread.start()
             logger.info("Health monitoring started")
     
+    def start_dataset_watcher(self):
+        """Reload datasets automatically when their files change"""
+        if settings.DATASET_WATCH_INTERVAL > 0:
+            self.dataset_watch_thread = dataset_loader.start_watcher(
+                settings.DATASET_WATCH_INTERVAL, self.shutdown_event
+            )
+    
     def setup_logging(self):
         """Setup production logging"""
         # Remove default loguru handler
@@ -211,6 +222,7 @@ class ProductionRunner:
             
             # Start monitoring
             self.start_health_monitor()
+            self.start_dataset_watcher()
             
             # Log startup info
             logger.info(f"Environment: {settings.FLASK_ENV}")
@@ -0,0 +1,158 @@
+"""
+Partial top-k and diversity-aware selection for ranking and filtering paths
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _select(keys: np.ndarray, positions: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices into ``keys`` of the k smallest, ordered by (key, position).
+
+    The cut is found with ``argpartition`` in linear time and only the k
+    survivors are sorted. Ties at the cut keep the lowest positions and
+    NaN keys rank after every number, so the result equals the first k of
+    a stable ascending sort.
+    """
+    n = len(keys)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < n:
+        kth = keys[np.argpartition(keys, k - 1)[k - 1]]
+        if kth != kth:
+            # The cut falls among the NaNs: every number is in
+            better, tied = ~np.isnan(keys), np.isnan(keys)
+        else:
+            better, tied = keys < kth, keys == kth
+        chosen = np.flatnonzero(better)
+        ties = np.flatnonzero(tied)
+        ties = ties[np.argsort(positions[ties], kind="stable")[:k - len(chosen)]]
+        chosen = np.concatenate([chosen, ties])
+    else:
+        chosen = np.arange(n)
+
+    return chosen[np.lexsort((positions[chosen], keys[chosen]))]
+
+
+def _sort_keys(values, descending: bool) -> np.ndarray:
+    keys = np.asarray(values)
+    if keys.dtype == bool:
+        keys = keys.astype(np.int8)
+    elif keys.dtype.kind == "u":
+        keys = keys.astype(np.int64)
+    return -keys if descending else keys
+
+
+def top_k_indices(values, k: int, descending: bool = False) -> np.ndarray:
+    """
+    Positions of the k best values, best first.
+
+    Same result as ``np.argsort(values, kind="stable")[:k]`` (or the
+    stable descending sort), without sorting the values outside the top k.
+    """
+    keys = _sort_keys(values, descending)
+    return _select(keys, np.arange(len(keys)), k)
+
+
+def top_k_rows(df: pd.DataFrame, column: str, k: int, descending: bool = False) -> pd.DataFrame:
+    """Equivalent of ``df.sort_values(column, kind="stable").head(k)`` via partial selection"""
+    return df.iloc[top_k_indices(df[column].to_numpy(), k, descending)]
+
+
+class StreamingTopK:
+    """
+    Top-k over values that arrive in chunks.
+
+    Only the current k best values (with their global positions and,
+    optionally, their rows) are kept between pushes, so memory is bounded
+    by k plus one chunk. The final order equals a stable sort over the
+    concatenation of all pushed chunks.
+    """
+
+    def __init__(self, k: int, descending: bool = False):
+        self.k = k
+        self.descending = descending
+        self.seen = 0
+        self._keys = np.empty(0)
+        self._positions = np.empty(0, dtype=np.int64)
+        self._rows: Optional[pd.DataFrame] = None
+
+    def push(self, values, rows: Optional[pd.DataFrame] = None) -> None:
+        """Offer the next chunk of values, with the rows they belong to if the rows should be kept"""
+        keys = _sort_keys(values, self.descending)
+        positions = np.arange(self.seen, self.seen + len(keys), dtype=np.int64)
+        self.seen += len(keys)
+
+        keys = np.concatenate([self._keys, keys]) if len(self._keys) else keys
+        positions = np.concatenate([self._positions, positions])
+        keep = _select(keys, positions, self.k)
+
+        self._keys, self._positions = keys[keep], positions[keep]
+        if rows is not None:
+            rows = pd.concat([self._rows, rows]) if self._rows is not None else rows
+            self._rows = rows.iloc[keep]
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Global positions and values of the top k, best first"""
+        values = -self._keys if self.descending else self._keys
+        return self._positions.copy(), values.copy()
+
+    def rows(self) -> Optional[pd.DataFrame]:
+        """Kept rows of the top k, best first (None if no rows were pushed)"""
+        return None if self._rows is None else self._rows.copy()
+
+
+def mmr_indices(relevance, k: int, labels: Sequence[np.ndarray] = (), vectors: Optional[np.ndarray] = None,
+                weights: Optional[Sequence[float]] = None, trade_off: float = 0.7) -> np.ndarray:
+    """
+    Maximal-marginal-relevance selection of k items, in pick order.
+
+    Each pick maximizes ``trade_off * relevance - (1 - trade_off) * s``,
+    where ``s`` is the item's highest similarity to anything already
+    picked and relevance is min-max scaled to [0, 1]. Similarity is a
+    weighted sum of label matches (integer codes, negative = missing) and
+    the cosine similarity of ``vectors`` (clipped at 0), with ``weights``
+    holding one weight per label array followed by one for the vectors.
+
+    The pairwise similarity matrix is built in one vectorized pass; the
+    greedy picks then only take running maxima of its rows. With
+    ``trade_off=1`` the result equals ``top_k_indices(relevance, k, True)``.
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    span = np.nanmax(relevance) - np.nanmin(relevance) if n else 0.0
+    scaled = (relevance - np.nanmin(relevance)) / span if span > 0 else np.ones(n)
+    scaled = np.nan_to_num(scaled, nan=-1.0)
+
+    n_parts = len(labels) + (vectors is not None)
+    weights = list(weights) if weights is not None else [1.0] * n_parts
+    total = sum(weights[:n_parts]) or 1.0
+
+    similarity = np.zeros((n, n))
+    for codes, weight in zip(labels, weights):
+        codes = np.asarray(codes)
+        similarity += weight * ((codes[:, None] == codes[None, :]) & (codes[:, None] >= 0))
+    if vectors is not None:
+        vectors = np.asarray(vectors, dtype=np.float64)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        similarity += weights[len(labels)] * np.clip(unit @ unit.T, 0.0, 1.0)
+    similarity /= total
+
+    picked = np.empty(k, dtype=np.intp)
+    closest = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    for step in range(k):
+        gain = np.where(available, trade_off * scaled - (1.0 - trade_off) * closest, -np.inf)
+        choice = int(np.argmax(gain))
+        picked[step] = choice
+        available[choice] = False
+        np.maximum(closest, similarity[choice], out=closest)
+    return picked
@@ -0,0 +1,424 @@
+"""
+SQLite-backed food catalog with filter pushdown
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config import settings
+from exceptions import DatasetError
+from filter_and_score import FoodFilter
+from food_index import DOSHAS, frame_registry, term_pattern
+
+
+# Minimum number of foods before the strict filters are relaxed, as in filter_foods_for_user
+MIN_CANDIDATES = 20
+
+# Derived columns stored next to the catalog's own columns
+CALORIES_KEY = "_calories"
+INGREDIENTS_KEY = "_ingredients"
+
+
+@lru_cache(maxsize=4096)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    """SQL ``regexp(pattern, value)``, with the semantics of str.contains"""
+    return value is not None and _compile(pattern).search(value) is not None
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def frame_fingerprint(food_df: pd.DataFrame) -> str:
+    """Content hash of a processed catalog frame"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in food_df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(food_df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def versioned_db_path(db_path: str, fingerprint: str) -> str:
+    """
+    Database file holding the catalog with ``fingerprint``. Each catalog
+    version gets its own file, so a rebuild never replaces the file under
+    connections that map row ids to an older frame.
+    """
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.{fingerprint[:16]}{ext}"
+
+
+class SQLiteFoodCatalog:
+    """
+    Food catalog mirrored into an SQLite file for filter pushdown.
+
+    The catalog still lives in memory as a DataFrame: the snapshot's
+    index, prompt lines and substitutes are built from it, and selected
+    rows are read back from it by position. The database only replaces
+    the filter scans.
+
+    The ``foods`` table keeps every processed column keyed by row
+    position, with indexes on the dosha effects, diet flags, category and
+    calories, and a contentless FTS5 trigram table over food keys and
+    ingredients. ``filter_food_positions`` translates the filters of
+    ``filter_foods_for_user`` into one query: FTS narrows term matches to
+    candidates, a ``regexp`` function verifies them with the same pattern
+    as the pandas path, and calories ordering plus ``LIMIT`` replace the
+    final sort. Results are identical to the in-memory filters.
+    """
+
+    def __init__(self, db_path: str):
+        if not os.path.exists(db_path):
+            raise DatasetError(f"Food catalog database not found: {db_path}", "FILE_NOT_FOUND")
+        self.db_path = db_path
+        self._local = threading.local()
+
+        meta = dict(self._connection().execute("SELECT key, value FROM catalog_meta"))
+        self.columns: List[Dict] = json.loads(meta["columns"])
+        self.fingerprint = meta.get("fingerprint", "")
+        self.rows = int(meta["rows"])
+        self.has_fts = meta.get("has_fts") == "1"
+
+        names = {col["name"] for col in self.columns}
+        self.has_calories = "Calories" in names
+        self.has_ingredients = "Ingredients" in names
+        self.dosha_columns = {d.lower(): f"Dosha_{d}" for d in DOSHAS if f"Dosha_{d}" in names}
+        self.flag_columns = {flag for flag in ("is_veg", "is_vegan") if flag in names}
+
+    def _connection(self) -> sqlite3.Connection:
+        """Read-only connection owned by the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = Path(self.db_path).absolute().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.create_function("regexp", 2, _regexp, deterministic=True)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _column_meta(frame: pd.DataFrame) -> List[Dict]:
+        columns = []
+        for name in frame.columns:
+            dtype = frame[name].dtype
+            entry = {"name": str(name), "dtype": "category" if isinstance(dtype, pd.CategoricalDtype) else str(dtype)}
+            if entry["dtype"] == "category":
+                entry["categories"] = [str(c) for c in dtype.categories]
+            columns.append(entry)
+        return columns
+
+    @staticmethod
+    def _affinity(dtype: str) -> str:
+        if dtype == "bool" or dtype.startswith("int") or dtype.startswith("uint"):
+            return "INTEGER"
+        if dtype.startswith("float"):
+            return "REAL"
+        return "TEXT"
+
+    @staticmethod
+    def _sql_values(series: pd.Series) -> list:
+        """Column values as Python objects sqlite3 can bind, with NULL for missing"""
+        values = series.astype(object).tolist() if isinstance(series.dtype, pd.CategoricalDtype) \
+            else series.tolist()
+        missing = series.isna().to_numpy()
+        if missing.any():
+            values = [None if gone else value for value, gone in zip(values, missing)]
+        return values
+
+    @classmethod
+    def build(cls, db_path: str, frames: Iterable[pd.DataFrame], fingerprint: str = "") -> "SQLiteFoodCatalog":
+        """
+        Write processed catalog frames, in order, to a new database file.
+
+        ``frames`` may be a generator of chunks; rows are numbered across
+        them. The file is swapped in atomically once complete.
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        tmp_path = f"{db_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+
+            columns: Optional[List[Dict]] = None
+            has_ingredients = False
+            rows = 0
+            for frame in frames:
+                if columns is None:
+                    columns = cls._column_meta(frame)
+                    has_ingredients = "Ingredients" in frame.columns
+                    declared = ", ".join(f"{_quote(col['name'])} {cls._affinity(col['dtype'])}" for col in columns)
+                    conn.execute(
+                        f"CREATE TABLE foods (row_id INTEGER PRIMARY KEY, {declared}, "
+                        f"{CALORIES_KEY} REAL, {INGREDIENTS_KEY} TEXT)"
+                    )
+                elif [str(c) for c in frame.columns] != [col["name"] for col in columns]:
+                    raise DatasetError("Catalog chunks have different columns", "MISSING_COLUMNS")
+
+                if not len(frame):
+                    continue
+
+                values = [list(range(rows, rows + len(frame)))]
+                values += [cls._sql_values(frame[col["name"]]) for col in columns]
+                calories = (pd.to_numeric(frame["Calories"], errors="coerce").astype(np.float32)
+                            if "Calories" in frame.columns else pd.Series(np.nan, index=frame.index))
+                values.append(cls._sql_values(calories))
+                values.append(frame["Ingredients"].astype(str).str.lower().tolist()
+                              if has_ingredients else [None] * len(frame))
+
+                placeholders = ", ".join("?" * len(values))
+                conn.executemany(f"INSERT INTO foods VALUES ({placeholders})", zip(*values))
+                rows += len(frame)
+
+            if columns is None:
+                raise DatasetError("No catalog rows to store", "EMPTY_DATASET")
+            if "food_key" not in {col["name"] for col in columns}:
+                raise DatasetError("Food catalog has no food_key column", "MISSING_COLUMNS")
+
+            names = {col["name"] for col in columns}
+            for dosha in DOSHAS:
+                col = f"Dosha_{dosha}"
+                if col in names:
+                    conn.execute(f"CREATE INDEX foods_dosha_{dosha.lower()} ON foods({_quote(col)}, {CALORIES_KEY})")
+            for col in ("is_veg", "is_vegan", "Category"):
+                if col in names:
+                    conn.execute(f"CREATE INDEX foods_{col.lower()} ON foods({_quote(col)}, {CALORIES_KEY})")
+            conn.execute(f"CREATE INDEX foods_calories ON foods({CALORIES_KEY})")
+
+            has_fts = cls._build_terms(conn)
+
+            conn.execute("CREATE TABLE catalog_meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany("INSERT INTO catalog_meta VALUES (?, ?)", [
+                ("columns", json.dumps(columns)),
+                ("fingerprint", fingerprint),
+                ("rows", str(rows)),
+                ("has_fts", "1" if has_fts else "0"),
+            ])
+            conn.commit()
+        except Exception:
+            conn.close()
+            os.remove(tmp_path)
+            raise
+        conn.close()
+
+        os.replace(tmp_path, db_path)
+        logger.info(f"Built SQLite food catalog with {rows} items: {db_path}")
+        return cls(db_path)
+
+    @staticmethod
+    def _build_terms(conn: sqlite3.Connection) -> bool:
+        """Create the trigram index over names and ingredients; False if unsupported"""
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE food_terms USING fts5("
+                "food_key, ingredients, tokenize='trigram', content='')"
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite lacks FTS5 trigram support, term filters will scan: {e}")
+            return False
+
+        conn.execute(
+            f"INSERT INTO food_terms(rowid, food_key, ingredients) "
+            f"SELECT row_id, food_key, {INGREDIENTS_KEY} FROM foods"
+        )
+        return True
+
+    @classmethod
+    def from_frame(cls, food_df: pd.DataFrame, db_path: str) -> "SQLiteFoodCatalog":
+        """Store a processed catalog frame; row positions become row ids"""
+        return cls.build(db_path, [food_df], fingerprint=frame_fingerprint(food_df))
+
+    def _term_exclusion(self, terms: List[str], include_ingredients: bool) -> Tuple[str, list]:
+        """WHERE clause keeping foods that match none of the terms"""
+        columns = ["food_key"]
+        if include_ingredients and self.has_ingredients:
+            columns.append(INGREDIENTS_KEY)
+        fts_columns = "{food_key ingredients}" if len(columns) > 1 else "food_key"
+
+        clauses, params = [], []
+        for term in terms:
+            pattern = term_pattern(term)
+            verify = " OR ".join(f"regexp(?, {col})" for col in columns)
+            words = [word for word in term.split(" ") if len(word) >= 3]
+
+            if self.has_fts and words:
+                query = f"{fts_columns} : (" + " AND ".join(_quote(w) for w in words) + ")"
+                clauses.append(
+                    f"(row_id IN (SELECT rowid FROM food_terms WHERE food_terms MATCH ?) AND ({verify}))"
+                )
+                params.append(query)
+            else:
+                # Words shorter than a trigram can't use the index
+                clauses.append(f"({verify})")
+            params.extend([pattern] * len(columns))
+
+        return "NOT (" + " OR ".join(clauses) + ")", params
+
+    def _preference_clause(self, user_profile) -> Optional[str]:
+        food_pref = getattr(user_profile, 'Food_preference', None)
+        if not food_pref:
+            return None
+
+        pref_str = food_pref.value.lower() if hasattr(food_pref, 'value') else str(food_pref).lower()
+        flag = {"vegan": "is_vegan", "vegetarian": "is_veg"}.get(pref_str)
+        if flag not in self.flag_columns:
+            return None
+        return f"{_quote(flag)} = 1"
+
+    def _dosha_clause(self, target_dosha: str, strictness: float) -> Optional[str]:
+        column = self.dosha_columns.get(target_dosha.lower())
+        if column is None:
+            logger.warning(f"Dosha column Dosha_{target_dosha.capitalize()} not found")
+            return None
+
+        if strictness >= 0.8:
+            return f"{_quote(column)} < 0"
+        elif strictness >= 0.5:
+            return f"{_quote(column)} <= 0"
+        return f"{_quote(column)} <= 0.5"
+
+    def _conditions(self, user_profile, target_dosha: Optional[str], strictness: float,
+                    relaxed: bool = False) -> Tuple[List[str], list]:
+        """WHERE clauses mirroring filter_foods_for_user; ``relaxed`` keeps only the critical ones"""
+        where, params = [], []
+
+        def exclude(terms: List[str], include_ingredients: bool = False) -> None:
+            if terms:
+                clause, clause_params = self._term_exclusion(terms, include_ingredients)
+                where.append(clause)
+                params.extend(clause_params)
+
+        exclude(FoodFilter.parse_restrictions(getattr(user_profile, 'Allergies', None)), True)
+        if not relaxed:
+            health_conditions = getattr(user_profile, 'Health_Conditions', None)
+            if health_conditions:
+                exclude(FoodFilter.condition_avoid_terms(health_conditions))
+
+        preference = self._preference_clause(user_profile)
+        if preference:
+            where.append(preference)
+        if not relaxed:
+            exclude(FoodFilter.parse_restrictions(getattr(user_profile, 'Dietary_Restrictions', None)))
+
+        if target_dosha:
+            dosha = self._dosha_clause(target_dosha, strictness)
+            if dosha:
+                where.append(dosha)
+        return where, params
+
+    def _select(self, select: str, where: List[str], params: list, limit: Optional[int]) -> pd.DataFrame:
+        sql = f"SELECT {select} FROM foods"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if self.has_calories:
+            sql += f" ORDER BY {CALORIES_KEY} IS NULL, {CALORIES_KEY}, row_id"
+        else:
+            sql += " ORDER BY row_id"
+        sql += " LIMIT ?"
+        return pd.read_sql_query(sql, self._connection(), params=params + [-1 if limit is None else limit])
+
+    def _filter(self, select: str, user_profile, target_dosha: Optional[str],
+                max_items: int, dosha_strictness: float) -> pd.DataFrame:
+        # Enough rows to tell whether the strict result is too small or too large
+        limit = max(max_items + 1, MIN_CANDIDATES) if self.has_calories else None
+
+        where, params = self._conditions(user_profile, target_dosha, dosha_strictness)
+        result = self._select(select, where, params, limit)
+
+        if len(result) < MIN_CANDIDATES and dosha_strictness > 0.3:
+            logger.warning("Too few foods after strict filtering, relaxing dosha filter")
+            where, params = self._conditions(user_profile, target_dosha, 0.3, relaxed=True)
+            result = self._select(select, where, params, limit)
+
+        if self.has_calories and len(result) > max_items:
+            return result.head(max_items)
+        # Results that fit are returned in catalog order
+        return result.sort_values("row_id", kind="stable")
+
+    def filter_food_positions(self, user_profile, target_dosha: Optional[str] = None,
+                              max_items: int = 150, dosha_strictness: float = 0.7) -> np.ndarray:
+        """Row positions filter_foods_for_user would select, from a single pushed-down query"""
+        result = self._filter("row_id", user_profile, target_dosha, max_items, dosha_strictness)
+        return result["row_id"].to_numpy(dtype=np.int64)
+
+    def filter_foods(self, user_profile, target_dosha: Optional[str] = None,
+                     max_items: int = 150, dosha_strictness: float = 0.7) -> pd.DataFrame:
+        """Like filter_food_positions, but returns the selected foods as a frame"""
+        result = self._filter("*", user_profile, target_dosha, max_items, dosha_strictness)
+        return self._restore(result)
+
+    def _restore(self, result: pd.DataFrame) -> pd.DataFrame:
+        """Give a queried frame the catalog's original index and dtypes"""
+        df = result.set_index("row_id")
+        df.index.name = None
+        df = df[[col["name"] for col in self.columns]]
+
+        for col in self.columns:
+            name, dtype = col["name"], col["dtype"]
+            if dtype == "category":
+                df[name] = pd.Categorical(df[name], categories=col["categories"])
+            elif dtype == "object":
+                df[name] = df[name].astype(object).where(df[name].notna(), np.nan)
+            else:
+                df[name] = df[name].astype(dtype)
+        return df
+
+
+def _remove_stale_versions(db_path: str, keep: Iterable[str]) -> None:
+    """Delete versioned databases of ``db_path`` that no live catalog uses"""
+    root, ext = os.path.splitext(db_path)
+    folder, stem = os.path.split(root)
+    versioned = re.compile(re.escape(stem) + r"\.[0-9a-f]{16}" + re.escape(ext) + "$")
+    keep = {os.path.abspath(path) for path in keep}
+    for name in os.listdir(folder or "."):
+        path = os.path.abspath(os.path.join(folder, name))
+        if versioned.match(name) and path not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove stale food catalog {path}: {e}")
+
+
+def _open_catalog(food_df: pd.DataFrame, db_path: Optional[str] = None) -> SQLiteFoodCatalog:
+    """The catalog database for a frame, built unless a matching one exists"""
+    db_path = db_path or settings.FOOD_CATALOG_DB_PATH
+    fingerprint = frame_fingerprint(food_df)
+    path = versioned_db_path(db_path, fingerprint)
+    catalog = None
+    if os.path.exists(path):
+        try:
+            catalog = SQLiteFoodCatalog(path)
+        except Exception as e:
+            logger.warning(f"Unreadable food catalog database, rebuilding: {e}")
+    if catalog is None or catalog.fingerprint != fingerprint:
+        catalog = SQLiteFoodCatalog.build(path, [food_df], fingerprint=fingerprint)
+        live = [live_catalog.db_path for live_catalog in _food_catalogs.values()]
+        _remove_stale_versions(db_path, live + [path])
+    return catalog
+
+
+_food_catalogs = frame_registry(_open_catalog)
+
+
+def get_food_catalog(food_df: pd.DataFrame, db_path: Optional[str] = None) -> SQLiteFoodCatalog:
+    """
+    Return the SQLite catalog mirroring a frame, building its database if
+    missing. ``db_path`` names the catalog; the file is versioned by the
+    frame's fingerprint (see versioned_db_path).
+    """
+    return _food_catalogs(food_df, db_path)
@@ -0,0 +1,120 @@
+"""
+Nearest-neighbour food substitutes in nutrient space
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.neighbors import KDTree
+
+from food_index import MACRO_COLUMNS, FoodIndex, frame_registry, get_food_index
+
+
+DIETS = ("vegetarian", "vegan")
+
+
+class SubstituteIndex:
+    """
+    KD-trees over z-scored (Calories, Protein, Carbs, Fat) vectors.
+
+    Compliance filters are applied before the search rather than after
+    it: every combination of diet and dosha filter gets its own tree over
+    only the compliant foods, built on first use and kept for the life of
+    the catalog. A query is then a single exact k-nearest lookup.
+    """
+
+    def __init__(self, food_df: pd.DataFrame, index: Optional[FoodIndex] = None):
+        self.index = index or get_food_index(food_df)
+
+        macros = np.column_stack([
+            self.index.macros.get(col, np.zeros(self.index.size, dtype=np.float32)).astype(np.float64)
+            for col in MACRO_COLUMNS
+        ]) if self.index.size else np.empty((0, len(MACRO_COLUMNS)))
+        macros = np.nan_to_num(macros)
+        std = macros.std(axis=0) if len(macros) else np.ones(len(MACRO_COLUMNS))
+        self.vectors = (macros - macros.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+        keys = food_df["food_key"] if "food_key" in food_df.columns else pd.Series(dtype=object)
+        self.positions_by_key = {key: i for i, key in enumerate(keys) if isinstance(key, str)}
+
+        self._trees: Dict[Optional[bytes], Tuple[KDTree, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._tree_for(None, None, 0.0)
+
+    def compliance_mask(self, diet: Optional[str], dosha: Optional[str], strictness: float) -> Optional[np.ndarray]:
+        """Foods allowed by the diet and dosha filters, or None when nothing is filtered"""
+        mask = None
+        if diet == "vegan":
+            mask = self.index.is_vegan
+        elif diet == "vegetarian":
+            mask = self.index.is_veg
+
+        if dosha:
+            dosha_keep = self.index.dosha_mask(dosha, strictness)
+            if dosha_keep is not None:
+                mask = dosha_keep if mask is None else mask & dosha_keep
+        return mask
+
+    def _tree_for(self, diet: Optional[str], dosha: Optional[str], strictness: float) -> Tuple[KDTree, np.ndarray]:
+        mask = self.compliance_mask(diet, dosha, strictness)
+        # Keyed by the mask itself: strictnesses selecting the same foods share a tree
+        key = None if mask is None else np.packbits(mask).tobytes()
+        with self._lock:
+            entry = self._trees.get(key)
+            if entry is None:
+                members = np.arange(self.index.size) if mask is None else np.flatnonzero(mask)
+                entry = (KDTree(self.vectors[members]), members)
+                self._trees[key] = entry
+        return entry
+
+    def position_of(self, food_key: str) -> Optional[int]:
+        return self.positions_by_key.get(food_key.strip().lower())
+
+    def query(self, position: int, k: int = 5, diet: Optional[str] = None,
+              dosha: Optional[str] = None, strictness: float = 0.7) -> Tuple[np.ndarray, np.ndarray]:
+        """Catalog positions and distances of the k compliant foods nearest to a food, itself excluded"""
+        tree, members = self._tree_for(diet, dosha.lower() if dosha else None, strictness)
+        count = min(k + 1, len(members))
+        if count == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        distances, found = tree.query(self.vectors[position:position + 1], k=count)
+        positions = members[found[0]]
+        keep = positions != position
+        return positions[keep][:k], distances[0][keep][:k]
+
+    def substitutes(self, food_df: pd.DataFrame, food_key: str, k: int = 5, diet: Optional[str] = None,
+                    dosha: Optional[str] = None, strictness: float = 0.7) -> Optional[List[Dict]]:
+        """Nearest compliant substitutes as records, or None for an unknown food"""
+        position = self.position_of(food_key)
+        if position is None:
+            return None
+
+        positions, distances = self.query(position, k, diet, dosha, strictness)
+        columns = [col for col in ("food_key", "Food_Item", "Category", *MACRO_COLUMNS, "is_veg", "is_vegan")
+                   if col in food_df.columns]
+        rows = food_df.iloc[positions][columns]
+        for col in MACRO_COLUMNS:
+            if col in rows.columns:
+                rows[col] = rows[col].astype(np.float64).round(2)
+        rows = rows.astype(object)
+        records = rows.where(rows.notna(), None).to_dict(orient="records")
+        for record, distance in zip(records, distances):
+            record["distance"] = round(float(distance), 4)
+        return records
+
+
+def _build_substitute_index(food_df: pd.DataFrame) -> SubstituteIndex:
+    index = SubstituteIndex(food_df)
+    logger.debug(f"Built substitute index over {index.index.size} foods")
+    return index
+
+
+_substitute_indexes = frame_registry(_build_substitute_index)
+
+
+def get_substitute_index(food_df: pd.DataFrame) -> SubstituteIndex:
+    """Return the SubstituteIndex for a catalog frame, building it on first use"""
+    return _substitute_indexes(food_df)
@@ -0,0 +1,57 @@
+"""
+Shared fixtures and helpers for the backend tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import UserProfile
+
+
+@pytest.fixture
+def food_df():
+    """Processed food catalog with a mix of doshas, diets and names"""
+    rng = np.random.default_rng(7)
+    names = [
+        "Peanut Chutney", "Peanut  Butter Toast", "Coconut Rice", "Dal Tadka",
+        "Paneer Tikka", "Chicken Curry", "Fish Fry", "Egg Bhurji", "Sugar Cane Juice",
+        "Jaggery Laddoo", "Lime Pickle", "Vegetable Upma", "Masala Dosa", "Milk Kheer",
+    ]
+    rows = []
+    for i in range(280):
+        name = f"{names[i % len(names)]} {i // len(names)}"
+        rows.append({
+            "Food_Item": name,
+            "Category": ["Kerala", "Karnataka", "Vegetables", "Processed Snacks"][i % 4],
+            "Calories": float(rng.integers(20, 700)),
+            "Protein": float(rng.integers(0, 30)),
+            "Carbs": float(rng.integers(0, 80)),
+            "Fat": float(rng.integers(0, 30)),
+            "Dosha_Vata": float(rng.integers(-1, 2)),
+            "Dosha_Pitta": float(rng.integers(-1, 2)),
+            "Dosha_Kapha": float(rng.integers(-1, 2)),
+            "is_veg": "Chicken" not in name and "Fish" not in name and "Egg" not in name,
+            "is_vegan": not any(t in name for t in ("Chicken", "Fish", "Egg", "Paneer", "Milk")),
+            "food_key": name.strip().lower(),
+        })
+    return pd.DataFrame(rows)
+
+
+def make_profile(**overrides):
+    """User profile with sensible defaults"""
+    data = {"Age": 30, "Gender": "female", "Weight_kg": 60.0, "Height_cm": 160.0}
+    data.update(overrides)
+    return UserProfile(**data)
+
+
+DOSHA_RESULTS = [
+    {"dosha": "vata", "scores": {"vata": 0.6, "pitta": 0.3, "kapha": 0.1}},
+    {"dosha": "pitta", "scores": {"pitta": 0.47, "kapha": 0.333, "vata": 0.197}},
+    {"dosha": "kapha", "scores": {"kapha": 0.9}},
+    {"dosha": "", "scores": {}},
+]
@@ -0,0 +1,35 @@
+"""
+Tests for the scalability benchmark suite
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import compare, run_suite, synthetic_catalog, synthetic_profiles
+
+
+def test_synthetic_catalog_is_processed_and_sized():
+    food_df = synthetic_catalog(12_000, seed=1)
+    assert len(food_df) == 12_000
+    assert food_df["food_key"].is_unique
+    assert {"is_veg", "is_vegan", "Dosha_Vata", "Category", "Food_Group"} <= set(food_df.columns)
+
+
+def test_synthetic_profiles_vary():
+    profiles = synthetic_profiles(30, seed=2)
+    assert len({p["profile"].Allergies for p in profiles}) > 5
+    assert all(abs(sum(p["dosha_result"]["scores"].values()) - 1) < 0.01 for p in profiles)
+
+
+def test_suite_and_regression_check():
+    results = run_suite(sizes=[500], repeats=2, profiles=3)
+    stats = results["results"]["filter_foods_for_user"]["500"]
+    assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert set(results["results"]) >= {"score_and_rank_foods", "make_food_snippet", "optimize_meal_plan_30_days"}
+    assert compare(results, results) == []
+
+    slower = {"results": {"make_food_snippet": {"500": dict(stats, p50_ms=stats["p50_ms"] * 2 + 10)}}}
+    baseline = {"results": {"make_food_snippet": {"500": stats}}}
+    regressions = compare(slower, baseline)
+    assert [(r["function"], r["metric"]) for r in regressions] == [("make_food_snippet", "p50_ms")]
@@ -0,0 +1,172 @@
+"""
+Tests for memoized candidate selection
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from candidate_cache import CandidateCache, candidate_cache
+from config import settings
+from dataset_loader import DatasetSnapshot
+import filter_and_score
+from filter_and_score import FoodFilter, select_candidates, select_candidates_batch
+from conftest import DOSHA_RESULTS, make_profile
+
+
+DOSHA_RESULT = {"dosha": "pitta", "scores": {"vata": 0.2, "pitta": 0.5, "kapha": 0.3}}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    candidate_cache.clear()
+    yield
+    candidate_cache.clear()
+
+
+class TestCandidateCache:
+    """Test the LRU/TTL cache itself"""
+
+    def test_lru_eviction_and_counters(self):
+        """Least recently used entries are evicted first and counted"""
+        cache = CandidateCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 1, 1)
+
+    def test_expired_entries_miss(self):
+        """Entries past their TTL are dropped on lookup"""
+        cache = CandidateCache(max_entries=4, ttl_seconds=-1)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+
+class TestSelectCandidates:
+    """Test memoized filtering and ranking"""
+
+    def test_equivalent_profiles_share_signature(self):
+        """Restriction order, case and duplicates do not change the signature"""
+        a = make_profile(Allergies="peanut, egg", Food_preference="non_vegetarian")
+        b = make_profile(Allergies="Egg,peanut,egg")
+        assert (FoodFilter.constraint_signature(a, DOSHA_RESULT, 200, 100, 10)
+                == FoodFilter.constraint_signature(b, DOSHA_RESULT, 200, 100, 10))
+        c = make_profile(Allergies="peanut, egg", Food_preference="vegan")
+        assert (FoodFilter.constraint_signature(a, DOSHA_RESULT, 200, 100, 10)
+                != FoodFilter.constraint_signature(c, DOSHA_RESULT, 200, 100, 10))
+
+    def test_signature_keeps_min_items(self):
+        """min_items picks the filter level, so it is part of the signature"""
+        profile = make_profile()
+        assert (FoodFilter.constraint_signature(profile, DOSHA_RESULT, 200, 100, 10)
+                != FoodFilter.constraint_signature(profile, DOSHA_RESULT, 200, 100, 50))
+
+    def test_dosha_scores_are_exact_unless_bucketed(self, monkeypatch):
+        """Weights are bucketed only when CANDIDATE_DOSHA_SCORE_STEP is set"""
+        profile = make_profile()
+        noisy = {"dosha": "pitta", "scores": {"vata": 0.2000013, "pitta": 0.4991, "kapha": 0.3008987}}
+        shifted = {"dosha": "pitta", "scores": {"vata": 0.1, "pitta": 0.6, "kapha": 0.3}}
+
+        def same(a, b):
+            return (FoodFilter.constraint_signature(profile, a, 200, 100, 10)
+                    == FoodFilter.constraint_signature(profile, b, 200, 100, 10))
+
+        assert not same(DOSHA_RESULT, noisy)
+        monkeypatch.setattr(settings, "CANDIDATE_DOSHA_SCORE_STEP", 0.05)
+        assert same(DOSHA_RESULT, noisy)
+        assert not same(DOSHA_RESULT, shifted)
+
+    def test_hit_matches_uncached_result(self, food_df):
+        """A cache hit returns the same frame as ranking again"""
+        snapshot = DatasetSnapshot(7, {"food": food_df})
+        food = snapshot.datasets["food"]
+        profile = make_profile(Allergies="peanut", Food_preference="vegetarian")
+
+        first = select_candidates(food, profile, DOSHA_RESULT)
+        second = select_candidates(food, profile, DOSHA_RESULT)
+        assert candidate_cache.stats()["hits"] == 1
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_min_items_does_not_share_entries(self, food_df):
+        """A larger min_items is ranked again rather than served the strict level"""
+        snapshot = DatasetSnapshot(9, {"food": food_df})
+        food = snapshot.datasets["food"]
+        profile = make_profile(Allergies="peanut", Food_preference="vegan")
+
+        select_candidates(food, profile, DOSHA_RESULT, min_items=10)
+        hits = candidate_cache.stats()["hits"]
+        relaxed = select_candidates(food, profile, DOSHA_RESULT, min_items=len(food))
+        assert candidate_cache.stats()["hits"] == hits
+        candidate_cache.clear()
+        pd.testing.assert_frame_equal(relaxed, select_candidates(food, profile, DOSHA_RESULT, min_items=len(food)))
+
+    def test_unversioned_frames_are_not_cached(self, food_df):
+        """Frames outside a snapshot have no version to key on"""
+        select_candidates(food_df, make_profile(), DOSHA_RESULT)
+        select_candidates(food_df, make_profile(), DOSHA_RESULT)
+        assert candidate_cache.stats()["entries"] == 0
+
+
+class TestSelectCandidatesBatch:
+    """Test cohort selection against the single-profile path"""
+
+    PROFILES = [
+        {},
+        {"Allergies": "peanut", "Food_preference": "vegetarian"},
+        {"Food_preference": "vegan", "Health_Conditions": "diabetes"},
+        {"Dietary_Restrictions": "pickle, rice"},
+        {"Allergies": "Peanut", "Food_preference": "vegetarian"},
+    ]
+
+    def cohort(self):
+        profiles, doshas = [], []
+        for i, overrides in enumerate(self.PROFILES * 2):
+            profiles.append(make_profile(**overrides))
+            doshas.append(DOSHA_RESULTS[i % len(DOSHA_RESULTS)])
+        return profiles, doshas
+
+    def assert_matches_single(self, food_df, profiles, doshas, results):
+        for profile, dosha, (positions, scores) in zip(profiles, doshas, results):
+            expected = select_candidates(food_df, profile, dosha, top_n=40)
+            assert food_df.index[positions].tolist() == expected.index.tolist()
+            assert np.array_equal(scores, expected['user_score'].to_numpy())
+
+    def test_matches_select_candidates(self, food_df):
+        profiles, doshas = self.cohort()
+        results = select_candidates_batch(food_df, profiles, doshas, top_n=40, processes=0)
+        self.assert_matches_single(food_df, profiles, doshas, results)
+
+    def test_process_pool_matches(self, food_df, monkeypatch):
+        monkeypatch.setattr(filter_and_score, "PARALLEL_MIN_PROFILES", 1)
+        profiles, doshas = self.cohort()
+        try:
+            results = select_candidates_batch(food_df, profiles, doshas, top_n=40, processes=2)
+            self.assert_matches_single(food_df, profiles, doshas, results)
+            # Later batches over the same catalog reuse the running workers
+            pool = filter_and_score.start_batch_pool(food_df, 2)
+            select_candidates_batch(food_df, profiles[:5], doshas[:5], top_n=40, processes=2)
+            assert filter_and_score.start_batch_pool(food_df, 2) is pool
+        finally:
+            filter_and_score.shutdown_batch_pool()
+
+    def test_reuses_cached_signatures(self, food_df):
+        snapshot = DatasetSnapshot(8, {"food": food_df})
+        food = snapshot.datasets["food"]
+        profiles, doshas = self.cohort()
+        select_candidates_batch(food, profiles[:3], doshas[:3], top_n=40)
+        entries = candidate_cache.stats()["entries"]
+        assert entries == 3
+
+        results = select_candidates_batch(food, profiles, doshas, top_n=40)
+        assert candidate_cache.stats()["hits"] >= 3
+        self.assert_matches_single(food, profiles, doshas, results)
@@ -0,0 +1,291 @@
+"""
+Tests for dataset loading and the processed snapshot cache
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from dataset_cache import SnapshotCache
+from dataset_loader import DatasetHandle, DatasetLoader, LazyDatasets
+from exceptions import DatasetError
+from candidate_cache import candidate_cache
+from filter_and_score import FoodFilter, select_candidates
+from food_index import get_food_index
+from food_snippets import render_detailed_lines
+import health_rules
+from conftest import make_profile
+
+
+@pytest.fixture
+def food_csv(tmp_path):
+    """Small food CSV shaped like data/food_dataset.csv"""
+    path = tmp_path / "food.csv"
+    pd.DataFrame({
+        "Food_Item": ["Rice", "Dal", " Paneer Tikka "],
+        "Category": ["Grains", "Legumes", None],
+        "Calories": [130, "bad", 250],
+        "Protein": [2.7, 9.0, 18.0],
+        "Carbs": [28.0, 20.0, 6.0],
+        "Fat": [0.3, 0.4, 17.0],
+        "Vegetarian": ["Yes", "Yes", "Yes"],
+        "Vegan": ["Yes", "Yes", "No"],
+        "Dosha_Vata": ["decreases", "neutral", "increases"],
+        "Dosha_Pitta": ["neutral", "Decreases", None],
+        "Dosha_Kapha": ["increases", "increases", "increases"],
+        "Fat_Adjusted": [None, 2.0, None],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def dataset_paths(food_csv, tmp_path, monkeypatch):
+    """Point the loader at temporary CSVs and a temporary snapshot cache"""
+    dosha_csv = tmp_path / "dosha.csv"
+    pd.DataFrame({"Body Size": ["Thin", "Medium"], "Dosha": ["vata", "pitta"]}).to_csv(dosha_csv, index=False)
+
+    monkeypatch.setattr("dataset_loader.snapshot_cache",
+                        SnapshotCache(cache_dir=str(tmp_path / "snapshots"), enabled=True))
+    monkeypatch.setattr(settings, "FOOD_DATASET_PATH", food_csv)
+    monkeypatch.setattr(settings, "DOSHA_DATASET_PATH", str(dosha_csv))
+    monkeypatch.setattr(settings, "PATIENT_DATASET_PATH", str(tmp_path / "missing_patient.csv"))
+    monkeypatch.setattr(settings, "LIFESTYLE_DATASET_PATH", str(tmp_path / "missing_lifestyle.csv"))
+    return {"food": food_csv, "dosha": str(dosha_csv)}
+
+
+class TestSnapshotCache:
+    """Test the columnar snapshot cache"""
+
+    def test_snapshot_round_trip_matches_csv_load(self, food_csv, tmp_path, monkeypatch):
+        """A snapshot hit returns the same frame as processing the CSV"""
+        cache = SnapshotCache(cache_dir=str(tmp_path / "snapshots"), enabled=True)
+        monkeypatch.setattr("dataset_loader.snapshot_cache", cache)
+
+        from_csv = DatasetLoader().load_food_dataset(food_csv)
+        content_hash = cache.file_hash(food_csv)
+        assert os.path.exists(os.path.join(cache.snapshot_dir("food", content_hash), "meta.json"))
+
+        from_snapshot = DatasetLoader().load_food_dataset(food_csv)
+        pd.testing.assert_frame_equal(from_csv, from_snapshot)
+        assert pd.isna(from_snapshot.loc[2, "Category"])
+        assert from_snapshot.loc[1, "Calories"] == 0.0
+
+        # Numeric columns are read in place from the memory-mapped files
+        base = from_snapshot["Calories"].to_numpy()
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert base is not None
+
+    def test_changed_csv_misses_cache(self, food_csv, tmp_path):
+        """Editing the CSV changes the content hash and prunes the old snapshot"""
+        cache = SnapshotCache(cache_dir=str(tmp_path / "snapshots"), enabled=True)
+        df = DatasetLoader._process_food_frame(pd.read_csv(food_csv))
+        old_hash = cache.file_hash(food_csv)
+        assert cache.store("food", old_hash, df)
+
+        with open(food_csv, "a") as fh:
+            fh.write("Apple,Fruits,52,0.3,14,0.2,Yes,Yes,neutral,decreases,neutral,\n")
+        new_hash = cache.file_hash(food_csv)
+
+        assert new_hash != old_hash
+        assert cache.load("food", new_hash) is None
+
+        assert cache.store("food", new_hash, DatasetLoader._process_food_frame(pd.read_csv(food_csv)))
+        assert cache.load("food", old_hash) is None
+        assert len(cache.load("food", new_hash)) == 4
+
+
+class TestDatasetSnapshots:
+    """Test immutable dataset snapshots and hot reload"""
+
+    def test_snapshot_is_built_once_with_index(self, dataset_paths):
+        """The first reader builds the snapshot; later readers share it"""
+        loader = DatasetLoader()
+        snapshot = loader.get_snapshot()
+
+        assert loader.get_snapshot() is snapshot
+        assert set(snapshot.datasets) == {"food", "dosha"}
+        assert snapshot.food_index is get_food_index(snapshot.datasets["food"])
+        with pytest.raises(TypeError):
+            snapshot.datasets["food"] = None
+
+    def test_reload_swaps_snapshot_and_keeps_old_one_intact(self, dataset_paths):
+        """A reload publishes a new version while held snapshots stay unchanged"""
+        loader = DatasetLoader()
+        old = loader.get_snapshot()
+
+        with open(dataset_paths["food"], "a") as fh:
+            fh.write("Apple,Fruits,52,0.3,14,0.2,Yes,Yes,neutral,decreases,neutral,\n")
+
+        loader.reload_in_background().join(timeout=10)
+        new = loader.get_snapshot()
+
+        assert new.version == old.version + 1
+        assert len(new.datasets["food"]) == 4
+        assert len(old.datasets["food"]) == 3
+
+    def test_reload_applies_food_delta(self, dataset_paths):
+        """Only the edited food rows are re-indexed on reload"""
+        loader = DatasetLoader()
+        old = loader.get_snapshot()
+
+        pd.read_csv(dataset_paths["food"]).replace({"Dal": "Moong Dal"}).to_csv(dataset_paths["food"], index=False)
+
+        assert loader.reload()
+        new = loader.get_snapshot()
+
+        delta = new.food_delta
+        assert (delta.added, delta.changed, delta.removed) == ({"moong dal"}, set(), {"dal"})
+        assert new.food_index is get_food_index(new.datasets["food"])
+        assert new.food_index.name_terms.match("moong").tolist() == [False, True, False]
+
+    def test_reload_patches_prompt_lines_and_health_masks(self, dataset_paths):
+        """Unchanged rows keep their rendered lines and rule matches across a delta reload"""
+        loader = DatasetLoader()
+        old = loader.get_snapshot()
+
+        pd.read_csv(dataset_paths["food"]).replace({"Dal": "Moong Dal"}).to_csv(dataset_paths["food"], index=False)
+        assert loader.reload()
+        new = loader.get_snapshot()
+        food_df = new.datasets["food"]
+
+        assert new.food_snippets.detailed[0] is old.food_snippets.detailed[0]
+        assert new.food_snippets.detailed.tolist() == render_detailed_lines(food_df).tolist()
+
+        rebuilt = health_rules.ConditionMasks(get_food_index(food_df.copy()), new.health_rules)
+        masks = new.food_index.condition_masks
+        assert masks.rules is new.health_rules
+        for rule, mask in rebuilt.rule_masks.items():
+            assert masks.rule_masks[rule].tolist() == mask.tolist()
+
+    def test_reload_carries_candidates_the_delta_cannot_change(self, dataset_paths):
+        """Rankings whose filters never reach the edited rows survive a reload"""
+        loader = DatasetLoader()
+        old = loader.get_snapshot()
+        candidate_cache.clear()
+        dosha_result = {"dosha": "vata", "scores": {"vata": 0.7, "pitta": 0.3}}
+        dal_allergy = make_profile(Allergies="dal")
+        no_allergy = make_profile()
+        for profile in (dal_allergy, no_allergy):
+            select_candidates(old.datasets["food"], profile, dosha_result, min_items=0)
+
+        # Dal is replaced by Moong Dal, which the allergy still excludes
+        pd.read_csv(dataset_paths["food"]).replace({"Dal": "Moong Dal"}).to_csv(dataset_paths["food"], index=False)
+        assert loader.reload()
+        food_df = loader.get_snapshot().datasets["food"]
+
+        hits = candidate_cache.stats()["hits"]
+        carried = select_candidates(food_df, dal_allergy, dosha_result, min_items=0)
+        assert candidate_cache.stats()["hits"] == hits + 1
+        assert carried["Food_Item"].tolist() == ["Rice"]
+
+        ranked = select_candidates(food_df, no_allergy, dosha_result, min_items=0)
+        assert candidate_cache.stats()["hits"] == hits + 1
+        assert sorted(ranked["Food_Item"]) == ["Moong Dal", "Rice"]
+
+        candidate_cache.clear()
+        fresh = select_candidates(food_df, dal_allergy, dosha_result, min_items=0)
+        pd.testing.assert_frame_equal(carried, fresh)
+
+    def test_health_rules_activate_with_their_snapshot(self, dataset_paths, tmp_path, monkeypatch):
+        """Edited rules apply to the snapshot built from them, once it is published"""
+        monkeypatch.setattr(health_rules, "_current", None)
+        rules_csv = tmp_path / "rules.csv"
+        rules_csv.write_text("condition,avoid_term\ndiabetes,rice\n")
+        monkeypatch.setattr(settings, "HEALTH_RULES_PATH", str(rules_csv))
+        loader = DatasetLoader()
+        old = loader.get_snapshot()
+        assert health_rules.get_health_rules() is old.health_rules
+
+        def signature(rules):
+            return FoodFilter.constraint_signature(make_profile(Health_Conditions="diabetes"),
+                                                   {"dosha": "vata"}, 200, 100, 10, rules)
+
+        rules_csv.write_text("condition,avoid_term\ndiabetes,dal\n")
+        new = loader.build_snapshot(previous=old)
+        # Built but not published: the old snapshot keys and filters with its own rules
+        assert health_rules.get_health_rules() is old.health_rules
+        assert old.food_index.condition_masks.rules is old.health_rules
+        assert ("rice",) in signature(old.food_index.condition_masks.rules)
+        assert ("dal",) in signature(new.food_index.condition_masks.rules)
+
+        assert loader.reload() is True
+        published = loader.get_snapshot()
+        assert health_rules.get_health_rules() is published.health_rules
+        assert health_rules.get_health_rules().avoid_terms("diabetes") == ["dal"]
+
+        # A reload that fails leaves the published rules active
+        rules_csv.write_text("condition,avoid_term\ndiabetes,egg\n")
+        os.remove(dataset_paths["dosha"])
+        assert loader.reload() is False
+        assert health_rules.get_health_rules() is published.health_rules
+
+    def test_failed_reload_keeps_current_snapshot(self, dataset_paths):
+        """If the new data cannot be loaded the active snapshot is kept"""
+        loader = DatasetLoader()
+        old = loader.get_snapshot()
+
+        os.remove(dataset_paths["dosha"])
+
+        assert loader.reload() is False
+        assert loader.get_snapshot() is old
+
+    def test_non_critical_datasets_load_lazily(self, dataset_paths, tmp_path, monkeypatch):
+        """Patient data is only read when a caller first asks for it"""
+        patient_csv = tmp_path / "patient.csv"
+        pd.DataFrame({"Patient_ID": [" P1 "], "Age": [40]}).to_csv(patient_csv, index=False)
+        monkeypatch.setattr(settings, "PATIENT_DATASET_PATH", str(patient_csv))
+
+        snapshot = DatasetLoader().build_snapshot(preload=["food"])
+        datasets = snapshot.datasets
+
+        assert set(datasets.loaded()) == {"food", "dosha"}
+        assert datasets["patient"]["patient_key"].tolist() == ["p1"]
+        assert set(datasets.loaded()) == {"food", "dosha", "patient"}
+        assert datasets.get("lifestyle") is None
+        assert len(datasets) == len(list(datasets)) == 3
+
+    def test_length_matches_iteration(self):
+        """A dataset that fails on first load is neither counted nor iterated"""
+        def fail():
+            raise DatasetError("missing", "DATASET_ERROR")
+
+        datasets = LazyDatasets({
+            "food": DatasetHandle("food", lambda: pd.DataFrame({"a": [1]})),
+            "lifestyle": DatasetHandle("lifestyle", fail),
+        })
+        assert len(datasets) == len(list(datasets)) == 1
+
+    def test_dataset_info_is_precomputed_per_snapshot(self, dataset_paths, monkeypatch):
+        """/datasets/info statistics come from the snapshot, not a fresh scan"""
+        loader = DatasetLoader()
+        snapshot = loader.get_snapshot()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("statistics recomputed")
+
+        monkeypatch.setattr(pd.DataFrame, "memory_usage", fail)
+        info = loader.get_dataset_info()
+
+        assert info["food"]["shape"] == (3, 15)
+        assert info["food"]["null_counts"]["Fat_Adjusted"] == 2
+        assert info["food"]["snapshot_version"] == snapshot.version
+        assert info["patient"] == {"loaded": False, "snapshot_version": snapshot.version}
+
+    def test_datasets_use_compact_dtypes(self, dataset_paths):
+        """Effects are int8, macros float32 and repeated labels categorical"""
+        loader = DatasetLoader()
+        food = loader.get_snapshot().datasets["food"]
+
+        assert food["Dosha_Vata"].dtype == "int8"
+        assert food["Calories"].dtype == "float32"
+        assert isinstance(food["Vegetarian"].dtype, pd.CategoricalDtype)
+        assert food["food_key"].dtype == object
+
+        info = loader.get_dataset_info()["food"]
+        assert info["memory_uncompacted_mb"] >= info["memory_usage_mb"]
@@ -0,0 +1,329 @@
+"""
+Tests for food filtering and scoring
+"""
+import gc
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import DOSHA_RESULTS, make_profile
+from food_index import FoodIndex, TermIndex, diff_catalogs, frame_registry, get_food_index
+from filter_and_score import (
+    FilterLadder, FoodFilter, diversify_candidates, filter_foods_for_user, score_and_rank_food_chunks,
+    score_and_rank_foods, make_food_list, make_food_snippet, score_and_rank_foods_batch
+)
+from selection import StreamingTopK, mmr_indices, top_k_indices
+
+
+def filter_with_frames(food_df, user_profile, target_dosha=None, max_items=150, dosha_strictness=0.7):
+    """Reference implementation chaining the DataFrame-based filters"""
+    df = FoodFilter.filter_by_allergies(food_df, user_profile.Allergies)
+    df = FoodFilter.filter_by_health_conditions(df, user_profile.Health_Conditions)
+    df = FoodFilter.filter_by_diet_preference(df, user_profile)
+    df = FoodFilter.filter_by_dietary_restrictions(df, user_profile.Dietary_Restrictions)
+    if target_dosha:
+        df = FoodFilter.filter_by_dosha_balance(df, target_dosha, dosha_strictness)
+    if len(df) < 20 and dosha_strictness > 0.3:
+        df = FoodFilter.filter_by_allergies(food_df, user_profile.Allergies)
+        df = FoodFilter.filter_by_diet_preference(df, user_profile)
+        if target_dosha:
+            df = FoodFilter.filter_by_dosha_balance(df, target_dosha, 0.3)
+    if len(df) > max_items:
+        df = df.sort_values("Calories", kind="stable").head(max_items)
+    return df
+
+
+def reference_scores(df, dosha_result):
+    """The original row-by-row scorer, kept as the equivalence oracle"""
+    scores = {}
+    target_dosha = dosha_result.get('dosha', '').lower()
+    for idx, row in df.iterrows():
+        score = 0.0
+        if target_dosha:
+            dosha_col = f"Dosha_{target_dosha.capitalize()}"
+            if dosha_col in row:
+                effect = row[dosha_col]
+                if effect < 0:
+                    score += 40
+                elif effect == 0:
+                    score += 20
+                else:
+                    score -= 20
+        for dosha, dosha_score in dosha_result.get('scores', {}).items():
+            dosha_col = f"Dosha_{dosha.capitalize()}"
+            if dosha_col in row:
+                score += -row[dosha_col] * dosha_score * 20
+        calories = row.get('Calories', 0)
+        if 50 <= calories <= 400:
+            score += 10
+        elif calories > 600:
+            score -= 10
+        if row.get('Protein', 0) > 5:
+            score += 5
+        category = str(row.get('Category', '')).lower()
+        for beneficial in ['vegetables', 'fruits', 'whole grains', 'legumes', 'herbs', 'spices']:
+            if beneficial in category:
+                score += 15
+                break
+        food_name = str(row.get('Food_Item', '')).lower()
+        for indicator in ['processed', 'packaged', 'canned', 'instant']:
+            if indicator in food_name or indicator in category:
+                score -= 15
+                break
+        scores[idx] = round(score, 2)
+    return pd.Series(scores)
+
+
+class TestScoring:
+    """Test vectorized scoring against the original row-by-row scorer"""
+
+    @pytest.mark.parametrize("dosha_result", DOSHA_RESULTS)
+    def test_vectorized_scores_match_reference(self, food_df, dosha_result):
+        """Every food gets exactly the score the iterrows scorer produced"""
+        scored = FoodFilter.score_foods_for_user(food_df, make_profile(), dosha_result)
+        expected = reference_scores(food_df, dosha_result)
+        assert scored['user_score'].sort_index().tolist() == expected.sort_index().tolist()
+        assert scored['user_score'].is_monotonic_decreasing
+
+    def test_batch_matrix_matches_single_user(self, food_df):
+        """Each row of the batch matrix equals that user's single scoring"""
+        matrix = FoodFilter.score_foods_batch(food_df, DOSHA_RESULTS)
+        assert matrix.shape == (len(DOSHA_RESULTS), len(food_df))
+        for row, dosha_result in zip(matrix, DOSHA_RESULTS):
+            assert row.tolist() == reference_scores(food_df, dosha_result).tolist()
+
+    def test_batch_ranking(self, food_df):
+        """Batch ranking returns each user's top-N by score"""
+        ranked = score_and_rank_foods_batch(food_df, DOSHA_RESULTS, top_n=10, chunk_size=3)
+        assert len(ranked) == len(DOSHA_RESULTS)
+        for frame, dosha_result in zip(ranked, DOSHA_RESULTS):
+            expected = reference_scores(food_df, dosha_result).sort_values(ascending=False)
+            assert frame['user_score'].tolist() == expected.head(10).tolist()
+            assert frame['rank'].tolist() == list(range(1, 11))
+
+
+class TestFoodIndex:
+    """Test the precompiled food index"""
+
+    def test_index_arrays_are_compact(self, food_df):
+        """Dosha effects are int8, macros float32"""
+        index = FoodIndex(food_df)
+        assert index.dosha_effects["vata"].dtype == np.int8
+        assert index.macros["Calories"].dtype == np.float32
+        assert index.is_vegan.dtype == bool
+        assert len(index.categories) == 4
+
+    def test_index_is_reused_per_frame(self, food_df):
+        """The same frame always maps to the same index"""
+        assert get_food_index(food_df) is get_food_index(food_df)
+        assert get_food_index(food_df.copy()) is not get_food_index(food_df)
+
+    def test_frame_registry_builds_once_and_forgets(self, food_df):
+        """Derived values are built once per live frame and dropped with it"""
+        builds = []
+        registry = frame_registry(lambda df, tag: builds.append(tag) or len(builds))
+        frame = food_df.copy()
+        assert registry(frame, "a") == registry(frame, "b") == 1
+        assert registry.values() == [1]
+
+        del frame
+        gc.collect()
+        assert registry.values() == [] and builds == ["a"]
+
+    @pytest.mark.parametrize("term", [
+        "peanut butter", "peanutbutter", "nut", "egg", "ri", "a", "ice juice", "(", "zzz", "k ",
+    ])
+    def test_term_index_matches_regex_semantics(self, food_df, term):
+        """The trigram index agrees with str.contains on the compiled pattern"""
+        index = TermIndex(food_df["food_key"])
+        pattern = FoodFilter.create_regex_pattern([term])
+        expected = food_df["food_key"].str.contains(pattern, na=False, regex=True).to_numpy()
+        assert (index.match(term) == expected).all()
+        assert index.match(term) is index.match(term)
+
+    def test_allergy_mask_checks_ingredients(self, food_df):
+        """Allergens are matched against ingredients when the catalog has them"""
+        food_df = food_df.assign(Ingredients=["Rice, Peanuts" if i % 5 == 0 else None
+                                              for i in range(len(food_df))])
+        keep = FoodFilter.allergy_mask(FoodIndex(food_df), "peanut")
+        expected = FoodFilter.filter_by_allergies(food_df, "peanut")
+        assert list(np.flatnonzero(keep)) == list(expected.index)
+
+    @pytest.mark.parametrize("overrides,dosha,strictness", [
+        ({"Allergies": "peanut butter, egg"}, "vata", 0.7),
+        ({"Food_preference": "vegan", "Health_Conditions": "Diabetes"}, "pitta", 0.9),
+        ({"Food_preference": "vegetarian", "Dietary_Restrictions": "rice,dal"}, "kapha", 0.5),
+        ({"Allergies": "a,e,i,o,u"}, "vata", 0.9),
+        ({}, None, 0.7),
+    ])
+    def test_matches_frame_filters(self, food_df, overrides, dosha, strictness):
+        """Mask-based filtering selects the same rows as chained frame filters"""
+        profile = make_profile(**overrides)
+        expected = filter_with_frames(food_df, profile, dosha, 100, strictness)
+        result = filter_foods_for_user(food_df, profile, dosha, 100, strictness)
+        assert list(result.index) == list(expected.index)
+
+
+class TestCatalogDelta:
+    """Test incremental index updates from a catalog diff"""
+
+    @pytest.fixture
+    def updated_df(self, food_df):
+        """Catalog with rows edited, removed, added and reordered"""
+        df = food_df.drop(index=[3, 50]).copy()
+        df.loc[10, "Calories"] = 999.0
+        df.loc[11, "Dosha_Vata"] = 0.5
+        df.loc[12, "Category"] = "Fermented"
+        added = food_df.iloc[[0]].assign(Food_Item="Egg Curry", food_key="egg curry")
+        df = pd.concat([df.iloc[::-1], added])
+        return df.reset_index(drop=True)
+
+    def test_diff_by_food_key(self, food_df, updated_df):
+        """Edited, added and removed foods are reported by key"""
+        delta = diff_catalogs(food_df, updated_df)
+        keys = food_df["food_key"]
+        assert delta.changed == {keys[10], keys[11], keys[12]}
+        assert delta.added == {"egg curry"}
+        assert delta.removed == {keys[3], keys[50]}
+        assert (delta.row_map < 0).sum() == 4
+
+    def test_delta_index_matches_full_rebuild(self, food_df, updated_df):
+        """An index updated from the delta equals one built from scratch"""
+        previous = FoodIndex(food_df)
+        terms = ["egg", "peanut butter", "ri", "curry"]
+        previous.term_mask(terms)
+
+        delta = diff_catalogs(food_df, updated_df)
+        updated = FoodIndex.from_delta(previous, updated_df, delta.row_map)
+        rebuilt = FoodIndex(updated_df)
+
+        for dosha in rebuilt.dosha_effects:
+            assert (updated.dosha_effects[dosha] == rebuilt.dosha_effects[dosha]).all()
+        for col in rebuilt.macros:
+            assert (updated.macros[col] == rebuilt.macros[col]).all()
+        assert (updated.is_vegan == rebuilt.is_vegan).all()
+        assert (updated.categories[updated.category_codes]
+                == rebuilt.categories[rebuilt.category_codes]).all()
+        for term in terms + ["tikka", "egg c"]:
+            assert (updated.name_terms.match(term) == rebuilt.name_terms.match(term)).all()
+
+
+class TestTopK:
+    """Test partial top-k selection against full stable sorts"""
+
+    @pytest.mark.parametrize("k", [0, 1, 7, 50, 500])
+    @pytest.mark.parametrize("descending", [False, True])
+    def test_matches_stable_sort_with_ties_and_nans(self, k, descending):
+        rng = np.random.default_rng(3)
+        values = rng.integers(0, 20, 300).astype(float)
+        values[rng.choice(300, 40, replace=False)] = np.nan
+        expected = pd.Series(values).sort_values(ascending=not descending, kind="stable").index[:k]
+        assert top_k_indices(values, k, descending).tolist() == expected.tolist()
+
+    def test_streaming_matches_single_pass(self):
+        rng = np.random.default_rng(5)
+        values = np.round(rng.normal(size=1000), 1)
+        top = StreamingTopK(25, descending=True)
+        for start in range(0, len(values), 64):
+            top.push(values[start:start + 64])
+        positions, kept = top.result()
+        assert positions.tolist() == top_k_indices(values, 25, descending=True).tolist()
+        assert kept.tolist() == values[positions].tolist()
+
+    def test_ranking_matches_full_sort(self, food_df):
+        """score_and_rank_foods and the chunked ranker equal sorting every score"""
+        dosha_result = DOSHA_RESULTS[0]
+        full = FoodFilter.score_foods_for_user(food_df, make_profile(), dosha_result)
+        ranked = score_and_rank_foods(food_df, make_profile(), dosha_result, top_n=30)
+        assert ranked.index.tolist() == full.index[:30].tolist()
+        assert ranked['rank'].tolist() == list(range(1, 31))
+
+        chunks = (food_df.iloc[i:i + 45] for i in range(0, len(food_df), 45))
+        streamed = score_and_rank_food_chunks(chunks, dosha_result, top_n=30)
+        pd.testing.assert_frame_equal(streamed, ranked)
+
+    def test_mmr_without_diversity_is_top_k(self):
+        rng = np.random.default_rng(7)
+        values = rng.integers(0, 10, 200).astype(float)
+        labels = [rng.integers(0, 4, 200)]
+        vectors = rng.normal(size=(200, 4))
+        picked = mmr_indices(values, 30, labels, vectors, trade_off=1.0)
+        assert picked.tolist() == top_k_indices(values, 30, descending=True).tolist()
+
+    def test_mmr_spreads_labels(self):
+        relevance = np.array([1.0, 0.99, 0.98, 0.97, 0.5, 0.4])
+        labels = [np.array([0, 0, 0, 0, 1, 2])]
+        assert mmr_indices(relevance, 3, labels, trade_off=1.0).tolist() == [0, 1, 2]
+        assert mmr_indices(relevance, 3, labels, trade_off=0.5).tolist() == [0, 4, 5]
+
+    def test_diversify_candidates(self, food_df):
+        ranked = score_and_rank_foods(food_df, make_profile(), DOSHA_RESULTS[0], top_n=90)
+        plain = diversify_candidates(ranked, 30, trade_off=1.0)
+        assert plain.index.tolist() == ranked.index[:30].tolist()
+
+        diverse = diversify_candidates(ranked, 30, trade_off=0.5)
+        assert diverse['rank'].tolist() == list(range(1, 31))
+        assert diverse.index[0] == ranked.index[0]
+        assert diverse['Category'].nunique() >= plain['Category'].nunique()
+
+
+class TestFilterLadder:
+    """Test the relaxation ladder built from masks computed once"""
+
+    def test_level_counts_match_frame_filters(self, food_df):
+        profile = make_profile(Allergies="peanut", Health_Conditions="diabetes",
+                               Food_preference="vegetarian", Dietary_Restrictions="rice")
+        ladder = FilterLadder.build(food_df, profile, "vata", 0.9)
+
+        strict = FoodFilter.filter_by_dosha_balance(
+            FoodFilter.filter_by_dietary_restrictions(
+                FoodFilter.filter_by_diet_preference(
+                    FoodFilter.filter_by_health_conditions(
+                        FoodFilter.filter_by_allergies(food_df, "peanut"), "diabetes"),
+                    profile),
+                "rice"),
+            "vata", 0.9)
+        relaxed = FoodFilter.filter_by_dosha_balance(
+            FoodFilter.filter_by_diet_preference(FoodFilter.filter_by_allergies(food_df, "peanut"), profile),
+            "vata", 0.3)
+        assert ladder.counts["strict"] == len(strict)
+        assert ladder.counts["relaxed"] == len(relaxed)
+        assert [level["level"] for level in ladder.summary()] == ["strict", "relaxed", "lenient"]
+
+    def test_lenient_fallback_matches_refiltering(self, food_df):
+        """The min_items fallback equals re-running the filters at strictness 0.3"""
+        profile = make_profile(Allergies="a,e,i,o", Dietary_Restrictions="u")
+        ladder = FilterLadder.build(food_df, profile, "pitta")
+        level = ladder.choose(min_items=10_000)
+        assert level == "lenient"
+
+        expected = filter_foods_for_user(food_df, profile, "pitta", max_items=50, dosha_strictness=0.3)
+        assert ladder.positions(level, 50).tolist() == food_df.index.get_indexer(expected.index).tolist()
+
+
+class TestFoodSnippets:
+    """Test prompt lines pre-rendered from the catalog"""
+
+    def test_catalog_lines_match_rendering_candidates(self, food_df):
+        candidates = food_df.iloc[::-7].copy()
+        candidates['user_score'] = np.linspace(-40.25, 60.35, len(candidates))
+
+        snippet = make_food_snippet(candidates, n=25, catalog=food_df)
+        assert snippet == make_food_snippet(candidates, n=25)
+        lines = snippet.split("\n")
+        assert len(lines) == 27
+        assert lines[2].startswith(f"{candidates['Food_Item'].iloc[0][:30]} | ")
+        assert lines[2].endswith(f" ({round(candidates['user_score'].iloc[0], 1)})")
+
+        brief = make_food_list(candidates, n=5, catalog=food_df).split("\n")
+        first = candidates.iloc[0]
+        assert brief[0] == f"{first['Food_Item']} ({int(first['Calories'])} cal, score: {first['user_score']:.1f})"
+
+    def test_rows_missing_from_catalog_are_rendered(self, food_df):
+        extra = food_df.iloc[:3].set_axis([1000, 1001, 1002])
+        assert make_food_snippet(extra, catalog=food_df) == make_food_snippet(extra)
@@ -0,0 +1,100 @@
+"""
+Tests for the chunked streaming food ingest
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from dataset_cache import SnapshotCache
+from dataset_loader import DatasetLoader
+from exceptions import DatasetError
+from food_ingest import ingest_food_csv
+
+
+def write_catalog(path, extra_rows=()):
+    """Food CSV with 60 valid rows plus any extra raw rows"""
+    rows = [{
+        "Food_Item": f" Item {i} ",
+        "Category": ["Grains", "Legumes", "Vegetables", None][i % 4],
+        "Calories": 50 + i,
+        "Protein": "" if i % 7 == 0 else 1.5 * i,
+        "Carbs": 10.0,
+        "Fat": 0.5,
+        "Vegetarian": "Yes",
+        "Vegan": "No" if i % 3 else "Yes",
+        "Dosha_Vata": ["decreases", "neutral", "Increases", ""][i % 4],
+        "Dosha_Pitta": "neutral",
+        "Dosha_Kapha": "increases",
+        "Fat_Adjusted": None if i % 5 else 0.4,
+    } for i in range(60)]
+    pd.DataFrame(rows + list(extra_rows)).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SnapshotCache(cache_dir=str(tmp_path / "snapshots"), enabled=True)
+
+
+class TestFoodIngest:
+    """Test streaming a food CSV into the snapshot format"""
+
+    def test_snapshot_matches_in_memory_processing(self, tmp_path, cache):
+        """Chunked ingest produces the frame the full-file loader builds"""
+        path = write_catalog(tmp_path / "food.csv")
+        report = ingest_food_csv(path, cache=cache, chunk_rows=7,
+                                 quarantine_path=str(tmp_path / "q.csv"))
+
+        streamed = cache.load("food", cache.file_hash(path))
+        expected = DatasetLoader._process_food_frame(pd.read_csv(path))
+
+        assert report["rows_ingested"] == 60 and report["rows_quarantined"] == 0
+        pd.testing.assert_frame_equal(streamed, expected)
+        assert not os.path.exists(tmp_path / "q.csv")
+
+    def test_bad_rows_are_quarantined_with_reasons(self, tmp_path, cache):
+        """Rows failing the schema are written to quarantine instead of coerced"""
+        path = write_catalog(tmp_path / "food.csv", [
+            {"Food_Item": "Mystery", "Calories": "lots"},
+            {"Food_Item": "", "Calories": 10},
+            {"Food_Item": "Odd", "Calories": -5, "Dosha_Vata": "soothes"},
+        ])
+        quarantine = str(tmp_path / "q.csv")
+        report = ingest_food_csv(path, cache=cache, chunk_rows=8, quarantine_path=quarantine)
+
+        assert report["rows_ingested"] == 60
+        assert report["rows_quarantined"] == 3
+
+        rejected = pd.read_csv(quarantine)
+        assert rejected["row"].tolist() == [61, 62, 63]
+        assert rejected["reasons"].tolist() == [
+            "Calories: not a number 'lots'",
+            "Food_Item: missing",
+            "Calories: below 0; Dosha_Vata: unexpected value 'soothes'",
+        ]
+        streamed = cache.load("food", cache.file_hash(path))
+        assert "mystery" not in set(streamed["food_key"])
+
+    def test_missing_required_column_fails(self, tmp_path, cache):
+        """A catalog without Calories is rejected as a whole"""
+        path = tmp_path / "food.csv"
+        pd.DataFrame({"Food_Item": ["Rice"]}).to_csv(path, index=False)
+        with pytest.raises(DatasetError):
+            ingest_food_csv(str(path), cache=cache, quarantine_path=str(tmp_path / "q.csv"))
+
+    def test_loader_uses_streaming_ingest(self, tmp_path, cache, monkeypatch):
+        """With streaming enabled the loader serves the ingested snapshot"""
+        path = write_catalog(tmp_path / "food.csv", [{"Food_Item": "Mystery", "Calories": "lots"}])
+        monkeypatch.setattr("dataset_loader.snapshot_cache", cache)
+        monkeypatch.setattr(settings, "FOOD_STREAMING_INGEST", True)
+        monkeypatch.setattr(settings, "INGEST_QUARANTINE_DIR", str(tmp_path / "quarantine"))
+
+        df = DatasetLoader().load_food_dataset(path)
+
+        assert len(df) == 60
+        assert os.path.exists(tmp_path / "quarantine" / "food.quarantine.csv")
@@ -0,0 +1,101 @@
+"""
+Tests for the health-condition rule table
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exceptions import DatasetError
+from filter_and_score import FoodFilter
+from food_index import FoodIndex, diff_catalogs
+import health_rules
+from health_rules import DEFAULT_RULES, ConditionMasks, HealthRules, load_health_rules
+
+
+@pytest.fixture
+def rules_csv(tmp_path):
+    path = tmp_path / "rules.csv"
+    path.write_text(
+        "condition,avoid_term,note\n"
+        "Diabetes,sugar,\n"
+        "diabetes,jaggery,added by clinic\n"
+        "nut allergy,peanut,\n"
+        ",orphan,\n"
+    )
+    return str(path)
+
+
+def test_load_groups_terms_by_condition(rules_csv):
+    rules = load_health_rules(rules_csv)
+    assert rules.rules == {"diabetes": ("sugar", "jaggery"), "nut allergy": ("peanut",)}
+    assert sorted(rules.avoid_terms("Type 2 Diabetes, diabet")) == ["jaggery", "sugar"]
+    assert rules.uncovered(["Diabetes", "Asthma "]) == ["asthma"]
+
+
+def test_missing_file_and_bad_columns(tmp_path):
+    assert load_health_rules(str(tmp_path / "missing.csv")).rules == HealthRules(DEFAULT_RULES).rules
+
+    bad = tmp_path / "bad.csv"
+    bad.write_text("disease,term\ndiabetes,sugar\n")
+    with pytest.raises(DatasetError):
+        load_health_rules(str(bad))
+
+
+def test_compiled_masks_match_term_scan(food_df, rules_csv):
+    index = FoodIndex(food_df)
+    rules = load_health_rules(rules_csv)
+    masks = ConditionMasks(index, rules, ["Diabetes"])
+
+    for conditions in ["diabetes", "nut allergy, diabetes", "asthma", "diabetes, asthma, peanut allergy"]:
+        terms = rules.avoid_terms(conditions)
+        expected = index.term_mask(terms) if terms else None
+        excluded = masks.exclusion_mask(conditions)
+        if expected is None:
+            assert excluded is None
+        else:
+            assert np.array_equal(excluded, expected)
+
+
+def test_masks_from_delta_match_full_compile(food_df, rules_csv):
+    rules = load_health_rules(rules_csv)
+    previous = ConditionMasks(FoodIndex(food_df), rules)
+
+    new_df = food_df.drop(index=[0, 5]).reset_index(drop=True)
+    new_df.loc[3, ["Food_Item", "food_key"]] = ["Sugar Rusk", "sugar rusk"]
+    new_df.loc[len(new_df)] = {**food_df.iloc[1].to_dict(), "Food_Item": "Peanut Bar", "food_key": "peanut bar"}
+    delta = diff_catalogs(food_df, new_df)
+    index = FoodIndex.from_delta(FoodIndex(food_df), new_df, delta.row_map)
+
+    # An edited rule is compiled in full, the others only on fresh rows
+    edited = HealthRules({**rules.rules, "nut allergy": ("peanut", "coconut")})
+    for new_rules in (rules, edited):
+        masks = ConditionMasks.from_delta(previous, index, new_rules, delta.row_map)
+        expected = ConditionMasks(FoodIndex(new_df), new_rules)
+        assert set(masks.rule_masks) == set(expected.rule_masks)
+        for rule, mask in expected.rule_masks.items():
+            assert np.array_equal(masks.rule_masks[rule], mask)
+
+
+def test_filter_uses_compiled_masks(food_df):
+    index = FoodIndex(food_df)
+    keep = FoodFilter.health_condition_mask(index, "diabetes, hypertension")
+    assert index.condition_masks is not None
+    expected = FoodFilter.filter_by_health_conditions(food_df, "diabetes, hypertension")
+    assert np.flatnonzero(keep).tolist() == expected.index.tolist()
+
+
+def test_memos_are_bounded(food_df, monkeypatch):
+    monkeypatch.setattr(health_rules, "MATCH_CACHE_SIZE", 8)
+    rules = HealthRules(DEFAULT_RULES)
+    masks = ConditionMasks(FoodIndex(food_df), rules)
+    for i in range(50):
+        masks.condition_mask(f"type {i} diabetes")
+        masks.condition_mask(f"unknown condition {i}")
+
+    assert rules.matching_rules.cache_info().currsize == 8
+    # One mask per rule combination, however the conditions were spelled
+    assert set(masks._combination_masks) == {(), ("diabetes",)}
@@ -0,0 +1,104 @@
+"""
+Tests for the persistent LLM response cache
+"""
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+
+# The planner builds its OpenAI client on import; no request is ever sent
+settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-test"
+
+import planner  # noqa: E402
+from exceptions import LLMError  # noqa: E402
+from llm_cache import LLMResponseCache  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "llm.sqlite"), max_entries=3, ttl_seconds=60)
+
+
+def test_round_trip_and_key_sensitivity(cache):
+    key = cache.make_key("gpt-4", [{"role": "user", "content": "plan"}], 0.7, 2000)
+    assert key != cache.make_key("gpt-4", [{"role": "user", "content": "plan"}], 0.2, 2000)
+    assert key != cache.make_key("gpt-4", [{"role": "user", "content": "plan"}], 0.7, 1500)
+    assert cache.get(key) is None
+
+    assert cache.put(key, {"day_1": {"breakfast": []}}, "gpt-4", prompt_chars=4, latency=1.5)
+    assert cache.get(key) == {"day_1": {"breakfast": []}}
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_lru_eviction_and_ttl(cache, tmp_path):
+    for key in "abc":
+        cache.put(key, {"key": key}, "gpt-4")
+    cache.get("a")
+    cache.put("d", {"key": "d"}, "gpt-4")
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+
+    expired = LLMResponseCache(str(tmp_path / "expired.sqlite"), max_entries=3, ttl_seconds=-1)
+    expired.put("a", {"key": "a"}, "gpt-4")
+    assert expired.get("a") is None
+
+
+def test_shared_across_processes(cache):
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]); "
+        "from llm_cache import LLMResponseCache; "
+        "LLMResponseCache(sys.argv[2], max_entries=3, ttl_seconds=60).put('k', {'from': 'child'}, 'gpt-4')"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script, backend, cache.db_path], check=True)
+    assert cache.get("k") == {"from": "child"}
+
+
+class FakeClient:
+    """Chat completions client returning canned content"""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_planner_caches_parsed_responses_only(cache, monkeypatch):
+    monkeypatch.setattr(planner, "llm_cache", cache)
+    meal_planner = planner.MealPlanner()
+
+    meal_planner.client = FakeClient('```json\n{"day_1": {}}\n```')
+    assert meal_planner._call_llm_and_parse("same prompt", "gpt-4") == {"day_1": {}}
+    assert meal_planner._call_llm_and_parse("same prompt", "gpt-4") == {"day_1": {}}
+    assert meal_planner.client.calls == 1
+
+    meal_planner.client = FakeClient("{not json")
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            meal_planner._call_llm_and_parse("other prompt", "gpt-4")
+    assert meal_planner.client.calls == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalid_plans_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(planner, "llm_cache", cache)
+    meal_planner = planner.MealPlanner()
+    meal_planner.client = FakeClient('{"day_1": {"breakfast": []}}')
+
+    def strategy(*args, catalog=None):
+        return meal_planner._call_llm_and_parse("prompt", "gpt-4")
+
+    assert meal_planner._run_strategy(strategy, (), None, 1) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,76 @@
+"""
+Tests for the local meal-plan optimizer
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exceptions import MealPlanGenerationError
+from filter_and_score import score_and_rank_foods
+from calorie_calculator import CALORIES_PER_GRAM, MACRO_RATIOS
+from meal_optimizer import MACRO_TOLERANCE, MEAL_SPLIT, VARIETY_DAYS, MealOptimizer, macro_reserve
+from conftest import make_profile
+
+
+DOSHA_RESULT = {"dosha": "kapha", "scores": {"vata": 0.2, "pitta": 0.3, "kapha": 0.5}}
+
+
+@pytest.fixture
+def candidates(food_df):
+    return score_and_rank_foods(food_df, make_profile(), DOSHA_RESULT, top_n=100)
+
+
+def test_meals_hit_calorie_split(candidates):
+    plan = MealOptimizer().optimize(candidates, 2000, days=30, dosha="kapha")
+    for day in range(1, 31):
+        meals = plan[f"day_{day}"]
+        assert list(meals) == list(MEAL_SPLIT)
+        for meal, share in MEAL_SPLIT.items():
+            calories = sum(item["calories"] for item in meals[meal])
+            assert abs(calories - 2000 * share) <= 0.1 * 2000 * share + 0.5
+        assert plan["totals"][f"day_{day}"] == pytest.approx(2000, rel=0.1)
+    assert plan["summary"]["method"] == "local_optimizer"
+
+
+def test_days_meet_macro_targets(candidates):
+    plan = MealOptimizer().optimize(candidates, 2000, days=30)
+    assert plan["summary"]["days_outside_macro_tolerance"] == 0
+    for day in range(1, 31):
+        items = [item for meal in plan[f"day_{day}"].values() for item in meal]
+        grams = {"protein": "protein", "carb": "carbs", "fat": "fat"}
+        macro_calories = {m: sum(item[key] for item in items) * CALORIES_PER_GRAM[m] for m, key in grams.items()}
+        total = sum(macro_calories.values())
+        for macro, ratio in MACRO_RATIOS.items():
+            # Item grams are rounded to 0.1 g
+            assert abs(macro_calories[macro] / total - ratio) <= MACRO_TOLERANCE + 0.005
+
+
+def test_macro_reserve_adds_macro_rich_foods(food_df):
+    lean = food_df.assign(Fat=0.0)
+    lean.loc[[5, 9], "Fat"] = 50.0
+    reserve = macro_reserve(lean, per_macro=2)
+    assert {5, 9} <= set(reserve)
+    assert len(reserve) <= 6 and len(macro_reserve(lean.iloc[:0])) == 0
+
+
+def test_variety_across_days(candidates):
+    plan = MealOptimizer().optimize(candidates, 1800, days=14)
+    eaten = [{item["name"] for meal in plan[f"day_{day}"].values() for item in meal} for day in range(1, 15)]
+    for day in range(len(eaten)):
+        for earlier in eaten[max(0, day - VARIETY_DAYS):day]:
+            assert not eaten[day] & earlier
+
+
+def test_deterministic(candidates):
+    # Latency is tracked by benchmark.py (optimize_meal_plan_30_days)
+    optimizer = MealOptimizer()
+    plan = optimizer.optimize(candidates, 2200, days=30)
+    assert optimizer.optimize(candidates, 2200, days=30) == plan
+
+
+def test_rejects_empty_candidates(candidates):
+    with pytest.raises(MealPlanGenerationError):
+        MealOptimizer().optimize(candidates.iloc[:0], 2000, days=3)
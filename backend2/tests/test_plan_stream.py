@@ -0,0 +1,200 @@
+"""
+Tests for incremental plan parsing and streamed plan generation
+"""
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+
+# The planner builds its OpenAI client on import; no request is ever sent
+settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-test"
+
+import planner  # noqa: E402
+from llm_cache import LLMResponseCache  # noqa: E402
+from plan_stream import IncrementalPlanParser, sse_event  # noqa: E402
+from conftest import make_profile  # noqa: E402
+
+
+def make_day(name):
+    return {meal: [{"name": f"{name} {meal}", "calories": 500}] for meal in ("breakfast", "lunch", "dinner")}
+
+
+PLAN = {
+    "day_1": make_day("Kitchari"),
+    "day_2": make_day('Dal, "tadka" {spiced}\\'),
+    "totals": {"day_1": 1500, "day_2": 1500},
+    "summary": {"dosha_focus": "vata", "total_foods_used": 6},
+}
+
+
+def test_parser_emits_members_as_they_close():
+    text = "Here is the plan:\n```json\n" + json.dumps(PLAN, indent=2) + "\n```\nEnjoy!"
+    for size in (1, 5, 64, len(text)):
+        parser = IncrementalPlanParser()
+        members = []
+        for i in range(0, len(text), size):
+            members += parser.feed(text[i:i + size])
+        assert dict(members) == PLAN
+        assert [key for key, _ in members] == list(PLAN)
+        assert parser.done
+
+    # day_1 is available before day_2 has started arriving
+    parser = IncrementalPlanParser()
+    head = json.dumps(PLAN)
+    assert parser.feed(head[:head.index('"day_2"')]) == [("day_1", PLAN["day_1"])]
+
+
+def test_parser_scalars_and_malformed_members():
+    parser = IncrementalPlanParser()
+    assert parser.feed('{"a": 1, "b": "x,}", "c": [1, {"d": null}]}') == [
+        ("a", 1), ("b", "x,}"), ("c", [1, {"d": None}])
+    ]
+    with pytest.raises(json.JSONDecodeError):
+        IncrementalPlanParser().feed('{"day_1": {"breakfast": [oops]}}')
+
+
+def test_sse_event_framing():
+    assert sse_event("day", {"day": "day_1"}) == 'event: day\ndata: {"day": "day_1"}\n\n'
+
+
+class StreamingClient:
+    """Chat completions client streaming canned content in small chunks"""
+
+    def __init__(self, content, chunk=7):
+        self.content = content
+        self.chunk = chunk
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        assert stream
+        self.calls += 1
+        client = self
+
+        class Stream:
+            def __iter__(self):
+                for i in range(0, len(client.content), client.chunk):
+                    delta = SimpleNamespace(content=client.content[i:i + client.chunk])
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+            def close(self):
+                pass
+
+        return Stream()
+
+
+@pytest.fixture
+def meal_planner(tmp_path, monkeypatch):
+    monkeypatch.setattr(planner, "llm_cache", LLMResponseCache(str(tmp_path / "llm.sqlite")))
+    meal_planner = planner.MealPlanner()
+    meal_planner.strategy_stats = planner.StrategyStats()
+    monkeypatch.setattr(meal_planner, "_structured_prompt", lambda *args, **kwargs: "prompt")
+    return meal_planner
+
+
+def stream(meal_planner, food_df, days=2):
+    return list(meal_planner.stream_meal_plan(
+        make_profile(), food_df, {"dosha": "vata"}, 1500, days=days, model="gpt-4"
+    ))
+
+
+def test_streams_llm_days_then_done(meal_planner, food_df):
+    meal_planner.client = StreamingClient(json.dumps(PLAN))
+    events = stream(meal_planner, food_df)
+    assert [event for event, _ in events] == ["day", "day", "done"]
+    assert [(data["day"], data["source"]) for _, data in events[:2]] == [("day_1", "llm"), ("day_2", "llm")]
+    assert events[0][1]["meals"] == PLAN["day_1"]
+
+    done = events[-1][1]
+    assert done["totals"] == PLAN["totals"] and done["llm_days"] == 2
+    assert done["summary"]["method"] == "structured_prompt_stream"
+    assert meal_planner.strategy_stats.stats()["structured_prompt_stream"]["wins"] == 1
+
+    # A complete stream is cached and replayed without another call
+    assert stream(meal_planner, food_df)[:-1] == events[:-1]
+    assert meal_planner.client.calls == 1
+
+
+def test_invalid_day_is_completed_by_local_optimizer(meal_planner, food_df):
+    plan = dict(PLAN, day_2={"breakfast": []})
+    meal_planner.client = StreamingClient(json.dumps(plan))
+    events = stream(meal_planner, food_df)
+    days = [data for event, data in events if event == "day"]
+    assert [(day["day"], day["source"]) for day in days] == [("day_1", "llm"), ("day_2", "local_optimizer")]
+
+    done = events[-1][1]
+    assert done["llm_days"] == 1 and done["totals"]["day_2"] > 0
+    assert done["summary"]["method"] == "structured_prompt_stream+local_optimizer"
+    assert meal_planner.strategy_stats.stats()["structured_prompt_stream"]["invalid"] == 1
+
+
+def test_truncated_stream_keeps_sent_days(meal_planner, food_df):
+    text = json.dumps(PLAN)
+    meal_planner.client = StreamingClient(text[:text.index('"day_2"') + 20])
+    events = stream(meal_planner, food_df)
+    assert [(data["day"], data["source"]) for event, data in events if event == "day"] == [
+        ("day_1", "llm"), ("day_2", "local_optimizer")
+    ]
+    assert meal_planner.strategy_stats.stats()["structured_prompt_stream"]["errors"] == 1
+
+
+def test_incomplete_plan_is_not_cached(meal_planner, food_df):
+    meal_planner.client = StreamingClient(json.dumps({"day_1": PLAN["day_1"]}))
+    for _ in range(2):
+        events = stream(meal_planner, food_df)
+        assert events[-1][1]["llm_days"] == 1
+    assert meal_planner.client.calls == 2
+    assert planner.llm_cache.stats()["entries"] == 0
+
+
+class FailingClient:
+    """Chat completions client whose every request fails"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        raise ConnectionError("LLM unavailable")
+
+
+def test_endpoint_streams_days_from_the_loaded_catalog(tmp_path, monkeypatch):
+    """The SSE endpoint plans from the catalog the app loads, even with the LLM down"""
+    pytest.importorskip("uvicorn")
+    firebase_admin = pytest.importorskip("firebase_admin")
+    from fastapi.testclient import TestClient
+
+    # Skip credential loading; authentication is overridden below
+    monkeypatch.setitem(firebase_admin._apps, "[DEFAULT]", object())
+    import api_generate
+    from dataset_loader import dataset_loader
+
+    # One catalog in memory: the module's dataset is the snapshot's, built at startup
+    assert api_generate.FOOD_DATASET is dataset_loader.get_snapshot().datasets["food"]
+
+    monkeypatch.setattr(planner, "llm_cache", LLMResponseCache(str(tmp_path / "llm.sqlite")))
+    monkeypatch.setattr(api_generate.meal_planner_stream.__self__, "client", FailingClient())
+    monkeypatch.setattr(api_generate, "analyze_dosha", lambda profile: {"dosha": "pitta", "confidence": 0.8})
+    monkeypatch.setitem(api_generate.app.dependency_overrides, api_generate.verify_doctor,
+                        lambda: {"uid": "doctor-1", "role": "doctor"})
+
+    body = {"patientId": "p-1", "profile": {"age": 40, "gender": "male", "weight": 75, "height": 175}, "days": 3}
+    with TestClient(api_generate.app) as client:
+        response = client.post("/generateMealPlan/stream", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [
+        (lines[0][len("event: "):], json.loads(lines[1][len("data: "):]))
+        for lines in (message.split("\n") for message in response.text.strip().split("\n\n"))
+    ]
+    assert [event for event, _ in events] == ["day", "day", "day", "done"]
+    assert {data["source"] for _, data in events[:3]} == {"local_optimizer"}
+    done = events[-1][1]
+    assert all(total > 0 for total in done["totals"].values())
+    assert done["metadata"]["patient_id"] == "p-1" and done["metadata"]["dosha"] == "pitta"
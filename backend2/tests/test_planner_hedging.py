@@ -0,0 +1,92 @@
+"""
+Tests for hedged meal plan strategy execution
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+
+# The planner builds its OpenAI client on import; no request is ever sent
+settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-test"
+
+from planner import MealPlanner, StrategyStats  # noqa: E402
+
+
+def make_plan(days=1):
+    meals = {meal: [{"name": meal, "calories": 100}] for meal in ("breakfast", "lunch", "dinner")}
+    return {f"day_{day + 1}": meals for day in range(days)}
+
+
+def strategy(name, seconds=0.0, plan=None, error=None, started=None):
+    def run(*args, catalog=None):
+        if started is not None:
+            started.append(name)
+        time.sleep(seconds)
+        if error:
+            raise RuntimeError(error)
+        return plan
+    run.__name__ = f"_generate_with_{name}"
+    return run
+
+
+@pytest.fixture
+def planner():
+    planner = MealPlanner()
+    planner.strategy_stats = StrategyStats()
+    return planner
+
+
+def test_hedge_wins_when_primary_is_slow(planner):
+    strategies = [strategy("slow", 1.0, make_plan()), strategy("fast", 0.0, make_plan()), strategy("never")]
+    start = time.perf_counter()
+    plan = planner._run_hedged(strategies, (), None, 1, delay=0.05)
+    assert plan == make_plan()
+    assert time.perf_counter() - start < 0.5
+
+    stats = planner.strategy_stats.stats()
+    assert stats["fast"]["wins"] == 1 and stats["slow"]["abandoned"] == 1
+    assert "never" not in stats
+
+
+def test_abandoned_runs_record_one_outcome(planner):
+    strategies = [strategy("slow_invalid", 0.3, {"day_1": {}}), strategy("slow_error", 0.3, error="late"),
+                  strategy("fast", 0.0, make_plan())]
+    assert planner._run_hedged(strategies, (), None, 1, delay=0.02) == make_plan()
+    time.sleep(0.5)
+
+    stats = planner.strategy_stats.stats()
+    for name in ("slow_invalid", "slow_error"):
+        assert stats[name]["abandoned"] == 1
+        assert stats[name]["invalid"] == stats[name]["errors"] == 0
+    for entry in stats.values():
+        assert sum(entry[outcome] for outcome in StrategyStats.OUTCOMES) == entry["launched"]
+
+
+def test_failure_starts_next_without_waiting(planner):
+    started = []
+    strategies = [strategy("broken", error="boom", started=started),
+                  strategy("invalid", plan={"day_1": {}}, started=started),
+                  strategy("good", plan=make_plan(), started=started)]
+    start = time.perf_counter()
+    assert planner._run_hedged(strategies, (), None, 1, delay=10) == make_plan()
+    assert time.perf_counter() - start < 1
+    assert started == ["broken", "invalid", "good"]
+
+    stats = planner.strategy_stats.stats()
+    assert (stats["broken"]["errors"], stats["invalid"]["invalid"], stats["good"]["wins"]) == (1, 1, 1)
+
+
+def test_all_failing_returns_none(planner):
+    assert planner._run_hedged([strategy("a", error="x"), strategy("b")], (), None, 1, delay=0.01) is None
+
+
+def test_sequential_run_records_latency(planner):
+    assert planner._run_strategy(strategy("quick", 0.01, make_plan(2)), (), None, 2) == make_plan(2)
+    stats = planner.strategy_stats.stats()["quick"]
+    assert stats["launched"] == stats["wins"] == 1
+    assert stats["win_rate"] == 1.0 and stats["latency_p50"] >= 0.01
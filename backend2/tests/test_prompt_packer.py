@@ -0,0 +1,69 @@
+"""
+Tests for token-budget-aware prompt packing
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_and_score import food_prompt_lines, score_and_rank_foods
+from prompt_packer import PromptPacker, calibrate_token_scale, estimate_tokens
+from conftest import make_profile
+
+
+DOSHA_RESULT = {"dosha": "vata", "scores": {"vata": 0.5, "pitta": 0.3, "kapha": 0.2}}
+
+
+@pytest.fixture
+def ranked(food_df):
+    return score_and_rank_foods(food_df, make_profile(), DOSHA_RESULT, top_n=120)
+
+
+class TestTokenEstimate:
+    """Test the local token estimator"""
+
+    def test_counts_words_numbers_and_punctuation(self):
+        assert estimate_tokens("", scale=1.0) == 0
+        assert estimate_tokens("Dal Tadka | 158cal", scale=1.0) == 5
+        assert estimate_tokens("1234567", scale=1.0) == 3
+        assert estimate_tokens("a\n\nb", scale=1.0) == 3
+
+    def test_calibration_scales_estimates(self):
+        samples = [("Dal Tadka | 158cal", 10), ("Coconut Rice", 4)]
+        scale = calibrate_token_scale(samples)
+        assert scale == pytest.approx(14 / 8)
+        assert estimate_tokens("Dal Tadka | 158cal", scale=scale) == 9
+
+
+class TestPromptPacker:
+    """Test choosing foods for a token budget"""
+
+    def test_fits_budget_and_keeps_ranked_order(self, ranked):
+        packer = PromptPacker(token_budget=400, context_tokens=8192, foods_per_day=50, category_quota=3)
+        lines = food_prompt_lines(ranked)
+        packed = packer.pack(ranked, lines, days=7, prompt="Plan meals", max_output_tokens=2000)
+
+        assert 0 < len(packed) < len(ranked)
+        assert sum(estimate_tokens(line) + 1 for line in food_prompt_lines(packed)) <= 400
+        assert packed["rank"].is_monotonic_increasing
+
+    def test_limits_foods_per_day(self, ranked):
+        packer = PromptPacker(token_budget=10_000, context_tokens=100_000, foods_per_day=5, category_quota=0)
+        lines = food_prompt_lines(ranked)
+        for days in (1, 3):
+            packed = packer.pack(ranked, lines, days, prompt="", max_output_tokens=0)
+            assert packed.index.tolist() == ranked.index[:5 * days].tolist()
+
+    def test_category_quota_spreads_categories(self):
+        categories = np.array(["A"] * 6 + ["B"] * 2 + ["C"])
+        packer = PromptPacker(token_budget=10_000, context_tokens=100_000, foods_per_day=5, category_quota=2)
+        positions = packer.select(["food"] * len(categories), categories, days=1, budget=10_000)
+        assert positions.tolist() == [0, 1, 6, 7, 8]
+
+    def test_budget_shrinks_with_prompt_and_output(self):
+        packer = PromptPacker(token_budget=2500, context_tokens=4096)
+        assert packer.food_budget(prompt_tokens=500, max_output_tokens=2000) == 4096 - 2500 - 40
+        assert packer.food_budget(prompt_tokens=5000, max_output_tokens=2000) == 0
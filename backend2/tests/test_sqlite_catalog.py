@@ -0,0 +1,103 @@
+"""
+Tests for the SQLite-backed food catalog
+"""
+import gc
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from filter_and_score import filter_foods_for_user
+from sqlite_catalog import SQLiteFoodCatalog, get_food_catalog, versioned_db_path
+from conftest import make_profile
+
+
+PROFILES = [
+    ({"Allergies": "peanut butter, egg"}, "vata", 0.7, 100),
+    ({"Food_preference": "vegan", "Health_Conditions": "Diabetes"}, "pitta", 0.9, 100),
+    ({"Food_preference": "vegetarian", "Dietary_Restrictions": "rice,dal"}, "kapha", 0.5, 40),
+    ({"Allergies": "a,e,i,o,u"}, "vata", 0.9, 100),
+    ({"Allergies": "chutney", "Health_Conditions": "hypertension"}, "pitta", 0.8, 10),
+    ({}, None, 0.7, 500),
+]
+
+
+@pytest.fixture
+def catalog(food_df, tmp_path):
+    food_df = food_df.assign(Ingredients=["Rice, Peanuts" if i % 5 == 0 else np.nan
+                                          for i in range(len(food_df))])
+    return food_df, SQLiteFoodCatalog.from_frame(food_df, str(tmp_path / "foods.sqlite"))
+
+
+class TestSQLiteFoodCatalog:
+    """Test filter pushdown against the in-memory filters"""
+
+    @pytest.mark.parametrize("overrides,dosha,strictness,max_items", PROFILES)
+    def test_matches_pandas_filtering(self, catalog, overrides, dosha, strictness, max_items):
+        """The pushed-down query selects the same foods in the same order"""
+        food_df, db = catalog
+        profile = make_profile(**overrides)
+        expected = filter_foods_for_user(food_df, profile, dosha, max_items, strictness)
+
+        positions = db.filter_food_positions(profile, dosha, max_items, strictness)
+        assert list(food_df.index[positions]) == list(expected.index)
+
+        frame = db.filter_foods(profile, dosha, max_items, strictness)
+        pd.testing.assert_frame_equal(frame, expected, check_index_type=False)
+
+    def test_backend_setting_routes_filtering(self, catalog, tmp_path, monkeypatch):
+        """With the sqlite backend, filter_foods_for_user queries the database"""
+        food_df, _ = catalog
+        profile = make_profile(Allergies="egg")
+        expected = filter_foods_for_user(food_df, profile, "vata", 50)
+
+        monkeypatch.setattr(settings, "FOOD_CATALOG_BACKEND", "sqlite")
+        monkeypatch.setattr(settings, "FOOD_CATALOG_DB_PATH", str(tmp_path / "routed.sqlite"))
+        result = filter_foods_for_user(food_df, profile, "vata", 50)
+
+        catalog = get_food_catalog(food_df)
+        assert catalog is get_food_catalog(food_df)
+        assert catalog.db_path == versioned_db_path(str(tmp_path / "routed.sqlite"), catalog.fingerprint)
+        assert list(result.index) == list(expected.index)
+
+    def test_catalog_is_reused_when_unchanged(self, catalog, tmp_path):
+        """An existing database whose fingerprint matches the frame is not rebuilt"""
+        food_df, _ = catalog
+        path = str(tmp_path / "reuse.sqlite")
+        built = get_food_catalog(food_df, path)
+        mtime = os.path.getmtime(built.db_path)
+
+        assert get_food_catalog(food_df.copy(), path).db_path == built.db_path
+        assert os.path.getmtime(built.db_path) == mtime
+        assert np.array_equal(built.filter_food_positions(make_profile(), None, 5),
+                              filter_foods_for_user(food_df, make_profile(), None, 5).index)
+
+    def test_rebuild_does_not_replace_a_live_catalog(self, catalog, tmp_path):
+        """Threads connecting after a rebuild still read their own frame's rows"""
+        food_df = catalog[0].copy()
+        path = str(tmp_path / "versions.sqlite")
+        old = get_food_catalog(food_df, path)
+        changed = food_df.iloc[::-1].reset_index(drop=True)
+        new = get_food_catalog(changed, path)
+        assert new.db_path != old.db_path
+
+        profile = make_profile()
+        expected = filter_foods_for_user(food_df, profile, "vata", 30)
+        positions = []
+        worker = threading.Thread(target=lambda: positions.extend(old.filter_food_positions(profile, "vata", 30)))
+        worker.start()
+        worker.join()
+        assert list(food_df.index[positions]) == list(expected.index)
+
+        # Versions no live frame uses are deleted on the next rebuild
+        del food_df, old
+        gc.collect()
+        newest = get_food_catalog(changed.iloc[:100].copy(), path)
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            [os.path.basename(new.db_path), os.path.basename(newest.db_path), "foods.sqlite"])
@@ -0,0 +1,43 @@
+"""
+Tests for nutrient-space food substitutes
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from substitutes import SubstituteIndex
+
+
+@pytest.fixture
+def index(food_df):
+    return SubstituteIndex(food_df)
+
+
+@pytest.mark.parametrize("diet,dosha,strictness", [
+    (None, None, 0.7), ("vegan", "pitta", 0.7), ("vegetarian", "vata", 0.9), (None, "kapha", 0.3),
+])
+def test_matches_brute_force_over_compliant_foods(index, diet, dosha, strictness):
+    allowed = index.compliance_mask(diet, dosha, strictness)
+    for position in range(0, index.index.size, 17):
+        distances = np.linalg.norm(index.vectors - index.vectors[position], axis=1)
+        if allowed is not None:
+            distances[~allowed] = np.inf
+        distances[position] = np.inf
+
+        found, found_distances = index.query(position, 6, diet, dosha, strictness)
+        assert position not in found
+        assert np.allclose(found_distances, np.sort(distances)[:6])
+        if allowed is not None:
+            assert allowed[found].all()
+
+
+def test_substitute_records(food_df, index):
+    records = index.substitutes(food_df, " Paneer Tikka 0 ", k=3, diet="vegan")
+    assert len(records) == 3
+    assert all(record["is_vegan"] for record in records)
+    assert [record["distance"] for record in records] == sorted(record["distance"] for record in records)
+    assert index.substitutes(food_df, "no such food") is None
@@ -21,7 +21,7 @@ drop_cols = ["Hair Color", "Eyes", "Eyelashes", "Blinking of Eyes", "Cheeks",
 df_proc.drop(columns=[c for c in drop_cols if c in df_proc.columns], inplace=True)
 
 # Encode categorical columns
-cat_cols = df_proc.select_dtypes(include="object").columns.tolist()
+cat_cols = df_proc.select_dtypes(include=["object", "category"]).columns.tolist()
 cat_cols = [c for c in cat_cols if c != "Dosha"]
 
 encoders = {}